@@ -1,288 +1,247 @@
 import streamlit as st
-import pandas as pd
-import io
+import snapshot_store
+from csv_export import cached_export, export_csv_bytes, frame_fingerprint
+from report_parsing import detect_report_type, parse_files_parallel
+from sales_metrics import build_sales_metrics
+from topology_management import refresh_session_topology, run_topology_editor
 
-# Configure the page
-st.set_page_config(
-    page_title="DBI Stock Orders Manager",
-    page_icon="📦",
-    layout="wide",
-    initial_sidebar_state="collapsed"  # Reduces initial render time
-)
+def main():
+    # Configure the page
+    st.set_page_config(
+        page_title="DBI Stock Orders Manager",
+        page_icon="📦",
+        layout="wide",
+        initial_sidebar_state="collapsed"  # Reduces initial render time
+    )
 
-# Main title
-st.title("DBI Stock Orders Manager")
-st.write('v0.1.0')
+    # Main title
+    st.title("DBI Stock Orders Manager")
+    st.write('v0.1.0')
 
-# Create tabs
-tab1, tab2, tab3, tab4 = st.tabs(["Upload Database", "PO Generation", "Assembly Order Generation", "Supplier Management"])
+    # Create tabs
+    tab1, tab2, tab3, tab4 = st.tabs(["Upload Database", "PO Generation", "Assembly Order Generation", "Supplier Management"])
 
-with tab1:
-    st.header("Upload Database")
-    
-    # File uploader for multiple xlsx and csv files
-    uploaded_files = st.file_uploader(
-        "Choose Excel or CSV files",
-        type=['xlsx', 'csv'],
-        accept_multiple_files=True,
-        help="You can upload multiple Excel (.xlsx) and CSV (.csv) files at once"
-    )
-    
-    # Initialize session state for dataframes if not exists
-    if 'dataframes' not in st.session_state:
-        st.session_state.dataframes = {}
-    
-    # Function to clean dataframes
-    def clean_dataframe(df):
-        """Remove Unnamed columns and drop columns that are entirely NaN"""
-        # Remove columns starting with 'Unnamed'
-        unnamed_cols = [col for col in df.columns if str(col).startswith('Unnamed')]
-        if unnamed_cols:
-            df = df.drop(columns=unnamed_cols)
+    with tab1:
+        st.header("Upload Database")
+        
+        # File uploader for multiple xlsx and csv files
+        uploaded_files = st.file_uploader(
+            "Choose Excel or CSV files",
+            type=['xlsx', 'csv'],
+            accept_multiple_files=True,
+            help="You can upload multiple Excel (.xlsx) and CSV (.csv) files at once"
+        )
         
-        # Drop columns that are entirely NaN
-        df = df.dropna(axis=1, how='all')
+        # Initialize session state for dataframes if not exists
+        if 'dataframes' not in st.session_state:
+            st.session_state.dataframes = {}
+        if 'dataframe_fingerprints' not in st.session_state:
+            st.session_state.dataframe_fingerprints = {}
         
-        return df
-    
-    # Function to parse files based on naming patterns
-    def parse_uploaded_files(files):
-        dataframes = {}
-        parsed_files = []
+        # Function to keep parsed datasets with the fingerprints their CSV exports are cached under
+        def store_dataframes(dataframes):
+            st.session_state.dataframes.update(dataframes)
+            st.session_state.dataframe_fingerprints.update({name: frame_fingerprint(df) for name, df in dataframes.items()})
         
-        for file in files:
-            filename = file.name
-            file_content = file.read()
-            file.seek(0)  # Reset file pointer
+        # Function to parse files, reusing on-disk snapshots of identical uploads
+        def parse_uploaded_files(files, digests=None):
+            dataframes = {}
+            results = [None] * len(files)
+            to_parse = []
             
-            try:
-                # Availability Report
-                if filename.startswith("AvailabilityReport_"):
-                    df = pd.read_csv(io.BytesIO(file_content))
-                    df = clean_dataframe(df)
-                    dataframes["Availability Report"] = df
-                    parsed_files.append(("Availability Report", filename, "✅"))
-                
-                # BOM Report (skip first 2 rows)
-                elif "BOM Component Availability" in filename and filename.endswith('.xlsx'):
-                    df = pd.read_excel(io.BytesIO(file_content), skiprows=2)
-                    df = clean_dataframe(df)
-                    dataframes["BOM Report"] = df
-                    parsed_files.append(("BOM Report", filename, "✅"))
-                
-                # Inventory List
-                elif filename.startswith("InventoryList_"):
-                    df = pd.read_csv(io.BytesIO(file_content))
-                    df = clean_dataframe(df)
-                    dataframes["Inventory List"] = df
-                    parsed_files.append(("Inventory List", filename, "✅"))
+            for position, file in enumerate(files):
+                filename = file.name
+                file_content = file.getvalue()
                 
-                # Replenishment Report - NC
-                elif "replenishment-Combined NC Warehouses" in filename or "replenishment-Combined_NC_Warehouses" in filename:
-                    df = pd.read_csv(io.BytesIO(file_content))
-                    # Clean up SKU column (remove Excel quotes if present)
-                    if 'SKU' in df.columns:
-                        df['SKU'] = df['SKU'].astype(str).str.replace('="', '').str.replace('"', '')
-                    df = clean_dataframe(df)
-                    dataframes["Replenishment Report - NC"] = df
-                    parsed_files.append(("Replenishment Report - NC", filename, "✅"))
-                
-                # Replenishment Report - CA
-                elif "replenishment-Combined CA Warehouses" in filename or "replenishment-Combined_CA_Warehouses" in filename:
-                    df = pd.read_csv(io.BytesIO(file_content))
-                    # Clean up SKU column (remove Excel quotes if present)
-                    if 'SKU' in df.columns:
-                        df['SKU'] = df['SKU'].astype(str).str.replace('="', '').str.replace('"', '')
-                    df = clean_dataframe(df)
-                    dataframes["Replenishment Report - CA"] = df
-                    parsed_files.append(("Replenishment Report - CA", filename, "✅"))
-                
-                # Sales by Product Details Report (skip first 4 rows, handle multi-index)
-                elif "Sales by Product Details Report" in filename and filename.endswith('.xlsx'):
-                    # Read with multi-index columns, skip first 4 rows
-                    df = pd.read_excel(io.BytesIO(file_content), skiprows=4, header=[0, 1])
-                    df = clean_dataframe(df)
-                    
-                    # Extract the different metrics as separate dataframes
-                    if len(df.columns.levels) == 2:  # Confirm it's multi-index
-                        # Get the first column data and name (usually SKU or product identifier)
-                        first_col_data = df.iloc[:, 0]
-                        first_col_name = df.columns[0]
-                        
-                        # Extract the clean column name (handle multi-index column name)
-                        if isinstance(first_col_name, tuple):
-                            # For multi-index, use the first non-empty part
-                            clean_first_col_name = next((part for part in first_col_name if str(part) != 'nan' and str(part).strip()), 'SKU')
-                        else:
-                            clean_first_col_name = str(first_col_name)
-                        
-                        # If the column name is still unclear, default to 'SKU'
-                        if clean_first_col_name in ['Unnamed: 0', '0', 'nan'] or 'Unnamed' in str(clean_first_col_name):
-                            clean_first_col_name = 'SKU'
-                        
-                        # Extract each metric type
-                        metrics = ['Sale', 'Quantity', 'COGS', 'Profit']
-                        
-                        for metric in metrics:
-                            try:
-                                # Get columns that have the metric in the second level
-                                metric_cols = [col for col in df.columns if len(col) > 1 and col[1] == metric]
-                                if metric_cols:
-                                    # Create dataframe with first column and metric columns
-                                    metric_df = pd.DataFrame()
-                                    
-                                    # Add the SKU/identifier column
-                                    metric_df[clean_first_col_name] = first_col_data
-                                    
-                                    # Add metric columns with month names
-                                    for col in metric_cols:
-                                        month = col[0]  # Month name from first level
-                                        metric_df[month] = df[col]
-                                    
-                                    # Clean the metric dataframe
-                                    metric_df = clean_dataframe(metric_df)
-                                    
-                                    # Ensure the first column is treated as SKU for consistency
-                                    if clean_first_col_name != 'SKU':
-                                        metric_df = metric_df.rename(columns={clean_first_col_name: 'SKU'})
-                                    
-                                    # Calculate Total and Average columns for the metric
-                                    metric_columns = [col for col in metric_df.columns if col != 'SKU']
-                                    if metric_columns:
-                                        # Calculate Total (sum of all months)
-                                        metric_df[f'Total {metric}'] = metric_df[metric_columns].sum(axis=1, skipna=True)
-                                        
-                                        # Calculate Average (mean of all months)
-                                        metric_df[f'Average {metric}'] = metric_df[metric_columns].mean(axis=1, skipna=True)
-                                    
-                                    dataframes[f"By Products - {metric}"] = metric_df
-                                    
-                            except Exception as e:
-                                st.warning(f"Error processing {metric} data: {str(e)}")
-                                st.exception(e)
-                        
-                        parsed_files.append(("Sales by Product Details Report", filename, "✅ (Split into metrics)"))
-                    else:
-                        # Fallback: treat as regular dataframe
-                        df = clean_dataframe(df)
-                        dataframes["Sales by Product Details Report"] = df
-                        parsed_files.append(("Sales by Product Details Report", filename, "✅"))
+                if digests and filename in digests:
+                    digest = digests[filename]
+                else:
+                    digest = snapshot_store.content_digest(file_content)
                 
+                report_type = detect_report_type(filename)
+                snapshot = snapshot_store.load_snapshot(digest, report_type)
+                if snapshot is not None:
+                    file_dataframes, status = snapshot
+                    results[position] = (file_dataframes, (report_type, filename, f"{status} (snapshot)"))
                 else:
-                    parsed_files.append(("Unknown", filename, "❌ (Pattern not recognized)"))
-                    
-            except Exception as e:
-                parsed_files.append(("Error", filename, f"❌ Error: {str(e)}"))
-        
-        return dataframes, parsed_files
-    
-    # Initialize session state for tracking processed files
-    if 'processed_files' not in st.session_state:
-        st.session_state.processed_files = {}
-    if 'file_status' not in st.session_state:
-        st.session_state.file_status = []
-    
-    # Process uploaded files only if they are new or changed
-    if uploaded_files:
-        # Create a hash of current files to detect changes
-        current_files_hash = {f.name: f.size for f in uploaded_files}
-        
-        # Check if files have changed
-        files_changed = current_files_hash != st.session_state.processed_files
+                    to_parse.append((position, filename, file_content, digest))
+            
+            # Parse the remaining files in parallel worker processes
+            parsed = parse_files_parallel([(filename, file_content) for _, filename, file_content, _ in to_parse])
+            for (position, _, _, digest), (file_dataframes, file_status, warnings) in zip(to_parse, parsed):
+                for warning in warnings:
+                    st.warning(warning)
+                report_type, _, status = file_status
+                snapshot_store.save_snapshot(digest, report_type, file_dataframes, status)
+                results[position] = (file_dataframes, file_status)
+            
+            # Merge in the original upload order
+            parsed_files = []
+            for file_dataframes, file_status in results:
+                dataframes.update(file_dataframes)
+                parsed_files.append(file_status)
+            
+            return dataframes, parsed_files
         
-        if files_changed:
-            with st.spinner("Processing files..."):
-                # Parse the files
-                new_dataframes, file_status = parse_uploaded_files(uploaded_files)
-                
-                # Update session state with new dataframes
-                st.session_state.dataframes.update(new_dataframes)
-                st.session_state.processed_files = current_files_hash
-                st.session_state.file_status = file_status
+        # Function to reload the dataframes of the last upload from snapshots
+        def load_last_snapshot():
+            dataframes = {}
+            parsed_files = []
+            
+            for filename, digest in snapshot_store.load_last_upload():
+                report_type = detect_report_type(filename)
+                snapshot = snapshot_store.load_snapshot(digest, report_type)
+                if snapshot is None:
+                    parsed_files.append(("Snapshot", filename, "❌ (Snapshot not found)"))
+                    continue
+                file_dataframes, status = snapshot
+                dataframes.update(file_dataframes)
+                parsed_files.append((report_type, filename, f"{status} (snapshot)"))
             
-            st.success(f"Successfully processed {len(uploaded_files)} file(s)")
-    
-    # Display file processing status if files have been processed
-    if st.session_state.file_status:
-        with st.expander("File Processing Status", expanded=True):
-            for report_type, filename, status in st.session_state.file_status:
-                col1, col2, col3 = st.columns([2, 3, 1])
-                with col1:
-                    st.write(f"**{report_type}**")
-                with col2:
-                    st.write(filename)
-                with col3:
-                    st.write(status)
+            return dataframes, parsed_files
         
-    # Display dataframes if any exist
-    if st.session_state.dataframes:
-        st.subheader("Available Datasets:")
+        # Initialize session state for tracking processed files
+        if 'processed_files' not in st.session_state:
+            st.session_state.processed_files = {}
+        if 'file_status' not in st.session_state:
+            st.session_state.file_status = []
         
-        # Dropdown to select dataframe
-        df_names = list(st.session_state.dataframes.keys())
-        selected_df_name = st.selectbox(
-            "Select a dataset to view:", 
-            df_names,
-            key="upload_df_selector"
-        )
+        # Reload the previous upload from on-disk snapshots without re-reading the files
+        if not uploaded_files and snapshot_store.load_last_upload():
+            if st.button("📂 Load last snapshot", help="Reload the most recent upload from local snapshots"):
+                with st.spinner("Loading snapshot..."):
+                    new_dataframes, file_status = load_last_snapshot()
+                    store_dataframes(new_dataframes)
+                    st.session_state.file_status = file_status
+                    
+                    if "Availability Report" in new_dataframes:
+                        refresh_session_topology(new_dataframes["Availability Report"])
+                    if any(name.startswith("By Products - ") for name in new_dataframes):
+                        st.session_state.sales_metrics = build_sales_metrics(st.session_state.dataframes)
+                
+                st.success(f"Loaded {len(new_dataframes)} dataset(s) from the last snapshot")
         
-        if selected_df_name:
-            # Use st.container to prevent unnecessary rerenders
-            with st.container():
-                df = st.session_state.dataframes[selected_df_name]
+        # Process uploaded files only if they are new or changed
+        if uploaded_files:
+            # Digest the content of each file to detect changes (same-size edits included)
+            current_digests = {f.name: snapshot_store.content_digest(f.getvalue()) for f in uploaded_files}
+            
+            # Only files whose content changed are re-parsed
+            changed_files = [f for f in uploaded_files if st.session_state.processed_files.get(f.name) != current_digests[f.name]]
+            
+            if changed_files:
+                with st.spinner(f"Processing {len(changed_files)} changed file(s)..."):
+                    # Parse the changed files
+                    new_dataframes, file_status = parse_uploaded_files(changed_files, current_digests)
+                    
+                    # Update session state with new dataframes; unchanged datasets are kept as they are
+                    store_dataframes(new_dataframes)
+                    
+                    # Index inventory positions once per Availability Report upload
+                    if "Availability Report" in new_dataframes:
+                        refresh_session_topology(new_dataframes["Availability Report"])
+                    
+                    # Aggregate the sales metrics once per Sales workbook upload
+                    if any(name.startswith("By Products - ") for name in new_dataframes):
+                        st.session_state.sales_metrics = build_sales_metrics(st.session_state.dataframes)
+                    
+                    # Keep the status rows of unchanged files, in upload order
+                    status_by_file = {row[1]: row for row in st.session_state.file_status}
+                    status_by_file.update({row[1]: row for row in file_status})
+                    st.session_state.file_status = [status_by_file[f.name] for f in uploaded_files if f.name in status_by_file]
+                    st.session_state.processed_files = current_digests
+                    snapshot_store.save_last_upload(current_digests.items())
                 
-                # Show basic info about the dataframe in collapsible section
-                with st.expander("Details", expanded=False):
-                    col1, col2, col3 = st.columns(3)
+                st.success(f"Successfully processed {len(changed_files)} changed file(s)")
+        
+        # Display file processing status if files have been processed
+        if st.session_state.file_status:
+            with st.expander("File Processing Status", expanded=True):
+                for report_type, filename, status in st.session_state.file_status:
+                    col1, col2, col3 = st.columns([2, 3, 1])
                     with col1:
-                        st.metric("Rows", len(df))
+                        st.write(f"**{report_type}**")
                     with col2:
-                        st.metric("Columns", len(df.columns))
+                        st.write(filename)
                     with col3:
-                        st.metric("Memory Usage", f"{df.memory_usage(deep=True).sum() / 1024:.1f} KB")
-                
-                # Display the dataframe
-                st.subheader(f"Data Preview: {selected_df_name}")
-                
-                # Use height parameter to optimize rendering for large dataframes
-                st.dataframe(df, use_container_width=True, height=400)
-                
-                # Option to download as CSV - cached to avoid regeneration
-                @st.cache_data
-                def convert_df_to_csv(dataframe):
-                    return dataframe.to_csv(index=False)
-                
-                csv = convert_df_to_csv(df)
-                st.download_button(
-                    label=f"Download {selected_df_name} as CSV",
-                    data=csv,
-                    file_name=f"{selected_df_name.replace(' ', '_').replace('-', '_')}.csv",
-                    mime='text/csv'
-                )
-    else:
-        if not uploaded_files:
-            st.info("👆 Please upload files to get started")
+                        st.write(status)
+        
+        # Warehouse / location topology, discovered from the Availability Report
+        if "Availability Report" in st.session_state.dataframes:
+            run_topology_editor()
+            
+        # Display dataframes if any exist
+        if st.session_state.dataframes:
+            st.subheader("Available Datasets:")
+            
+            # Dropdown to select dataframe
+            df_names = list(st.session_state.dataframes.keys())
+            selected_df_name = st.selectbox(
+                "Select a dataset to view:", 
+                df_names,
+                key="upload_df_selector"
+            )
+            
+            if selected_df_name:
+                # Use st.container to prevent unnecessary rerenders
+                with st.container():
+                    df = st.session_state.dataframes[selected_df_name]
+                    
+                    # Show basic info about the dataframe in collapsible section
+                    with st.expander("Details", expanded=False):
+                        col1, col2, col3 = st.columns(3)
+                        with col1:
+                            st.metric("Rows", len(df))
+                        with col2:
+                            st.metric("Columns", len(df.columns))
+                        with col3:
+                            st.metric("Memory Usage", f"{df.memory_usage(deep=True).sum() / 1024:.1f} KB")
+                    
+                    # Display the dataframe
+                    st.subheader(f"Data Preview: {selected_df_name}")
+                    
+                    # Use height parameter to optimize rendering for large dataframes
+                    st.dataframe(df, use_container_width=True, height=400)
+                    
+                    # Option to download as CSV - exported once per dataset content and cached
+                    fingerprint = st.session_state.dataframe_fingerprints.get(selected_df_name) or frame_fingerprint(df)
+                    csv = cached_export(fingerprint, 'csv', lambda: export_csv_bytes(df))
+                    st.download_button(
+                        label=f"Download {selected_df_name} as CSV",
+                        data=csv,
+                        file_name=f"{selected_df_name.replace(' ', '_').replace('-', '_')}.csv",
+                        mime='text/csv'
+                    )
         else:
-            st.warning("No recognized file patterns found in uploaded files")
+            if not uploaded_files:
+                st.info("👆 Please upload files to get started")
+            else:
+                st.warning("No recognized file patterns found in uploaded files")
+
+    # Lazy load modules to improve initial app load time
+    with tab2:
+        try:
+            import po_generation
+            po_generation.run_po_generation_tab()
+        except ImportError as e:
+            st.error(f"Error loading PO Generation module: {e}")
 
-# Lazy load modules to improve initial app load time
-with tab2:
-    try:
-        import po_generation
-        po_generation.run_po_generation_tab()
-    except ImportError as e:
-        st.error(f"Error loading PO Generation module: {e}")
+    with tab3:
+        try:
+            import assembly_order_generation
+            assembly_order_generation.run_assembly_order_generation()
+        except ImportError as e:
+            st.error(f"Error loading Assembly Order Generation module: {e}")
 
-with tab3:
-    try:
-        import assembly_order_generation
-        assembly_order_generation.run_assembly_order_generation()
-    except ImportError as e:
-        st.error(f"Error loading Assembly Order Generation module: {e}")
+    with tab4:
+        try:
+            import supplier_management
+            supplier_management.run_supplier_management()
+        except ImportError as e:
+            st.error(f"Error loading Supplier Management module: {e}")
 
-with tab4:
-    try:
-        import supplier_management
-        supplier_management.run_supplier_management()
-    except ImportError as e:
-        st.error(f"Error loading Supplier Management module: {e}")
+# Streamlit runs this script as __main__; the worker processes spawned by the engines
+# (see concurrency.map_warehouses, report_parsing.parse_files_parallel) import it as
+# __mp_main__ and must not render the page
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,680 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from bom_expansion import build_bom_expansion, draw_stock
+from concurrency import map_warehouses
+from inventory_index import build_inventory_index, get_location_matrix, get_warehouse_positions, lookup_inventory_position
+from report_schema import MissingReportError
+from sales_metrics import build_sales_metrics, get_metric_totals, get_month_columns
+from sales_velocity import DEFAULT_VELOCITY_MODEL, velocity_frame
+from transfer_planner import plan_transfers
+from warehouse_topology import get_warehouse_locations, get_warehouses
+
+logger = logging.getLogger(__name__)
+
+
+def calculate_sales_velocity(sales_df, sales_metrics=None, model=DEFAULT_VELOCITY_MODEL):
+    """Calculate average daily and monthly sales per SKU with a velocity model.
+
+    model is one of sales_velocity.VELOCITY_MODELS; the default 'legacy' model divides the
+    total by 6 months of 30 days. Quantities come from the sales_metrics cache (see
+    sales_metrics.build_sales_metrics) when it holds them, otherwise from sales_df.
+    """
+    if sales_metrics is None or 'Quantity' not in sales_metrics['metrics']:
+        if sales_df is None or len(sales_df) == 0:
+            return pd.DataFrame(columns=['SKU', 'avg_daily_sales', 'avg_monthly_sales'])
+        
+        # Aggregate the given frame (first column SKU, then months) the same way
+        sales_metrics = build_sales_metrics({'By Products - Quantity': sales_df})
+    
+    return velocity_frame(sales_metrics, model)
+
+def calculate_inventory_position(availability_df, sku, locations=None, inventory_index=None):
+    """Calculate total inventory position for a SKU across specified locations.
+
+    locations defaults to the NC warehouse's stock locations. Pass a prebuilt
+    inventory_index (see inventory_index.build_inventory_index) to avoid re-scanning the
+    Availability Report on every call.
+    """
+    if inventory_index is not None:
+        if locations is None:
+            locations = inventory_index['warehouse_locations'].get('NC', [])
+        return lookup_inventory_position(inventory_index, sku, locations)
+    
+    if availability_df is None or len(availability_df) == 0:
+        return {'on_hand': 0, 'on_order': 0, 'in_transit': 0, 'total_available': 0}
+    
+    # Use the exact column names from the Availability Report
+    sku_col = 'SKU'
+    location_col = 'Location'
+    on_hand_col = 'OnHand'
+    
+    # Check if required columns exist
+    missing_cols = []
+    for col_name, col_var in [('SKU', sku_col), ('Location', location_col), ('OnHand', on_hand_col)]:
+        if col_var not in availability_df.columns:
+            missing_cols.append(col_name)
+    
+    if missing_cols:
+        logger.warning("Missing columns in Availability Report: %s", missing_cols)
+        return {'on_hand': 0, 'on_order': 0, 'in_transit': 0, 'total_available': 0}
+    
+    # One-off lookup: index the report for this call only
+    return calculate_inventory_position(availability_df, sku, locations, build_inventory_index(availability_df))
+
+def get_replenish_skus(bom_df, inventory_df, availability_df, sales_velocity_df, warehouse='NC', inventory_index=None):
+    """Identify SKUs that need replenishment based on business rules"""
+    
+    if any(df is None or len(df) == 0 for df in [bom_df, inventory_df, availability_df, sales_velocity_df]):
+        return pd.DataFrame()
+    
+    if inventory_index is None:
+        inventory_index = build_inventory_index(availability_df)
+    
+    # Use the exact column names from the Inventory List
+    sku_col = 'ProductCode'  # SKU is called ProductCode in Inventory List
+    assembly_bom_col = 'AssemblyBOM'
+    auto_assembly_col = 'AutoAssemble'
+    auto_disassembly_col = 'AutoDisassemble'
+    
+    # Check if required columns exist
+    missing_cols = []
+    for col_name, col_var in [('ProductCode', sku_col), ('AssemblyBOM', assembly_bom_col), 
+                              ('AutoAssemble', auto_assembly_col), ('AutoDisassemble', auto_disassembly_col)]:
+        if col_var not in inventory_df.columns:
+            missing_cols.append(col_name)
+    
+    if missing_cols:
+        logger.warning("Missing columns in Inventory List: %s", missing_cols)
+        return pd.DataFrame()
+    
+    # Filter eligible SKUs from inventory list
+    try:
+        # ProductCode is already str and the flags are categoricals (report schema)
+        flag_cols = [sku_col, assembly_bom_col, auto_assembly_col, auto_disassembly_col]
+        inventory_flags = inventory_df[flag_cols]
+        
+        eligible_skus_filter = (
+            (inventory_flags[assembly_bom_col].str.upper() == 'YES') &
+            (inventory_flags[auto_assembly_col].str.upper() == 'NO') &
+            (inventory_flags[auto_disassembly_col].str.upper() == 'NO') &
+            (~inventory_flags[sku_col].isin(['2444', '4300', '3818', '2582']))
+        )
+        
+        eligible_skus = inventory_flags[eligible_skus_filter][sku_col].unique()
+            
+    except Exception as e:
+        logger.exception("Error filtering eligible SKUs: %s", e)
+        return pd.DataFrame()
+    
+    # Join eligible SKUs with the warehouse stock rollup and sales velocity in one pass
+    replenish_df = pd.DataFrame({'SKU': eligible_skus})
+    
+    warehouse_positions = get_warehouse_positions(inventory_index, warehouse)
+    position = warehouse_positions.reindex(replenish_df['SKU'])
+    on_hand = position['OnHand'].fillna(0).to_numpy()
+    on_order = position['OnOrder'].fillna(0).to_numpy()
+    in_transit = position['InTransit'].fillna(0).to_numpy()
+    available_in_warehouse = on_hand + on_order + in_transit
+    
+    # Use the first velocity row per SKU
+    velocity = sales_velocity_df.drop_duplicates(subset='SKU', keep='first').set_index('SKU')
+    velocity = velocity.reindex(replenish_df['SKU'])
+    avg_daily_sales = velocity['avg_daily_sales'].fillna(0).to_numpy()
+    avg_monthly_sales = velocity['avg_monthly_sales'].fillna(0).to_numpy()
+    
+    # Default days of stock
+    days_of_stock = 30  # Default value
+    
+    # Calculate replenishment need
+    target_inventory = avg_daily_sales * days_of_stock
+    replenishment_qty = np.maximum(0, target_inventory - available_in_warehouse)
+    
+    # Check if this SKU needs replenishment (using business logic from Analysis tab)
+    needs_replenishment = (available_in_warehouse + on_order) < avg_monthly_sales
+    selected = needs_replenishment & (replenishment_qty > 0)
+    
+    if not selected.any():
+        return pd.DataFrame()
+    
+    # Calculate quantity for assembly with reasonable bounds
+    # Round UP the difference as per google_sheets_rules.md line 82
+    base_calculation = avg_monthly_sales[selected] - available_in_warehouse[selected]
+    base_qty = np.where(base_calculation > 0, np.maximum(2, np.ceil(base_calculation)), 2)
+    
+    # Apply reasonable limits based on monthly sales velocity
+    # Cap at 3x monthly sales to prevent unrealistic quantities
+    max_reasonable_qty = np.maximum(10, np.ceil(avg_monthly_sales[selected] * 3))
+    
+    # Also consider a hard cap for very high-velocity items
+    absolute_max = 1000  # No single assembly order should exceed 1000 units
+    
+    qty_for_assembly = np.minimum(np.minimum(base_qty, max_reasonable_qty), absolute_max).astype(int)
+    
+    return pd.DataFrame({
+        'SKU': replenish_df['SKU'].to_numpy()[selected],
+        'avg_daily_sales': avg_daily_sales[selected],
+        'avg_monthly_sales': avg_monthly_sales[selected],
+        'available_in_warehouse': available_in_warehouse[selected],
+        'warehouse': warehouse,
+        'on_order': on_order[selected],
+        'target_inventory': target_inventory[selected],
+        'qty_for_assembly': qty_for_assembly
+    })
+
+def analyze_assembly_status(bom_df, availability_df, replenish_df, warehouse='NC', inventory_index=None, abc_df=None, bom_expansion=None):
+    """Analyze assembly feasibility for replenishment SKUs.
+
+    Component stock is shared: assemblies are allocated in priority order (ABC category,
+    then sales velocity) so two assemblies cannot both claim the same units. With a
+    bom_expansion (see bom_expansion.build_bom_expansion), short sub-assembly components
+    are built from their own components.
+    """
+    
+    if any(df is None or len(df) == 0 for df in [bom_df, availability_df, replenish_df]):
+        return []
+    
+    if inventory_index is None:
+        inventory_index = build_inventory_index(availability_df)
+    
+    # Use the exact column names from the BOM Report
+    product_sku_col = 'Product SKU'
+    component_sku_col = 'Component SKU'
+    quantity_col = 'Quantity'
+    
+    # Check if required columns exist
+    missing_cols = []
+    for col_name, col_var in [('Product SKU', product_sku_col), ('Component SKU', component_sku_col), 
+                              ('Quantity', quantity_col)]:
+        if col_var not in bom_df.columns:
+            missing_cols.append(col_name)
+    
+    if missing_cols:
+        logger.warning("Missing columns in BOM Report: %s", missing_cols)
+        return []
+    
+    # Explode replenish rows into one row per BOM component line
+    requirements = explode_bom_requirements(bom_df, replenish_df, inventory_index, warehouse)
+    if len(requirements) == 0:
+        return []
+    
+    # Net shared component stock across all assemblies
+    positions = get_warehouse_positions(inventory_index, warehouse)
+    stock = positions['OnHand'] + positions['OnOrder'] + positions['InTransit']
+    requirements, achievable_qty = allocate_shared_components(requirements, abc_df, stock, bom_expansion)
+    
+    # Group component rows back to assemblies
+    is_ready = requirements['status'] != 'Shortage'
+    row_groups = is_ready.groupby(requirements['row_id'], sort=False)
+    ready_components = row_groups.sum().to_dict()
+    total_components = row_groups.size().to_dict()
+    achievable_qty = achievable_qty.to_dict()
+    
+    # Build the list-of-dicts output for the display layer
+    component_columns = ['component_sku', 'component_name', 'qty_per_assembly', 'total_needed', 'available', 'allocated', 'built', 'shortage', 'status']
+    # Rows from column lists: to_dict('records') boxes every value separately
+    component_records = [dict(zip(component_columns, values)) for values in zip(*(requirements[col].tolist() for col in component_columns))]
+    first_rows = requirements.drop_duplicates(subset='row_id', keep='first')
+    
+    assembly_analysis = []
+    start = 0
+    for row in first_rows.itertuples(index=False):
+        count = int(total_components[row.row_id])
+        achievable = int(achievable_qty[row.row_id])
+        assembly_analysis.append({
+            'assembly_sku': row.assembly_sku,
+            'assembly_name': row.assembly_name,
+            'qty_for_assembly': row.qty_for_assembly,
+            'achievable_qty': achievable,
+            'assembly_status': "Ready for Production" if achievable >= row.qty_for_assembly else "Cannot Assemble",
+            'avg_daily_sales': row.avg_daily_sales,
+            'avg_monthly_sales': row.avg_monthly_sales,
+            'available_in_warehouse': row.available_in_warehouse,
+            'warehouse': row.warehouse,
+            'components': component_records[start:start + count],
+            'total_components': count,
+            'ready_components': int(ready_components[row.row_id])
+        })
+        start += count
+    
+    return assembly_analysis
+
+def explode_bom_requirements(bom_df, replenish_df, inventory_index, warehouse='NC'):
+    """Join replenish rows with their BOM lines and component availability.
+
+    Returns one row per (replenish row, BOM line) in replenish/BOM order with the
+    total component quantity needed, warehouse availability, shortage and status.
+    """
+    product_sku_col = 'Product SKU'
+    product_name_col = 'Product'
+    component_sku_col = 'Component SKU'
+    component_name_col = 'Component'
+    quantity_col = 'Quantity'
+    
+    # BOM SKU columns are str from the report schema
+    bom_lines = pd.DataFrame({
+        'assembly_sku': bom_df[product_sku_col],
+        'assembly_name': bom_df[product_name_col] if product_name_col in bom_df.columns else '',
+        'component_sku': bom_df[component_sku_col],
+        'component_name': bom_df[component_name_col] if component_name_col in bom_df.columns else '',
+        'qty_per_assembly': bom_df[quantity_col]
+    })
+    bom_lines['bom_order'] = np.arange(len(bom_lines))
+    
+    replenish_rows = replenish_df[['qty_for_assembly', 'avg_daily_sales', 'avg_monthly_sales', 'available_in_warehouse', 'warehouse']].copy()
+    replenish_rows['assembly_sku'] = replenish_df['SKU']
+    replenish_rows['row_id'] = np.arange(len(replenish_rows))
+    
+    requirements = replenish_rows.merge(bom_lines, on='assembly_sku', how='inner')
+    requirements = requirements.sort_values(['row_id', 'bom_order'], kind='stable').reset_index(drop=True)
+    
+    # Component availability comes from the warehouse rollup of the inventory index
+    positions = get_warehouse_positions(inventory_index, warehouse).reindex(requirements['component_sku'])
+    available = (
+        positions['OnHand'].fillna(0).to_numpy() +
+        positions['OnOrder'].fillna(0).to_numpy() +
+        positions['InTransit'].fillna(0).to_numpy()
+    )
+    
+    total_needed = requirements['qty_per_assembly'].to_numpy() * requirements['qty_for_assembly'].to_numpy()
+    requirements['total_needed'] = total_needed
+    requirements['available'] = available
+    requirements['shortage'] = np.maximum(0, total_needed - available)
+    requirements['status'] = np.where(available >= total_needed, 'Ready', 'Shortage')
+    
+    return requirements
+
+def allocate_shared_components(requirements, abc_df=None, stock=None, bom_expansion=None):
+    """Allocate component stock across competing assemblies in priority order.
+
+    Assemblies are served by ABC category (A, B, C, then unranked) and then by
+    avg_daily_sales, highest first. Each assembly gets the largest build quantity
+    (up to qty_for_assembly) its components allow from the stock left over by
+    higher-priority assemblies, and that stock is consumed before the next one.
+    stock is a SKU-indexed Series of available units; by default the 'available'
+    column of requirements is used. When bom_expansion is given, the shortfall of a
+    sub-assembly component is built from its own components (recursively).
+
+    Returns the requirements frame with 'available' replaced by the netted stock seen
+    by each assembly, 'allocated' (units taken from stock) and 'built' (sub-assemblies
+    to build) columns and recomputed shortage/status ('Ready', 'Build' or 'Shortage'),
+    plus a Series of achievable build quantities indexed by row_id.
+    """
+    # The BOM repeats each component once per location; allocate each component once per assembly
+    lines = requirements.drop_duplicates(subset=['row_id', 'component_sku'], keep='first')
+    
+    # Priority order of assemblies
+    assemblies = lines.drop_duplicates(subset='row_id')[['row_id', 'assembly_sku', 'avg_daily_sales', 'qty_for_assembly']].copy()
+    abc_rank = {'A': 0, 'B': 1, 'C': 2}
+    if abc_df is not None and len(abc_df) > 0:
+        categories = abc_df.drop_duplicates(subset='SKU').set_index('SKU')['abc_category']
+        assemblies['abc_rank'] = assemblies['assembly_sku'].map(categories).map(abc_rank).fillna(len(abc_rank))
+    else:
+        assemblies['abc_rank'] = len(abc_rank)
+    assemblies = assemblies.sort_values(['abc_rank', 'avg_daily_sales', 'row_id'], ascending=[True, False, True], kind='stable')
+    
+    # Stock as one array indexed by integer SKU code, covering the components of the
+    # sub-assemblies these lines can build (recursively)
+    children = bom_expansion['children'] if bom_expansion else {}
+    skus = pd.Index(lines['component_sku'].unique())
+    if children:
+        pending = [sku for sku in skus if sku in children]
+        reachable = set(pending)
+        while pending:
+            for child_sku, _ in children[pending.pop()]:
+                if child_sku not in reachable:
+                    reachable.add(child_sku)
+                    if child_sku in children:
+                        pending.append(child_sku)
+        skus = skus.append(pd.Index(sorted(reachable - set(skus))))
+        children = {sku: children[sku] for sku in reachable if sku in children}
+    if stock is None:
+        stock = lines.drop_duplicates(subset='component_sku').set_index('component_sku')['available']
+    remaining = stock.groupby(level=0).first().reindex(skus).fillna(0).to_numpy(dtype=float)
+    code_of = {sku: code for code, sku in enumerate(skus)}
+    child_codes = {
+        code_of[sku]: [(code_of[child_sku], float(qty)) for child_sku, qty in sku_children]
+        for sku, sku_children in children.items()
+    }
+    
+    # Contiguous slices of component lines per assembly (lines are ordered by row_id)
+    component_codes = lines['component_sku'].map(code_of).to_numpy()
+    line_rows = lines['row_id'].to_numpy()
+    qty_per = lines['qty_per_assembly'].to_numpy(dtype=float)
+    priority_rows = assemblies['row_id'].to_numpy()
+    qty_needed_all = assemblies['qty_for_assembly'].to_numpy(dtype=float)
+    starts = np.searchsorted(line_rows, priority_rows, side='left')
+    ends = np.searchsorted(line_rows, priority_rows, side='right')
+    
+    available_before = np.zeros(len(lines))
+    allocated = np.zeros(len(lines))
+    built = np.zeros(len(lines))
+    buildable = np.zeros(len(lines), dtype=bool)
+    achievable = np.zeros(len(assemblies), dtype=np.int64)
+    
+    # Stock is contended when several assemblies use it or it is part of a buildable sub-assembly
+    has_children = np.zeros(len(skus), dtype=bool)
+    has_children[list(child_codes)] = True
+    contended = np.bincount(component_codes, minlength=len(skus)) > 1
+    contended[list(child_codes)] = True
+    contended[[child for sku_children in child_codes.values() for child, _ in sku_children]] = True
+    line_priority = pd.Index(priority_rows).get_indexer(line_rows)
+    shared = np.zeros(len(assemblies), dtype=bool)
+    np.logical_or.at(shared, line_priority, contended[component_codes])
+    
+    # Assemblies without contended stock cannot take units from each other, so their
+    # build quantities are computed together: the scarcest component sets each one
+    alone = ~shared[line_priority]
+    stock_before = remaining[component_codes[alone]]
+    per = qty_per[alone]
+    consumed = per > 0
+    limit = np.full(len(assemblies), np.inf)
+    np.minimum.at(limit, line_priority[alone][consumed], np.floor(np.maximum(stock_before[consumed], 0) / per[consumed]))
+    build_qty = np.maximum(np.trunc(np.minimum(qty_needed_all, limit)), 0)
+    achievable[~shared] = build_qty[~shared]
+    available_before[alone] = stock_before
+    allocated[alone] = np.where(consumed, per * build_qty[line_priority[alone]], 0)
+    np.subtract.at(remaining, component_codes[alone], allocated[alone])
+    
+    # The others are served one at a time in priority order
+    for position in np.flatnonzero(shared):
+        qty_needed, start, end = qty_needed_all[position], starts[position], ends[position]
+        codes = component_codes[start:end]
+        per = qty_per[start:end]
+        stock_before = remaining[codes]
+        available_before[start:end] = stock_before
+        consumed = per > 0
+        
+        if not has_children[codes].any():
+            # Single-level: the scarcest component sets the build quantity
+            build_qty = qty_needed
+            if consumed.any():
+                build_qty = min(qty_needed, np.floor(np.maximum(stock_before[consumed], 0) / per[consumed]).min())
+            build_qty = max(0, int(build_qty))
+            allocated[start:end] = np.where(consumed, per * build_qty, 0)
+            remaining[codes] -= allocated[start:end]
+            achievable[position] = build_qty
+            continue
+        
+        # Multi-level: a short sub-assembly can be built from its components
+        for offset, code in enumerate(codes):
+            line_needed = per[offset] * qty_needed
+            if code in child_codes and stock_before[offset] < line_needed:
+                buildable[start + offset] = draw_stock(code, line_needed, remaining, {}, {}, child_codes)
+        
+        def draw_assembly(build_qty):
+            taken, sub_built = {}, {}
+            feasible = all(
+                draw_stock(code, per_unit * build_qty, remaining, taken, sub_built, child_codes)
+                for code, per_unit in zip(codes, per) if per_unit > 0
+            )
+            return feasible, taken, sub_built
+        
+        # Largest feasible build quantity (feasibility is monotone in the quantity)
+        low, high = 0, int(qty_needed)
+        if not draw_assembly(high)[0]:
+            high -= 1
+            while low < high:
+                mid = (low + high + 1) // 2
+                if draw_assembly(mid)[0]:
+                    low = mid
+                else:
+                    high = mid - 1
+        build_qty = max(high, 0)
+        
+        _, taken, sub_built = draw_assembly(build_qty)
+        line_needed = np.where(consumed, per * build_qty, 0)
+        allocated[start:end] = np.minimum(np.maximum(stock_before, 0), line_needed)
+        built[start:end] = [sub_built.get(code, 0) for code in codes]
+        for code, units in taken.items():
+            remaining[code] -= units
+        achievable[position] = build_qty
+    
+    # Broadcast the netted stock back to every BOM line of the assembly
+    allocation = pd.DataFrame({
+        'row_id': line_rows,
+        'component_sku': lines['component_sku'].to_numpy(),
+        'netted_available': available_before,
+        'allocated': allocated,
+        'built': built,
+        'buildable': buildable
+    })
+    requirements = requirements.drop(columns=['available']).merge(allocation, on=['row_id', 'component_sku'], how='left')
+    requirements = requirements.rename(columns={'netted_available': 'available'})
+    
+    total_needed = requirements['total_needed'].to_numpy()
+    available = requirements['available'].to_numpy()
+    requirements['shortage'] = np.maximum(0, total_needed - available)
+    requirements['status'] = np.select(
+        [available >= total_needed, requirements['buildable'].to_numpy()],
+        ['Ready', 'Build'],
+        'Shortage'
+    )
+    requirements = requirements.drop(columns=['buildable'])
+    
+    return requirements, pd.Series(achievable, index=priority_rows)
+
+# Armory stock above this is moved to Main while Main holds less than it
+ARMORY_TRANSFER_THRESHOLD = 20
+
+def generate_transfer_recommendations(availability_df, bom_df, warehouse='NC', inventory_index=None, threshold=ARMORY_TRANSFER_THRESHOLD):
+    """Generate recommendations for transfers between warehouse locations based on business logic.
+
+    Armory stock of SKUs that are not BOM components is moved to Main when the warehouse's
+    Armory locations hold more than threshold units and its Main locations less than
+    threshold: min(Armory - threshold, threshold - Main), from the Armory location holding
+    the most. OnHand is read from the inventory index's SKU x Location sums (duplicate
+    bin/batch rows already added up) as one SKU x location matrix. Returns the
+    recommendations sorted by quantity, largest first.
+    """
+    
+    if availability_df is None or len(availability_df) == 0:
+        return []
+    
+    # Check if required columns exist
+    if not all(col in availability_df.columns for col in ['SKU', 'Location', 'OnHand']):
+        return []
+    
+    if inventory_index is None:
+        inventory_index = build_inventory_index(availability_df)
+    
+    # Set warehouse-specific locations from the topology
+    topology = inventory_index['topology']
+    armory_locations = get_warehouse_locations(topology, warehouse, roles=['armory'])
+    main_locations = get_warehouse_locations(topology, warehouse, roles=['main'])
+    if not armory_locations or not main_locations:
+        return []
+    
+    # OnHand pivot: SKU x (Armory locations + Main locations)
+    skus, matrix = get_location_matrix(inventory_index, armory_locations + main_locations)
+    if len(skus) == 0:
+        return []
+    armory = matrix[:, :len(armory_locations)]
+    armory_total = armory.sum(axis=1)
+    main_total = matrix[:, len(armory_locations):].sum(axis=1)
+    
+    # Anti-join: BOM components stay in the Armory for assemblies
+    is_component = np.zeros(len(skus), dtype=bool)
+    if bom_df is not None and 'Component SKU' in bom_df.columns:
+        components = pd.Series(bom_df['Component SKU'].unique()).dropna().astype(str)
+        is_component = skus.isin(components)
+    
+    # Business logic: Transfer if >threshold in Armory AND not a BOM component AND <threshold in Main,
+    # never more than the source location holds
+    transfer_qty = np.minimum(np.minimum(armory_total - threshold, threshold - main_total), armory.max(axis=1))
+    selected = (armory_total > threshold) & ~is_component & (main_total < threshold) & (transfer_qty > 0)
+    if not selected.any():
+        return []
+    
+    skus = skus[selected]
+    product_names = pd.Series('', index=skus)
+    if 'ProductName' in availability_df.columns:
+        first_rows = availability_df.loc[availability_df['SKU'].isin(skus), ['SKU', 'ProductName']].drop_duplicates('SKU')
+        product_names = pd.Series(first_rows['ProductName'].to_numpy(), index=first_rows['SKU'].astype(str)).reindex(skus)
+    transfers = pd.DataFrame({
+        'sku': skus,
+        'product_name': product_names.to_numpy(),
+        'from_location': np.array(armory_locations, dtype=object)[armory[selected].argmax(axis=1)],
+        'to_location': main_locations[0],
+        'available_armory': armory_total[selected],
+        'current_main': main_total[selected],
+        'recommended_transfer': transfer_qty[selected],
+        'reason': 'Balance inventory (not needed for assemblies)'
+    })
+    transfers = transfers.sort_values(['recommended_transfer', 'sku'], ascending=[False, True], kind='stable')
+    return transfers.to_dict('records')
+
+def calculate_abc_analysis(profit_df, sales_metrics=None):
+    """Calculate ABC analysis based on cumulative profit (70-20-10 split).
+
+    Totals come from the sales_metrics cache when it holds Profit; otherwise the month
+    columns of profit_df are summed (never its computed Total/Average columns).
+    """
+    
+    if sales_metrics is not None and 'Profit' in sales_metrics['metrics']:
+        total_profit = get_metric_totals(sales_metrics, 'Profit')
+        sku_col = 'SKU'
+        profit_df_copy = pd.DataFrame({sku_col: total_profit.index.to_numpy(), 'total_profit': total_profit.to_numpy()})
+    else:
+        if profit_df is None or len(profit_df) == 0:
+            return pd.DataFrame()
+        
+        # Get the first column as SKU column
+        sku_col = profit_df.columns[0]
+        
+        # Get profit columns (exclude SKU column and Total/Average columns)
+        profit_columns = get_month_columns(profit_df)
+        
+        # Calculate total profit for each SKU
+        profit_df_copy = profit_df.copy()
+        profit_df_copy['total_profit'] = profit_df_copy[profit_columns].sum(axis=1, skipna=True)
+    
+    if len(profit_df_copy) == 0:
+        return pd.DataFrame()
+    
+    # Sort by total profit descending
+    profit_df_copy = profit_df_copy.sort_values('total_profit', ascending=False)
+    
+    # Calculate cumulative profit
+    profit_df_copy['cumulative_profit'] = profit_df_copy['total_profit'].cumsum()
+    total_profit = profit_df_copy['total_profit'].sum()
+    profit_df_copy['cumulative_percentage'] = profit_df_copy['cumulative_profit'] / total_profit
+    
+    # Assign ABC categories
+    profit_df_copy['abc_category'] = 'C'  # Default to C
+    profit_df_copy.loc[profit_df_copy['cumulative_percentage'] <= 0.70, 'abc_category'] = 'A'
+    profit_df_copy.loc[(profit_df_copy['cumulative_percentage'] > 0.70) & 
+                       (profit_df_copy['cumulative_percentage'] <= 0.90), 'abc_category'] = 'B'
+    
+    # Return simplified result
+    result = profit_df_copy[[sku_col, 'total_profit', 'abc_category']].copy()
+    result.columns = ['SKU', 'total_profit', 'abc_category']
+    
+    return result
+
+def _run_warehouse(shared, warehouse):
+    """Replenishment, feasibility and transfers of one warehouse (a map_warehouses worker)"""
+    bom_df = shared['bom_df']
+    availability_df = shared['availability_df']
+    inventory_index = shared['inventory_index']
+    replenish_df = get_replenish_skus(bom_df, shared['inventory_df'], availability_df, shared['sales_velocity_df'], warehouse, inventory_index)
+    return {
+        'replenish_df': replenish_df,
+        'assembly_analysis': analyze_assembly_status(bom_df, availability_df, replenish_df, warehouse, inventory_index,
+                                                     shared['abc_analysis'], shared['bom_expansion']),
+        'transfer_recommendations': generate_transfer_recommendations(availability_df, bom_df, warehouse, inventory_index),
+    }
+
+def run_assembly_pipeline(dataframes, warehouses=None, inventory_index=None, sales_metrics=None, velocity_model=DEFAULT_VELOCITY_MODEL,
+                          max_workers=None, transfer_rules=None):
+    """Run velocity, ABC, BOM expansion, replenishment, feasibility and transfers.
+
+    dataframes maps dataset name -> DataFrame as produced by report_parsing. Sales
+    velocity (with velocity_model, see sales_velocity.VELOCITY_MODELS) and ABC analysis
+    (read from the sales_metrics cache, built here when not given) and the BOM expansion are computed once and shared by the warehouses. Returns
+    a dict with 'sales_velocity', 'abc_analysis', 'bom_expansion' and, per warehouse,
+    {'replenish_df', 'assembly_analysis', 'transfer_recommendations'} under 'warehouses'.
+    warehouses defaults to every warehouse of the inventory index's topology; they are
+    processed in parallel worker processes (see concurrency.map_warehouses). 'transfer_plan' holds the
+    moves of the transfer_rules (see transfer_planner; defaults to the saved rules) across
+    all warehouses. Raises MissingReportError when a required report is missing.
+    """
+    for name in ['BOM Report', 'Availability Report', 'Inventory List', 'By Products - Quantity']:
+        if name not in dataframes:
+            raise MissingReportError(f"{name} not found. Please upload the required data.")
+    
+    bom_df = dataframes['BOM Report']
+    availability_df = dataframes['Availability Report']
+    inventory_df = dataframes['Inventory List']
+    
+    if inventory_index is None:
+        inventory_index = build_inventory_index(availability_df)
+    if warehouses is None:
+        warehouses = get_warehouses(inventory_index['topology'])
+    
+    # Shared between warehouses
+    if sales_metrics is None:
+        sales_metrics = build_sales_metrics(dataframes)
+    sales_velocity_df = calculate_sales_velocity(dataframes['By Products - Quantity'], sales_metrics, velocity_model)
+    profit_df = dataframes.get('By Products - Profit')
+    abc_analysis = calculate_abc_analysis(profit_df, sales_metrics) if profit_df is not None else pd.DataFrame()
+    bom_expansion = build_bom_expansion(bom_df, inventory_df)
+    if bom_expansion['cycles']:
+        logger.warning("BOM cycle detected; these SKUs are treated as raw components: %s", sorted(bom_expansion['cycles']))
+    
+    # Per-warehouse replenishment, feasibility and transfers run in parallel on the shared inputs
+    shared = {
+        'bom_df': bom_df,
+        'availability_df': availability_df,
+        'inventory_df': inventory_df,
+        'sales_velocity_df': sales_velocity_df,
+        'inventory_index': inventory_index,
+        'abc_analysis': abc_analysis,
+        'bom_expansion': bom_expansion,
+    }
+    
+    return {
+        'sales_velocity': sales_velocity_df,
+        'abc_analysis': abc_analysis,
+        'bom_expansion': bom_expansion,
+        'warehouses': map_warehouses(_run_warehouse, warehouses, shared, max_workers),
+        'transfer_plan': plan_transfers(inventory_index, transfer_rules, sales_velocity_df, bom_df, availability_df),
+    }
+
+def build_assembly_orders_df(assembly_analysis):
+    """Assembly Orders (Ready for Production) report"""
+    ready_assemblies = [a for a in assembly_analysis if a['assembly_status'] == 'Ready for Production']
+    if not ready_assemblies:
+        return pd.DataFrame()
+    return pd.DataFrame([{
+        'SKU': a['assembly_sku'],
+        'Assembly Name': a['assembly_name'],
+        'Quantity for Assembly': a['qty_for_assembly'],
+        'Available in Warehouse': a['available_in_warehouse'],
+        'Avg Monthly Sales': round(a['avg_monthly_sales'], 1)
+    } for a in ready_assemblies]).sort_values('Quantity for Assembly', ascending=False)
+
+def build_cannot_assemble_df(assembly_analysis):
+    """Cannot Assemble report; 'component_shortages' holds the short component dicts"""
+    cannot_assemble = [a for a in assembly_analysis if a['assembly_status'] == 'Cannot Assemble']
+    if not cannot_assemble:
+        return pd.DataFrame()
+    return pd.DataFrame([{
+        'SKU': a['assembly_sku'],
+        'Assembly Name': a['assembly_name'],
+        'Quantity Needed': a['qty_for_assembly'],
+        'Achievable Quantity': a['achievable_qty'],
+        'Available in Warehouse': a['available_in_warehouse'],
+        'Avg Monthly Sales': round(a['avg_monthly_sales'], 1),
+        'Components Ready': f"{a['ready_components']}/{a['total_components']}",
+        'Missing Components': len([c for c in a['components'] if c['status'] == 'Shortage']),
+        'component_shortages': [c for c in a['components'] if c['status'] == 'Shortage']
+    } for a in cannot_assemble])
+
+def build_transfer_df(transfer_recommendations):
+    """Transfer Recommendations report"""
+    if not transfer_recommendations:
+        return pd.DataFrame()
+    return pd.DataFrame(transfer_recommendations)
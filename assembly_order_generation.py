@@ -1,382 +1,16 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import math
+from assembly_engine import build_assembly_orders_df, build_cannot_assemble_df, build_transfer_df, run_assembly_pipeline
+from csv_export import cached_export, export_csv_bytes, export_zip, frame_fingerprint
+from inventory_index import build_inventory_index
+from sales_velocity import DEFAULT_VELOCITY_MODEL, VELOCITY_MODELS
+from streamlit_logging import show_engine_logs
+from topology_management import get_session_topology, get_session_warehouses
+from transfer_planner import split_transfer_orders
 
-def calculate_sales_velocity(sales_df):
-    """Calculate average daily sales from 6 months of data"""
-    if sales_df is None or len(sales_df) == 0:
-        return pd.DataFrame(columns=['SKU', 'avg_daily_sales', 'avg_monthly_sales'])
-    
-    # Debug: Show what data we're working with
-    # st.write(f"**Sales velocity calculation input:**")
-    # st.write(f"- DataFrame shape: {sales_df.shape}")
-    # st.write(f"- Columns: {list(sales_df.columns)}")
-    
-    # Get the first column as SKU column
-    sku_col = sales_df.columns[0]
-    
-    # Get sales columns (exclude SKU column and Total/Average columns)
-    sales_columns = [col for col in sales_df.columns if col != sku_col and not col.startswith('Total') and not col.startswith('Average')]
-    # st.write(f"- Using columns for calculation: {sales_columns}")
-    
-    result_df = sales_df.copy()
-    
-    # CRITICAL: Convert SKU column to string for consistent matching
-    result_df[sku_col] = result_df[sku_col].astype(str)
-    
-    # Calculate total sales for 6 months
-    result_df['total_6_months'] = result_df[sales_columns].sum(axis=1, skipna=True)
-    
-    # Calculate average daily sales: total ÷ 6 months ÷ 30 days
-    result_df['avg_daily_sales'] = result_df['total_6_months'] / 6 / 30
-    
-    # Calculate average monthly sales: total ÷ 6 months
-    result_df['avg_monthly_sales'] = result_df['total_6_months'] / 6
-    
-    result_df_final = result_df[[sku_col, 'avg_daily_sales', 'avg_monthly_sales']].rename(columns={sku_col: 'SKU'})
-    
-    # Ensure SKU column is string in final result
-    result_df_final['SKU'] = result_df_final['SKU'].astype(str)
-    
-    return result_df_final
-
-def calculate_inventory_position(availability_df, sku, locations=['NC - Main', 'NC - Armory', 'NC - FFL']):
-    """Calculate total inventory position for a SKU across specified locations"""
-    if availability_df is None or len(availability_df) == 0:
-        return {'on_hand': 0, 'on_order': 0, 'in_transit': 0, 'total_available': 0}
-    
-    # Use the exact column names from the Availability Report
-    sku_col = 'SKU'
-    location_col = 'Location'
-    on_hand_col = 'OnHand'
-    on_order_col = 'OnOrder'
-    in_transit_col = 'InTransit'
-    
-    # Check if required columns exist
-    missing_cols = []
-    for col_name, col_var in [('SKU', sku_col), ('Location', location_col), ('OnHand', on_hand_col)]:
-        if col_var not in availability_df.columns:
-            missing_cols.append(col_name)
-    
-    if missing_cols:
-        st.warning(f"Missing columns in Availability Report: {missing_cols}")
-        return {'on_hand': 0, 'on_order': 0, 'in_transit': 0, 'total_available': 0}
-    
-    # CRITICAL: Convert SKU columns to string for consistent matching
-    availability_df_copy = availability_df.copy()
-    availability_df_copy[sku_col] = availability_df_copy[sku_col].astype(str)
-    sku = str(sku)  # Ensure the input SKU is also a string
-    
-    # Filter for the specific SKU
-    sku_data = availability_df_copy[availability_df_copy[sku_col] == sku]
-    
-    if len(sku_data) == 0:
-        return {'on_hand': 0, 'on_order': 0, 'in_transit': 0, 'total_available': 0}
-    
-    # Filter for specified locations
-    location_data = sku_data[sku_data[location_col].isin(locations)]
-    
-    on_hand = location_data[on_hand_col].sum() if on_hand_col in location_data.columns else 0
-    on_order = location_data[on_order_col].sum() if on_order_col in location_data.columns else 0
-    in_transit = location_data[in_transit_col].sum() if in_transit_col in location_data.columns else 0
-    
-    return {
-        'on_hand': on_hand,
-        'on_order': on_order, 
-        'in_transit': in_transit,
-        'total_available': on_hand + on_order + in_transit
-    }
-
-def get_replenish_skus(bom_df, inventory_df, availability_df, sales_velocity_df, warehouse='NC'):
-    """Identify SKUs that need replenishment based on business rules"""
-    
-    if any(df is None or len(df) == 0 for df in [bom_df, inventory_df, availability_df, sales_velocity_df]):
-        return pd.DataFrame()
-    
-    # Use the exact column names from the Inventory List
-    sku_col = 'ProductCode'  # SKU is called ProductCode in Inventory List
-    assembly_bom_col = 'AssemblyBOM'
-    auto_assembly_col = 'AutoAssemble'
-    auto_disassembly_col = 'AutoDisassemble'
-    
-    # Check if required columns exist
-    missing_cols = []
-    for col_name, col_var in [('ProductCode', sku_col), ('AssemblyBOM', assembly_bom_col), 
-                              ('AutoAssemble', auto_assembly_col), ('AutoDisassemble', auto_disassembly_col)]:
-        if col_var not in inventory_df.columns:
-            missing_cols.append(col_name)
-    
-    if missing_cols:
-        st.warning(f"Missing columns in Inventory List: {missing_cols}")
-        return pd.DataFrame()
-    
-    # Filter eligible SKUs from inventory list
-    try:
-        # CRITICAL: Convert all relevant columns to string for consistent matching
-        inventory_df_copy = inventory_df.copy()
-        inventory_df_copy[sku_col] = inventory_df_copy[sku_col].astype(str)
-        inventory_df_copy[assembly_bom_col] = inventory_df_copy[assembly_bom_col].astype(str)
-        inventory_df_copy[auto_assembly_col] = inventory_df_copy[auto_assembly_col].astype(str)
-        inventory_df_copy[auto_disassembly_col] = inventory_df_copy[auto_disassembly_col].astype(str)
-        
-        eligible_skus_filter = (
-            (inventory_df_copy[assembly_bom_col].str.upper() == 'YES') &
-            (inventory_df_copy[auto_assembly_col].str.upper() == 'NO') &
-            (inventory_df_copy[auto_disassembly_col].str.upper() == 'NO') &
-            (~inventory_df_copy[sku_col].isin(['2444', '4300', '3818', '2582']))
-        )
-        
-        eligible_skus = inventory_df_copy[eligible_skus_filter][sku_col].unique()
-            
-    except Exception as e:
-        st.error(f"Error filtering eligible SKUs: {str(e)}")
-        st.exception(e)
-        return pd.DataFrame()
-    
-    replenish_list = []
-    
-    for sku in eligible_skus:
-        # CRITICAL: Ensure SKU is string for consistent matching
-        sku = str(sku)
-        
-        # Get inventory position for the specific warehouse
-        if warehouse == 'NC':
-            locations = ['NC - Main', 'NC - Armory', 'NC - FFL']
-        else:  # CA
-            locations = ['CA - Main', 'CA - Armory', 'CA - FFL']
-        
-        inv_position = calculate_inventory_position(availability_df, sku, locations)
-        
-        # Get sales velocity (ensure string matching)
-        sales_data = sales_velocity_df[sales_velocity_df['SKU'] == sku]
-        avg_daily_sales = sales_data['avg_daily_sales'].iloc[0] if len(sales_data) > 0 else 0
-        avg_monthly_sales = sales_data['avg_monthly_sales'].iloc[0] if len(sales_data) > 0 else 0
-        
-        # Default days of stock
-        days_of_stock = 30  # Default value
-        
-        # Calculate replenishment need
-        target_inventory = avg_daily_sales * days_of_stock
-        replenishment_qty = max(0, target_inventory - inv_position['total_available'])
-        
-        # Check if this SKU needs replenishment (using business logic from Analysis tab)
-        available_in_warehouse = inv_position['total_available']
-        needs_replenishment = (available_in_warehouse + inv_position['on_order']) < avg_monthly_sales
-        
-        if needs_replenishment and replenishment_qty > 0:
-            # Calculate quantity for assembly with reasonable bounds
-            # Round UP the difference as per google_sheets_rules.md line 82
-            base_calculation = avg_monthly_sales - available_in_warehouse
-            base_qty = max(2, math.ceil(base_calculation)) if base_calculation > 0 else 2
-            
-            # Apply reasonable limits based on monthly sales velocity
-            # Cap at 3x monthly sales to prevent unrealistic quantities
-            max_reasonable_qty = max(10, math.ceil(avg_monthly_sales * 3))
-            
-            # Also consider a hard cap for very high-velocity items
-            absolute_max = 1000  # No single assembly order should exceed 1000 units
-            
-            qty_for_assembly = min(base_qty, max_reasonable_qty, absolute_max)
-            
-            replenish_list.append({
-                'SKU': str(sku),  # Ensure SKU is stored as string
-                'avg_daily_sales': avg_daily_sales,
-                'avg_monthly_sales': avg_monthly_sales,
-                'available_in_warehouse': available_in_warehouse,
-                'warehouse': warehouse,
-                'on_order': inv_position['on_order'],
-                'target_inventory': target_inventory,
-                'qty_for_assembly': qty_for_assembly
-            })
-    
-    return pd.DataFrame(replenish_list)
-
-def analyze_assembly_status(bom_df, availability_df, replenish_df, warehouse='NC'):
-    """Analyze assembly feasibility for replenishment SKUs"""
-    
-    if any(df is None or len(df) == 0 for df in [bom_df, availability_df, replenish_df]):
-        return []
-    
-    # Use the exact column names from the BOM Report
-    product_sku_col = 'Product SKU'
-    product_name_col = 'Product'
-    component_sku_col = 'Component SKU'
-    component_name_col = 'Component'
-    quantity_col = 'Quantity'
-    
-    # Check if required columns exist
-    missing_cols = []
-    for col_name, col_var in [('Product SKU', product_sku_col), ('Component SKU', component_sku_col), 
-                              ('Quantity', quantity_col)]:
-        if col_var not in bom_df.columns:
-            missing_cols.append(col_name)
-    
-    if missing_cols:
-        st.warning(f"Missing columns in BOM Report: {missing_cols}")
-        return []
-    
-    assembly_analysis = []
-    
-    for _, replenish_row in replenish_df.iterrows():
-        assembly_sku = str(replenish_row['SKU'])  # Ensure string
-        qty_needed = replenish_row['qty_for_assembly']
-        
-        # CRITICAL: Convert BOM Product SKU column to string for matching
-        bom_df_copy = bom_df.copy()
-        bom_df_copy[product_sku_col] = bom_df_copy[product_sku_col].astype(str)
-        bom_df_copy[component_sku_col] = bom_df_copy[component_sku_col].astype(str)
-        
-        # Get BOM components for this assembly
-        assembly_components = bom_df_copy[bom_df_copy[product_sku_col] == assembly_sku]
-        
-        if len(assembly_components) == 0:
-            continue
-            
-        assembly_feasible = True
-        component_analysis = []
-        
-        for _, component in assembly_components.iterrows():
-            component_sku = str(component[component_sku_col])  # Ensure string
-            qty_per_assembly = component[quantity_col]
-            total_component_needed = qty_per_assembly * qty_needed
-            
-            # Get component inventory in warehouse locations
-            if warehouse == 'NC':
-                locations = ['NC - Main', 'NC - Armory', 'NC - FFL']
-            else:  # CA
-                locations = ['CA - Main', 'CA - Armory', 'CA - FFL']
-            
-            component_inv = calculate_inventory_position(availability_df, component_sku, locations)
-            
-            component_status = "Ready" if component_inv['total_available'] >= total_component_needed else "Shortage"
-            if component_status == "Shortage":
-                assembly_feasible = False
-            
-            component_analysis.append({
-                'component_sku': component_sku,
-                'component_name': component.get(component_name_col, '') if component_name_col else '',
-                'qty_per_assembly': qty_per_assembly,
-                'total_needed': total_component_needed,
-                'available': component_inv['total_available'],
-                'shortage': max(0, total_component_needed - component_inv['total_available']),
-                'status': component_status
-            })
-        
-        assembly_analysis.append({
-            'assembly_sku': assembly_sku,
-            'assembly_name': assembly_components.iloc[0].get(product_name_col, '') if product_name_col else '',
-            'qty_for_assembly': qty_needed,
-            'assembly_status': "Ready for Production" if assembly_feasible else "Cannot Assemble",
-            'avg_daily_sales': replenish_row['avg_daily_sales'],
-            'avg_monthly_sales': replenish_row['avg_monthly_sales'],
-            'available_in_warehouse': replenish_row['available_in_warehouse'],
-            'warehouse': replenish_row['warehouse'],
-            'components': component_analysis,
-            'total_components': len(component_analysis),
-            'ready_components': len([c for c in component_analysis if c['status'] == 'Ready'])
-        })
-    
-    return assembly_analysis
-
-def generate_transfer_recommendations(availability_df, bom_df, warehouse='NC'):
-    """Generate recommendations for transfers between warehouse locations based on business logic"""
-    
-    if availability_df is None or len(availability_df) == 0:
-        return []
-    
-    transfer_recommendations = []
-    
-    # Use exact column names from Availability Report
-    sku_col = 'SKU'
-    location_col = 'Location'
-    on_hand_col = 'OnHand'
-    product_name_col = 'ProductName'
-    
-    # Check if required columns exist
-    required_cols = [sku_col, location_col, on_hand_col]
-    if not all(col in availability_df.columns for col in required_cols):
-        return []
-    
-    # Get all SKUs that are BOM components (these should NOT be transferred)
-    bom_component_skus = set()
-    if bom_df is not None and 'Component SKU' in bom_df.columns:
-        bom_component_skus = set(bom_df['Component SKU'].astype(str).unique())
-    
-    # Set warehouse-specific locations
-    if warehouse == 'NC':
-        armory_location = 'NC - Armory'
-        main_location = 'NC - Main'
-        main_locations = ['NC - Main']
-    else:  # CA
-        armory_location = 'CA - Armory'
-        main_location = 'CA - Main'
-        main_locations = ['CA - Main']
-    
-    # Find items in Armory with >20 units that are NOT BOM components
-    armory_data = availability_df[availability_df[location_col] == armory_location]
-    
-    for _, item in armory_data.iterrows():
-        sku = str(item[sku_col])
-        on_hand_armory = item[on_hand_col]
-        
-        # Business logic: Transfer if >20 in Armory AND not a BOM component AND <20 in Main
-        if on_hand_armory > 20 and sku not in bom_component_skus:
-            # Check Main inventory for this SKU
-            main_inv = calculate_inventory_position(availability_df, sku, main_locations)
-            
-            if main_inv['on_hand'] < 20:
-                transfer_qty = min(on_hand_armory - 20, 20 - main_inv['on_hand'])
-                if transfer_qty > 0:
-                    transfer_recommendations.append({
-                        'sku': sku,
-                        'product_name': item.get(product_name_col, '') if product_name_col else '',
-                        'from_location': armory_location,
-                        'to_location': main_location,
-                        'available_armory': on_hand_armory,
-                        'current_main': main_inv['on_hand'],
-                        'recommended_transfer': transfer_qty,
-                        'reason': 'Balance inventory (not needed for assemblies)'
-                    })
-    
-    return transfer_recommendations
-
-def calculate_abc_analysis(profit_df):
-    """Calculate ABC analysis based on cumulative profit (70-20-10 split)"""
-    
-    if profit_df is None or len(profit_df) == 0:
-        return pd.DataFrame()
-    
-    # Get the first column as SKU column
-    sku_col = profit_df.columns[0]
-    
-    # Get profit columns (exclude SKU column)
-    profit_columns = [col for col in profit_df.columns if col != sku_col]
-    
-    # Calculate total profit for each SKU
-    profit_df_copy = profit_df.copy()
-    profit_df_copy['total_profit'] = profit_df_copy[profit_columns].sum(axis=1, skipna=True)
-    
-    # Sort by total profit descending
-    profit_df_copy = profit_df_copy.sort_values('total_profit', ascending=False)
-    
-    # Calculate cumulative profit
-    profit_df_copy['cumulative_profit'] = profit_df_copy['total_profit'].cumsum()
-    total_profit = profit_df_copy['total_profit'].sum()
-    profit_df_copy['cumulative_percentage'] = profit_df_copy['cumulative_profit'] / total_profit
-    
-    # Assign ABC categories
-    profit_df_copy['abc_category'] = 'C'  # Default to C
-    profit_df_copy.loc[profit_df_copy['cumulative_percentage'] <= 0.70, 'abc_category'] = 'A'
-    profit_df_copy.loc[(profit_df_copy['cumulative_percentage'] > 0.70) & 
-                       (profit_df_copy['cumulative_percentage'] <= 0.90), 'abc_category'] = 'B'
-    
-    # Return simplified result
-    result = profit_df_copy[[sku_col, 'total_profit', 'abc_category']].copy()
-    result.columns = ['SKU', 'total_profit', 'abc_category']
-    result['SKU'] = result['SKU'].astype(str)
-    
-    return result
+# Surface engine warnings (missing columns, BOM cycles) in the app
+show_engine_logs('assembly_engine')
+show_engine_logs('transfer_planner')
 
 def run_assembly_order_generation():
     """Main function for Assembly Order Generation processing"""
@@ -424,29 +58,31 @@ def run_assembly_order_generation():
     # Processing button
     st.subheader("🚀 Start Processing")
     
-    # Warehouse selection
+    # Warehouse selection (warehouses come from the topology in the Upload Database tab)
+    warehouses = get_session_warehouses()
     col1, col2 = st.columns(2)
     with col1:
         warehouse = st.selectbox(
             "Select Warehouse:",
-            ["All", "NC", "CA"],
+            ["All"] + warehouses,
             index=0,  # Default to "All"
-            help="Choose which warehouse to generate assembly orders for. 'All' processes both NC and CA."
+            help=f"Choose which warehouse to generate assembly orders for. 'All' processes {', '.join(warehouses)}."
         )
+    with col2:
+        velocity_label = st.selectbox(
+            "Sales Velocity Model:",
+            list(VELOCITY_MODELS.values()),
+            index=list(VELOCITY_MODELS).index(DEFAULT_VELOCITY_MODEL),
+            help="How average daily sales are computed from the Sales by Product Details Report. The calendar models use the report period's real month lengths.",
+            key="assembly_velocity_model"
+        )
+        velocity_model = {label: model for model, label in VELOCITY_MODELS.items()}[velocity_label]
     
     # Initialize session state for analysis results
-    if 'assembly_analysis_results_nc' not in st.session_state:
-        st.session_state.assembly_analysis_results_nc = None
-    if 'assembly_analysis_results_ca' not in st.session_state:
-        st.session_state.assembly_analysis_results_ca = None
-    if 'transfer_recommendations_nc' not in st.session_state:
-        st.session_state.transfer_recommendations_nc = None
-    if 'transfer_recommendations_ca' not in st.session_state:
-        st.session_state.transfer_recommendations_ca = None
-    if 'replenish_df_nc' not in st.session_state:
-        st.session_state.replenish_df_nc = None
-    if 'replenish_df_ca' not in st.session_state:
-        st.session_state.replenish_df_ca = None
+    for wh in warehouses:
+        for key in ['assembly_analysis_results', 'transfer_recommendations', 'replenish_df']:
+            if f'{key}_{wh.lower()}' not in st.session_state:
+                st.session_state[f'{key}_{wh.lower()}'] = None
     if 'sales_velocity_df' not in st.session_state:
         st.session_state.sales_velocity_df = None
     if 'abc_analysis' not in st.session_state:
@@ -456,10 +92,13 @@ def run_assembly_order_generation():
         if processing_enabled:
             with st.spinner("Processing assembly orders..."):
                 try:
-                    # Get dataframes
-                    bom_df = st.session_state.dataframes['BOM Report']
                     availability_df = st.session_state.dataframes['Availability Report'] 
-                    inventory_df = st.session_state.dataframes['Inventory List']
+                    
+                    # Inventory index is built once per Availability Report upload
+                    inventory_index = st.session_state.get('inventory_index')
+                    if inventory_index is None:
+                        inventory_index = build_inventory_index(availability_df, get_session_topology())
+                        st.session_state.inventory_index = inventory_index
                     
                     # Get sales data (prefer Quantity data)
                     quantity_df_name = None
@@ -483,52 +122,30 @@ def run_assembly_order_generation():
                             return
                     
                     # Run the analysis pipeline (processing only, no display)
+                    # Velocity, ABC analysis and the BOM expansion are computed once and shared
+                    # read-only; the warehouses themselves are processed in parallel worker processes
+                    pipeline_inputs = dict(st.session_state.dataframes)
+                    pipeline_inputs['By Products - Quantity'] = sales_df
+                    warehouses_to_process = warehouses if warehouse == 'All' else [warehouse]
+                    results = run_assembly_pipeline(
+                        pipeline_inputs, warehouses_to_process, inventory_index,
+                        st.session_state.get('sales_metrics'), velocity_model
+                    )
                     
-                    # Step 1: Calculate sales velocity (shared between warehouses)
-                    sales_velocity_df = calculate_sales_velocity(sales_df)
-                    st.session_state.sales_velocity_df = sales_velocity_df
-                    
-                    # Step 2: ABC Analysis (shared between warehouses)
-                    # Get profit data for ABC analysis
-                    profit_df = None
-                    for df_name in sales_dfs:
-                        if 'Profit' in df_name:
-                            profit_df = st.session_state.dataframes[df_name]
-                            break
-                    
-                    if profit_df is not None:
-                        abc_analysis = calculate_abc_analysis(profit_df)
-                        st.session_state.abc_analysis = abc_analysis
-                    else:
-                        st.session_state.abc_analysis = pd.DataFrame()
-                    
-                    # Determine which warehouses to process
-                    warehouses_to_process = ['NC', 'CA'] if warehouse == 'All' else [warehouse]
+                    st.session_state.sales_velocity_df = results['sales_velocity']
+                    st.session_state.abc_analysis = results['abc_analysis']
+                    st.session_state.transfer_plan = results['transfer_plan']
+                    st.session_state.transfer_plan_fingerprint = frame_fingerprint(results['transfer_plan'])
                     
-                    for wh in warehouses_to_process:
-                        # Step 3: Replenishment analysis
-                        replenish_df = get_replenish_skus(bom_df, inventory_df, availability_df, sales_velocity_df, wh)
-                        if wh == 'NC':
-                            st.session_state.replenish_df_nc = replenish_df
-                        else:
-                            st.session_state.replenish_df_ca = replenish_df
-                        
-                        # Step 4: Assembly feasibility analysis
-                        assembly_analysis = analyze_assembly_status(bom_df, availability_df, replenish_df, wh)
-                        if wh == 'NC':
-                            st.session_state.assembly_analysis_results_nc = assembly_analysis
-                        else:
-                            st.session_state.assembly_analysis_results_ca = assembly_analysis
-                        
-                        # Step 5: Transfer recommendations
-                        transfer_recommendations = generate_transfer_recommendations(availability_df, bom_df, wh)
-                        if wh == 'NC':
-                            st.session_state.transfer_recommendations_nc = transfer_recommendations
-                        else:
-                            st.session_state.transfer_recommendations_ca = transfer_recommendations
+                    for wh, wh_results in results['warehouses'].items():
+                        st.session_state[f'replenish_df_{wh.lower()}'] = wh_results['replenish_df']
+                        st.session_state[f'assembly_analysis_results_{wh.lower()}'] = wh_results['assembly_analysis']
+                        st.session_state[f'transfer_recommendations_{wh.lower()}'] = wh_results['transfer_recommendations']
+                        # New results: rebuild the report tables and exports on the next display
+                        st.session_state.pop(f'{wh.lower()}_report_cache', None)
                     
                     if warehouse == 'All':
-                        st.success("✅ Assembly order generation completed for both NC and CA warehouses!")
+                        st.success(f"✅ Assembly order generation completed for {', '.join(warehouses)} warehouses!")
                     else:
                         st.success(f"✅ {warehouse} Assembly order generation completed!")
                     
@@ -541,66 +158,79 @@ def run_assembly_order_generation():
     # Display results sections for both warehouses
     st.subheader("📋 Generated Reports")
     
-    # Tabs for NC and CA
-    nc_tab, ca_tab = st.tabs(["🏭 North Carolina (NC)", "🌴 California (CA)"])
+    # One tab per warehouse
+    warehouse_labels = {'NC': "🏭 North Carolina (NC)", 'CA': "🌴 California (CA)"}
+    if not warehouses:
+        st.info("No warehouses configured. Assign locations to warehouses in the Upload Database tab.")
+        return
+    warehouse_tabs = st.tabs([warehouse_labels.get(wh, f"🏭 {wh}") for wh in warehouses])
     
-    with nc_tab:
-        if st.session_state.assembly_analysis_results_nc is not None:
-            assembly_analysis = st.session_state.assembly_analysis_results_nc
-            
-            if len(assembly_analysis) > 0:
-                # NC Assembly Feasibility Analysis (first)
-                display_warehouse_feasibility("NC", assembly_analysis, "nc")
-                
-                st.subheader("📋 NC Assembly Reports")
-                
-                # Report selection dropdown with optimized rendering
-                report_type = st.selectbox(
-                    "Select NC Report to View:",
-                    [
-                        "Assembly Orders (Ready for Production)", 
-                        "Cannot Assemble Report", 
-                        "Transfer Recommendations"
-                    ],
-                    index=0,
-                    key="nc_assembly_report_type"
-                )
-                
-                # NC Reports display logic
-                display_warehouse_reports(assembly_analysis, st.session_state.transfer_recommendations_nc, "nc")
-            else:
-                st.info("No NC assembly data available. Please generate NC assembly orders first.")
-        else:
-            st.info("No NC assembly data available. Please generate NC assembly orders first.")
+    for wh, wh_tab in zip(warehouses, warehouse_tabs):
+        with wh_tab:
+            display_warehouse_tab(wh)
     
-    with ca_tab:
-        if st.session_state.assembly_analysis_results_ca is not None:
-            assembly_analysis = st.session_state.assembly_analysis_results_ca
-            
-            if len(assembly_analysis) > 0:
-                # CA Assembly Feasibility Analysis (first)
-                display_warehouse_feasibility("CA", assembly_analysis, "ca")
-                
-                st.subheader("📋 CA Assembly Reports")
-                
-                # Report selection dropdown with optimized rendering
-                report_type = st.selectbox(
-                    "Select CA Report to View:",
-                    [
-                        "Assembly Orders (Ready for Production)", 
-                        "Cannot Assemble Report", 
-                        "Transfer Recommendations"
-                    ],
-                    index=0,
-                    key="ca_assembly_report_type"
-                )
-                
-                # CA Reports display logic
-                display_warehouse_reports(assembly_analysis, st.session_state.transfer_recommendations_ca, "ca")
-            else:
-                st.info("No CA assembly data available. Please generate CA assembly orders first.")
-        else:
-            st.info("No CA assembly data available. Please generate CA assembly orders first.")
+    # Transfer orders of all transfer rules, across warehouses
+    if st.session_state.get('transfer_plan') is not None:
+        display_transfer_plan(st.session_state.transfer_plan)
+
+def display_transfer_plan(transfer_plan):
+    """Display the transfer rules' plan with one transfer order per source -> destination pair"""
+    
+    with st.expander("🔀 Transfer Orders (all transfer rules)", expanded=False):
+        st.caption("Rules are read from config/transfer_rules.csv: source and destination warehouse/role, stock to keep at the source "
+                   "and target stock at the destination (units or days of sales). Rules run in priority order and never move the same unit twice.")
+        if len(transfer_plan) == 0:
+            st.info("No transfers proposed by the transfer rules.")
+            return
+        
+        orders = split_transfer_orders(transfer_plan)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Transfer Orders", len(orders))
+        with col2:
+            st.metric("Lines", len(transfer_plan))
+        with col3:
+            st.metric("Units", f"{int(transfer_plan['Quantity'].sum()):,}")
+        
+        st.dataframe(transfer_plan, use_container_width=True, height=400)
+        
+        fingerprint = st.session_state.get('transfer_plan_fingerprint') or frame_fingerprint(transfer_plan)
+        st.download_button(
+            label="🗂️ Download Transfer Orders per Location Pair (ZIP)",
+            data=cached_export(fingerprint, 'transfer_zip', lambda: export_zip(orders, 'transfer_order')),
+            file_name="transfer_orders.zip",
+            mime='application/zip',
+            key="download_transfer_orders"
+        )
+
+def display_warehouse_tab(warehouse_name):
+    """Display the feasibility analysis and reports of one warehouse"""
+    
+    warehouse_key = warehouse_name.lower()
+    assembly_analysis = st.session_state.get(f'assembly_analysis_results_{warehouse_key}')
+    
+    if assembly_analysis is not None and len(assembly_analysis) > 0:
+        # Assembly Feasibility Analysis (first)
+        display_warehouse_feasibility(warehouse_name, assembly_analysis, warehouse_key)
+        
+        st.subheader(f"📋 {warehouse_name} Assembly Reports")
+        
+        # Report selection dropdown with optimized rendering
+        st.selectbox(
+            f"Select {warehouse_name} Report to View:",
+            [
+                "Assembly Orders (Ready for Production)", 
+                "Cannot Assemble Report", 
+                "Transfer Recommendations"
+            ],
+            index=0,
+            key=f"{warehouse_key}_assembly_report_type"
+        )
+        
+        # Reports display logic
+        display_warehouse_reports(assembly_analysis, st.session_state.get(f'transfer_recommendations_{warehouse_key}'), warehouse_key)
+    else:
+        st.info(f"No {warehouse_name} assembly data available. Please generate {warehouse_name} assembly orders first.")
 
 def display_warehouse_feasibility(warehouse_name, assembly_analysis, warehouse_key):
     """Display warehouse-specific assembly feasibility analysis"""
@@ -630,10 +260,7 @@ def display_warehouse_reports(assembly_analysis, transfer_recommendations, wareh
     """Display warehouse-specific reports"""
     
     # Get the report type from the appropriate selectbox
-    if warehouse_key == "nc":
-        report_type = st.session_state.get("nc_assembly_report_type", "Assembly Orders (Ready for Production)")
-    else:
-        report_type = st.session_state.get("ca_assembly_report_type", "Assembly Orders (Ready for Production)")
+    report_type = st.session_state.get(f"{warehouse_key}_assembly_report_type", "Assembly Orders (Ready for Production)")
     
     # Pre-compute all reports once and cache them in session state to prevent reloading
     cache_key = f"{warehouse_key}_report_cache"
@@ -642,48 +269,27 @@ def display_warehouse_reports(assembly_analysis, transfer_recommendations, wareh
             # Prepare all report DataFrames at once
             ready_assemblies = [a for a in assembly_analysis if a['assembly_status'] == 'Ready for Production']
             cannot_assemble = [a for a in assembly_analysis if a['assembly_status'] == 'Cannot Assemble']
+            assembly_df = build_assembly_orders_df(assembly_analysis)
+            cannot_assemble_df = build_cannot_assemble_df(assembly_analysis)
+            transfer_df = build_transfer_df(transfer_recommendations)
             
-            # Cache assembly orders DataFrame
-            assembly_df = pd.DataFrame()
-            if ready_assemblies:
-                assembly_df = pd.DataFrame([{
-                    'SKU': a['assembly_sku'],
-                    'Assembly Name': a['assembly_name'],
-                    'Quantity for Assembly': a['qty_for_assembly'],
-                    'Available in Warehouse': a['available_in_warehouse'],
-                    'Avg Monthly Sales': round(a['avg_monthly_sales'], 1)
-                } for a in ready_assemblies]).sort_values('Quantity for Assembly', ascending=False)
-            
-            # Cache cannot assemble DataFrame
-            cannot_assemble_df = pd.DataFrame()
-            if cannot_assemble:
-                cannot_assemble_df = pd.DataFrame([{
-                    'SKU': a['assembly_sku'],
-                    'Assembly Name': a['assembly_name'],
-                    'Quantity Needed': a['qty_for_assembly'],
-                    'Available in Warehouse': a['available_in_warehouse'],
-                    'Avg Monthly Sales': round(a['avg_monthly_sales'], 1),
-                    'Components Ready': f"{a['ready_components']}/{a['total_components']}",
-                    'Missing Components': len([c for c in a['components'] if c['status'] == 'Shortage']),
-                    'component_shortages': [c for c in a['components'] if c['status'] == 'Shortage']
-                } for a in cannot_assemble])
-            
-            # Cache transfer DataFrame
-            transfer_df = pd.DataFrame()
-            if transfer_recommendations and len(transfer_recommendations) > 0:
-                transfer_df = pd.DataFrame(transfer_recommendations)
-            
-            # Store all cached reports
+            # Store all cached reports, with the fingerprints their CSV exports are cached under
             st.session_state[cache_key] = {
                 'assembly_orders': assembly_df,
                 'cannot_assemble': cannot_assemble_df,
                 'transfer_recommendations': transfer_df,
                 'ready_assemblies': ready_assemblies,
-                'cannot_assemble_raw': cannot_assemble
+                'cannot_assemble_raw': cannot_assemble,
+                'fingerprints': {
+                    'assembly_orders': frame_fingerprint(assembly_df),
+                    'cannot_assemble': frame_fingerprint(cannot_assemble_df.drop(columns=['component_shortages'], errors='ignore')),
+                    'transfer_recommendations': frame_fingerprint(transfer_df),
+                }
             }
     
     # Get cached reports
     cached_reports = st.session_state[cache_key]
+    fingerprints = cached_reports['fingerprints']
     
     # Display selected report without recomputation
     if report_type == "Assembly Orders (Ready for Production)":
@@ -697,7 +303,7 @@ def display_warehouse_reports(assembly_analysis, transfer_recommendations, wareh
             st.dataframe(assembly_df, use_container_width=True, height=400)
             
             # Download button
-            csv = convert_assembly_to_csv(assembly_df, f"{warehouse_key}_ready_download")
+            csv = cached_export(fingerprints['assembly_orders'], 'csv', lambda: export_csv_bytes(assembly_df))
             st.download_button(
                 label="📥 Download Assembly Orders CSV",
                 data=csv,
@@ -740,7 +346,7 @@ def display_warehouse_reports(assembly_analysis, transfer_recommendations, wareh
                             st.dataframe(shortage_df, use_container_width=True)
             
             # Download button
-            csv = convert_cannot_assemble_to_csv(display_df, f"{warehouse_key}_cannot_download")
+            csv = cached_export(fingerprints['cannot_assemble'], 'csv', lambda: export_csv_bytes(display_df))
             st.download_button(
                 label="📥 Download Cannot Assemble Report CSV",
                 data=csv,
@@ -760,7 +366,7 @@ def display_warehouse_reports(assembly_analysis, transfer_recommendations, wareh
             st.dataframe(transfer_df, use_container_width=True, height=400)
             
             # Download button
-            csv = convert_transfer_to_csv(transfer_df, f"{warehouse_key}_transfer_download")
+            csv = cached_export(fingerprints['transfer_recommendations'], 'csv', lambda: export_csv_bytes(transfer_df))
             st.download_button(
                 label="📥 Download Transfer Recommendations CSV",
                 data=csv,
@@ -783,6 +389,7 @@ def display_warehouse_reports(assembly_analysis, transfer_recommendations, wareh
                 
                 st.write(f"**Assembly:** {selected_data['assembly_name']} ({selected_assembly})")
                 st.write(f"**Quantity Needed:** {selected_data['qty_for_assembly']}")
+                st.write(f"**Achievable Quantity:** {selected_data['achievable_qty']}")
                 st.write(f"**Status:** {selected_data['assembly_status']}")
                 st.write(f"**Warehouse:** {selected_data['warehouse']}")
                 
@@ -793,6 +400,8 @@ def display_warehouse_reports(assembly_analysis, transfer_recommendations, wareh
                     'Qty per Assembly': c['qty_per_assembly'],
                     'Total Needed': c['total_needed'],
                     'Available': c['available'],
+                    'Allocated': c['allocated'],
+                    'To Build': c['built'],
                     'Shortage': c['shortage'],
                     'Status': c['status']
                 } for c in selected_data['components']])
@@ -814,11 +423,6 @@ def create_assembly_df(assemblies_data, cache_key):
         'Avg Monthly Sales': round(a['avg_monthly_sales'], 1)
     } for a in assemblies_data]).sort_values('Quantity for Assembly', ascending=False)
 
-@st.cache_data  
-def convert_assembly_to_csv(dataframe, cache_key):
-    """Convert assembly DataFrame to CSV with caching"""
-    return dataframe.to_csv(index=False)
-
 @st.cache_data
 def create_cannot_assemble_df(assemblies_data, cache_key):
     """Create cannot assemble DataFrame with caching"""
@@ -826,6 +430,7 @@ def create_cannot_assemble_df(assemblies_data, cache_key):
         'SKU': a['assembly_sku'],
         'Assembly Name': a['assembly_name'],
         'Quantity Needed': a['qty_for_assembly'],
+        'Achievable Quantity': a['achievable_qty'],
         'Available in Warehouse': a['available_in_warehouse'],
         'Avg Monthly Sales': round(a['avg_monthly_sales'], 1),
         'Components Ready': f"{a['ready_components']}/{a['total_components']}",
@@ -833,13 +438,6 @@ def create_cannot_assemble_df(assemblies_data, cache_key):
         'component_shortages': [c for c in a['components'] if c['status'] == 'Shortage']
     } for a in assemblies_data])
 
-@st.cache_data
-def convert_cannot_assemble_to_csv(dataframe, cache_key):
-    """Convert cannot assemble DataFrame to CSV with caching"""
-    # Remove the component_shortages column for CSV export
-    export_df = dataframe.drop(columns=['component_shortages'], errors='ignore')
-    return export_df.to_csv(index=False)
-
 @st.cache_data
 def create_shortage_df(components_data, cache_key):
     """Create component shortage DataFrame with caching"""
@@ -855,8 +453,3 @@ def create_shortage_df(components_data, cache_key):
 def create_transfer_df(transfer_data, cache_key):
     """Create transfer DataFrame with caching"""
     return pd.DataFrame(transfer_data)
-
-@st.cache_data
-def convert_transfer_to_csv(dataframe, cache_key):
-    """Convert transfer DataFrame to CSV with caching"""
-    return dataframe.to_csv(index=False)
@@ -0,0 +1,309 @@
+"""Headless benchmark of the PO and assembly engines.
+
+    python benchmark.py [reports_dir] [--scale 1 10 100] [--output benchmark.json] [--baseline OLD.json]
+
+Parses the report exports in reports_dir (default: the sample exports in data/), then
+times every stage of PO and assembly generation on them and on synthetic scale-ups with
+10x, 100x ... the SKUs. Each stage is run --repeat times for its time and once more under
+tracemalloc for the peak memory it allocates. Results are written as JSON so runs can be
+compared with --baseline. Does not import streamlit.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import assembly_engine
+import csv_export
+import po_engine
+import supplier_exclusions
+import warehouse_topology
+from bom_expansion import build_bom_expansion
+from inventory_index import build_inventory_index
+from report_parsing import parse_file_content
+from report_schema import apply_report_schema, get_report_schema
+from sales_metrics import build_sales_metrics
+from transfer_planner import load_transfer_rules, plan_transfers
+
+logger = logging.getLogger('benchmark')
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# Copy k of a scaled-up catalog gets SKU '<sku>~k'; copy 0 keeps the original SKUs
+SCALE_SUFFIX = '~'
+
+def load_reports(reports_dir, measure):
+    """Parse every .xlsx/.csv export of reports_dir, timing each file as a 'parse' stage"""
+    dataframes = {}
+    for filename in sorted(os.listdir(reports_dir)):
+        path = os.path.join(reports_dir, filename)
+        if not filename.endswith(('.xlsx', '.csv')) or not os.path.isfile(path):
+            continue
+        with open(path, 'rb') as f:
+            file_content = f.read()
+        file_dataframes, (report_type, _, status), _ = measure('parse', lambda: parse_file_content(filename, file_content), detail=filename)
+        if report_type == 'Unknown':
+            # Not a report export
+            measure.stages.pop()
+            continue
+        if report_type == 'Error':
+            logger.warning("%s: %s", filename, status)
+        dataframes.update(file_dataframes)
+    return dataframes
+
+def synthesize_inventory_list(dataframes):
+    """Inventory List for exports that come without one.
+
+    Lists every SKU of the BOM, replenishment and availability reports; BOM products are
+    assemblies (AssemblyBOM = Yes, no auto assembly) and each SKU is supplied by the first
+    vendor the replenishment report lists for it.
+    """
+    bom_df = dataframes.get('BOM Report', pd.DataFrame(columns=['Product SKU', 'Component SKU']))
+    replenishment = pd.concat(
+        [df[['SKU', 'Name', 'Vendors']] for name, df in dataframes.items() if name.startswith('Replenishment Report - ')]
+        or [pd.DataFrame(columns=['SKU', 'Name', 'Vendors'])]
+    ).drop_duplicates('SKU').set_index('SKU')
+    availability = dataframes.get('Availability Report', pd.DataFrame(columns=['SKU', 'ProductName']))
+
+    skus = pd.Index(pd.concat([
+        bom_df['Product SKU'], bom_df['Component SKU'], replenishment.index.to_series(), availability['SKU']
+    ], ignore_index=True).astype(str).unique())
+    names = replenishment['Name'].reindex(skus)
+    names = names.fillna(availability.drop_duplicates('SKU').set_index('SKU')['ProductName'].reindex(skus))
+    vendors = replenishment['Vendors'].reindex(skus).astype(object).str.split(',').str[0].str.strip()
+
+    inventory_df = pd.DataFrame({
+        'ProductCode': skus,
+        'Name': names.to_numpy(),
+        'AssemblyBOM': np.where(skus.isin(bom_df['Product SKU'].astype(str)), 'Yes', 'No'),
+        'AutoAssemble': 'No',
+        'AutoDisassemble': 'No',
+        'LastSuppliedBy': vendors.to_numpy(),
+    })
+    return apply_report_schema('Inventory List', inventory_df)
+
+def scale_dataframes(dataframes, factor):
+    """Copy of the parsed reports with factor times the SKUs.
+
+    Every row is repeated once per copy with the copy's suffix on all its SKU columns, so
+    BOMs, stock and sales keep their shape across copies.
+    """
+    if factor == 1:
+        return dataframes
+    suffixes = np.array([''] + [f'{SCALE_SUFFIX}{k}' for k in range(1, factor)], dtype=object)
+    scaled = {}
+    for name, df in dataframes.items():
+        schema = get_report_schema(name)
+        sku_cols = schema['sku'] if schema is not None else []
+        copy = pd.concat([df] * factor, ignore_index=True)
+        row_suffixes = np.repeat(suffixes, len(df))
+        for col in sku_cols:
+            if col in copy.columns:
+                copy[col] = copy[col].astype(str).to_numpy(dtype=object) + row_suffixes
+        copy.attrs = dict(df.attrs)
+        scaled[name] = copy
+    return scaled
+
+class StageTimer:
+    """Collects per-stage timings and peak memory"""
+
+    def __init__(self, repeat=1, trace_memory=True):
+        self.repeat = repeat
+        self.trace_memory = trace_memory
+        self.stages = []
+
+    def __call__(self, stage, func, warehouse=None, detail=None):
+        """Run func for one stage and record it; returns func's result"""
+        times = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            result = func()
+            times.append(time.perf_counter() - start)
+
+        peak_mb = None
+        if self.trace_memory:
+            tracemalloc.start()
+            baseline = tracemalloc.get_traced_memory()[0]
+            result = func()
+            peak_mb = (tracemalloc.get_traced_memory()[1] - baseline) / 2**20
+            tracemalloc.stop()
+
+        self.stages.append({
+            'stage': stage,
+            'warehouse': warehouse,
+            'detail': detail,
+            'seconds': min(times),
+            'runs': times,
+            'peak_mb': peak_mb,
+        })
+        logger.info("%s%s: %.3fs%s", stage, f" [{warehouse or detail}]" if warehouse or detail else '', min(times),
+                    f", peak {peak_mb:.1f} MB" if peak_mb is not None else '')
+        return result
+
+def run_stages(dataframes, measure, topology_file=warehouse_topology.TOPOLOGY_FILE):
+    """Time the engine stages on parsed reports, in the order the app runs them"""
+    availability_df = dataframes['Availability Report']
+    bom_df = dataframes['BOM Report']
+    inventory_df = dataframes['Inventory List']
+    topology = warehouse_topology.discover_topology(availability_df['Location'], warehouse_topology.load_topology(topology_file))
+    warehouses = warehouse_topology.get_warehouses(topology)
+    excluded_suppliers = supplier_exclusions.read_excluded_suppliers()
+    rules = po_engine.load_velocity_rules()
+    transfer_rules = load_transfer_rules()
+
+    sales_metrics = measure('sales_metrics', lambda: build_sales_metrics(dataframes))
+    inventory_index = measure('inventory_index', lambda: build_inventory_index(availability_df, topology))
+    sales_velocity_df = measure('sales_velocity', lambda: assembly_engine.calculate_sales_velocity(dataframes['By Products - Quantity'], sales_metrics))
+    abc_df = measure('abc_analysis', lambda: assembly_engine.calculate_abc_analysis(dataframes['By Products - Profit'], sales_metrics))
+    bom_expansion = measure('bom_expansion', lambda: build_bom_expansion(bom_df, inventory_df))
+
+    exports = []
+    for warehouse in warehouses:
+        replenish_df = measure('get_replenish_skus', lambda: assembly_engine.get_replenish_skus(
+            bom_df, inventory_df, availability_df, sales_velocity_df, warehouse, inventory_index), warehouse)
+        analysis = measure('analyze_assembly_status', lambda: assembly_engine.analyze_assembly_status(
+            bom_df, availability_df, replenish_df, warehouse, inventory_index, abc_df, bom_expansion), warehouse)
+        transfers = measure('transfers', lambda: assembly_engine.generate_transfer_recommendations(
+            availability_df, bom_df, warehouse, inventory_index), warehouse)
+        exports += [
+            (f'assembly_orders_{warehouse}', assembly_engine.build_assembly_orders_df(analysis)),
+            (f'cannot_assemble_{warehouse}', assembly_engine.build_cannot_assemble_df(analysis)),
+            (f'transfers_{warehouse}', assembly_engine.build_transfer_df(transfers)),
+        ]
+    measure('transfer_plan', lambda: plan_transfers(inventory_index, transfer_rules, sales_velocity_df, bom_df, availability_df))
+
+    for warehouse in warehouses:
+        if f'Replenishment Report - {warehouse}' not in dataframes:
+            continue
+        po_data = measure('run_po_generation', lambda: po_engine.run_po_generation(
+            dataframes, warehouse, excluded_suppliers, rules, topology, sales_metrics), warehouse)
+        exports.append((f'purchase_order_{warehouse}', po_data))
+
+    rows = sum(len(df) for _, df in exports)
+    measure('csv_export', lambda: [csv_export.export_csv_bytes(df) for _, df in exports], detail=f'{len(exports)} files, {rows} rows')
+
+def get_git_revision():
+    """Short commit hash of the working tree, or None outside a git checkout"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmark(reports_dir=DATA_DIR, scales=(1, 10), repeat=1, trace_memory=True):
+    """Benchmark the stages at each scale; returns the JSON-serializable results"""
+    parse_timer = StageTimer(repeat, trace_memory)
+    dataframes = load_reports(reports_dir, parse_timer)
+    if 'Inventory List' not in dataframes:
+        logger.info("No Inventory List in %s; synthesizing one from the other reports.", reports_dir)
+        dataframes['Inventory List'] = synthesize_inventory_list(dataframes)
+
+    runs = []
+    for factor in scales:
+        scaled = scale_dataframes(dataframes, factor)
+        timer = StageTimer(repeat, trace_memory)
+        if factor == 1:
+            timer.stages.extend(parse_timer.stages)
+        logger.info("Scale %dx: %s", factor, ', '.join(f"{name} {len(df)} rows" for name, df in scaled.items()))
+        run_stages(scaled, timer)
+        runs.append({
+            'scale': factor,
+            'skus': int(scaled['Inventory List']['ProductCode'].nunique()),
+            'rows': {name: len(df) for name, df in scaled.items()},
+            'total_seconds': sum(stage['seconds'] for stage in timer.stages),
+            'stages': timer.stages,
+        })
+        del scaled
+
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'revision': get_git_revision(),
+        'reports_dir': os.path.abspath(reports_dir),
+        'repeat': repeat,
+        'environment': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'runs': runs,
+    }
+
+def _stage_key(stage):
+    return (stage['stage'], stage['warehouse'], stage['detail'] if stage['stage'] == 'parse' else None)
+
+def compare_results(baseline, results):
+    """Rows of (scale, stage, warehouse or detail, baseline seconds, seconds, speedup) for stages in both runs"""
+    rows = []
+    baseline_runs = {run['scale']: run for run in baseline.get('runs', [])}
+    for run in results['runs']:
+        if run['scale'] not in baseline_runs:
+            continue
+        old_stages = {_stage_key(stage): stage for stage in baseline_runs[run['scale']]['stages']}
+        for stage in run['stages']:
+            old = old_stages.get(_stage_key(stage))
+            if old is None:
+                continue
+            speedup = old['seconds'] / stage['seconds'] if stage['seconds'] > 0 else None
+            rows.append((run['scale'], stage['stage'], stage['warehouse'] or stage['detail'] or '', old['seconds'], stage['seconds'], speedup))
+    return rows
+
+def print_summary(results, baseline=None):
+    for run in results['runs']:
+        print(f"\nScale {run['scale']}x ({run['skus']} SKUs): {run['total_seconds']:.2f}s")
+        for stage in run['stages']:
+            label = f"{stage['stage']} [{stage['warehouse'] or stage['detail']}]" if stage['warehouse'] or stage['detail'] else stage['stage']
+            peak = f"{stage['peak_mb']:9.1f} MB" if stage['peak_mb'] is not None else ''
+            print(f"  {label:<70} {stage['seconds']:9.3f}s {peak}")
+    if baseline is not None:
+        print(f"\nCompared with {baseline.get('revision') or 'baseline'} ({baseline.get('created')}):")
+        for scale, stage, label, old_seconds, seconds, speedup in compare_results(baseline, results):
+            ratio = f"{speedup:6.2f}x" if speedup is not None else '     -'
+            print(f"  {scale:>4}x {stage + (f' [{label}]' if label else ''):<64} {old_seconds:9.3f}s -> {seconds:9.3f}s {ratio}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time every stage of PO and assembly generation, headless.")
+    parser.add_argument('reports_dir', nargs='?', default=DATA_DIR, help="Directory with the report exports (default: the sample exports in data/)")
+    parser.add_argument('--scale', nargs='+', type=int, default=[1, 10], help="SKU multipliers to benchmark (default: 1 10)")
+    parser.add_argument('--repeat', type=int, default=1, help="Timed runs per stage; the fastest is reported (default: 1)")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc run that measures peak memory per stage")
+    parser.add_argument('--output', default='benchmark.json', help="JSON file for the results (default: ./benchmark.json)")
+    parser.add_argument('--baseline', help="Earlier results JSON to compare against")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Log each stage as it finishes")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format='%(levelname)s %(name)s: %(message)s')
+    # Engine progress messages would drown the stage timings
+    logging.getLogger().handlers[0].addFilter(lambda record: record.name == 'benchmark' or record.levelno >= logging.WARNING)
+
+    if not os.path.isdir(args.reports_dir):
+        parser.error(f"{args.reports_dir} is not a directory")
+    if any(factor < 1 for factor in args.scale) or args.repeat < 1:
+        parser.error("--scale and --repeat must be at least 1")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results = run_benchmark(args.reports_dir, args.scale, args.repeat, not args.no_memory)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print_summary(results, baseline)
+    print(f"\nResults written to {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import math
+
+def build_bom_expansion(bom_df, inventory_df=None):
+    """Build the multi-level BOM expansion cache for one run.
+
+    A component is expandable when it has AssemblyBOM = Yes in the Inventory List and has
+    its own lines in the BOM Report. Every expandable SKU is expanded exactly once.
+
+    Returns a dict with:
+    - 'children': {sku: [(component_sku, qty_per_unit), ...]} for expandable SKUs
+    - 'cycles': SKUs found on a BOM cycle; they are treated as raw components
+    """
+    expansion = {'children': {}, 'cycles': set()}
+
+    if bom_df is None or len(bom_df) == 0:
+        return expansion
+    if not all(col in bom_df.columns for col in ['Product SKU', 'Component SKU', 'Quantity']):
+        return expansion
+
+    # The BOM repeats every component once per location; keep one line per product/component
+    lines = bom_df[['Product SKU', 'Component SKU', 'Quantity']]
+    lines = lines.drop_duplicates(subset=['Product SKU', 'Component SKU'], keep='first')
+
+    bom_children = {}
+    for product_sku, component_sku, qty in lines.itertuples(index=False, name=None):
+        bom_children.setdefault(product_sku, []).append((component_sku, qty))
+
+    # Only components flagged as assemblies in the Inventory List are expanded
+    if inventory_df is not None and 'ProductCode' in inventory_df.columns and 'AssemblyBOM' in inventory_df.columns:
+        flags = inventory_df[['ProductCode', 'AssemblyBOM']]
+        assembly_skus = set(flags.loc[flags['AssemblyBOM'].str.upper() == 'YES', 'ProductCode'])
+    else:
+        assembly_skus = set(bom_children)
+
+    def is_expandable(sku):
+        return sku in assembly_skus and sku in bom_children
+
+    # Iterative depth-first search over the expandable SKUs; back edges are cycles
+    visiting, done = set(), set()
+    order, cycles = [], set()
+    for root in bom_children:
+        if root in done:
+            continue
+        stack = [(root, iter(bom_children[root]))]
+        path = [root]
+        visiting.add(root)
+        while stack:
+            sku, children = stack[-1]
+            advanced = False
+            for child_sku, _ in children:
+                if not is_expandable(child_sku) or child_sku in done:
+                    continue
+                if child_sku in visiting:
+                    cycles.update(path[path.index(child_sku):])
+                    continue
+                visiting.add(child_sku)
+                path.append(child_sku)
+                stack.append((child_sku, iter(bom_children[child_sku])))
+                advanced = True
+                break
+            if not advanced:
+                stack.pop()
+                path.pop()
+                visiting.discard(sku)
+                done.add(sku)
+                if is_expandable(sku):
+                    order.append(sku)
+
+    expansion['children'] = {sku: bom_children[sku] for sku in order if sku not in cycles}
+    expansion['cycles'] = cycles
+    return expansion
+
+def draw_stock(sku, qty, stock, taken, built, children):
+    """Take qty units of a SKU from stock, building any shortfall from its components.
+
+    stock maps every SKU reachable from sku to the units available before this draw (a
+    dict or an array indexed by SKU code); taken and built accumulate the units drawn from
+    stock and the sub-assemblies built. Returns False when the shortfall cannot be covered.
+    """
+    on_hand = max(stock[sku] - taken.get(sku, 0), 0)
+    take = min(on_hand, qty)
+    if take > 0:
+        taken[sku] = taken.get(sku, 0) + take
+
+    shortfall = qty - take
+    if shortfall <= 0:
+        return True
+    if sku not in children:
+        return False
+
+    # Build whole sub-assemblies for the shortfall
+    build_qty = math.ceil(shortfall)
+    built[sku] = built.get(sku, 0) + build_qty
+    for child_sku, qty_per_unit in children[sku]:
+        if not draw_stock(child_sku, qty_per_unit * build_qty, stock, taken, built, children):
+            return False
+    return True
@@ -0,0 +1,186 @@
+"""Headless batch run of PO and assembly generation.
+
+    python cli.py <reports_dir> [--output-dir DIR] [--warehouse NC CA] [--topology CSV]
+
+Reads the report exports in reports_dir (same filename patterns as the Upload tab) and
+writes the Cin7 purchase order CSVs and the assembly / cannot-assemble / transfer CSVs
+for each warehouse of the warehouse topology. Does not import streamlit, so it can run from cron.
+"""
+import argparse
+import logging
+import os
+import sys
+
+import assembly_engine
+import po_engine
+import po_optimization
+import csv_export
+import supplier_exclusions
+import transfer_planner
+import warehouse_topology
+from inventory_index import build_inventory_index
+from report_parsing import parse_files_parallel
+from report_schema import MissingReportError
+from sales_metrics import build_sales_metrics
+from sales_velocity import DEFAULT_VELOCITY_MODEL, VELOCITY_MODELS
+from supplier_matching import DEFAULT_MATCH_MODE, MATCH_MODES
+
+logger = logging.getLogger('cli')
+
+def load_report_directory(reports_dir):
+    """Parse every .xlsx/.csv export in a directory.
+
+    Returns (dataframes, file_status) like the Upload tab, merged in filename order.
+    """
+    filenames = sorted(
+        filename for filename in os.listdir(reports_dir)
+        if filename.endswith(('.xlsx', '.csv')) and os.path.isfile(os.path.join(reports_dir, filename))
+    )
+    files = []
+    for filename in filenames:
+        with open(os.path.join(reports_dir, filename), 'rb') as f:
+            files.append((filename, f.read()))
+
+    dataframes = {}
+    file_status = []
+    for file_dataframes, status, warnings in parse_files_parallel(files):
+        for warning in warnings:
+            logger.warning("%s: %s", status[1], warning)
+        dataframes.update(file_dataframes)
+        file_status.append(status)
+
+    return dataframes, file_status
+
+def write_report(df, output_dir, filename):
+    """Write one report CSV; empty reports are skipped"""
+    if df is None or len(df) == 0:
+        logger.info("%s: no rows, not written", filename)
+        return None
+    path = os.path.join(output_dir, filename)
+    csv_export.write_csv(df, path)
+    logger.info("%s: %d rows", filename, len(df))
+    return path
+
+def run_batch(reports_dir, output_dir, warehouses=None, excluded_suppliers_file=supplier_exclusions.EXCLUDED_SUPPLIERS_FILE,
+              velocity_rules_file=po_engine.VELOCITY_RULES_FILE, topology_file=warehouse_topology.TOPOLOGY_FILE,
+              velocity_model=None, split_by_supplier=False, supplier_terms_file=po_optimization.SUPPLIER_TERMS_FILE,
+              optimize=True, match_mode=DEFAULT_MATCH_MODE, transfer_rules_file=transfer_planner.TRANSFER_RULES_FILE):
+    """Generate all reports for the given warehouses (default: every warehouse of the topology).
+
+    velocity_model (see sales_velocity.VELOCITY_MODELS) is used by both paths; by default
+    purchase orders use the replenishment export's velocity and assembly orders 'legacy'.
+    With split_by_supplier, each purchase order is also written as one file per supplier.
+    optimize applies case packs, reorder quantities and the supplier terms to purchase orders.
+    match_mode (see supplier_matching.MATCH_MODES) sets how excluded suppliers are matched.
+    The transfer rules plan is written as one transfer order CSV per source -> destination pair.
+
+    Returns the process exit code: 0 on success, 1 when a file failed to parse or a
+    report failed to generate, 2 when no report could be written at all.
+    """
+    exit_code = 0
+    dataframes, file_status = load_report_directory(reports_dir)
+    for report_type, filename, status in file_status:
+        if report_type == 'Unknown':
+            logger.warning("%s: not a recognized report export, skipped", filename)
+            continue
+        logger.info("%s: %s %s", filename, report_type, status)
+        if report_type == 'Error':
+            exit_code = 1
+
+    os.makedirs(output_dir, exist_ok=True)
+    excluded_suppliers = supplier_exclusions.read_excluded_suppliers(excluded_suppliers_file)
+    rules = po_engine.load_velocity_rules(velocity_rules_file)
+    supplier_terms = po_optimization.load_supplier_terms(supplier_terms_file) if optimize else None
+    
+    topology = warehouse_topology.load_topology(topology_file)
+    availability_df = dataframes.get('Availability Report')
+    if availability_df is not None:
+        topology = warehouse_topology.discover_topology(availability_df['Location'], topology)
+    known_warehouses = warehouse_topology.get_warehouses(topology)
+    if warehouses is None:
+        warehouses = known_warehouses
+    for warehouse in warehouses:
+        if warehouse not in known_warehouses:
+            logger.warning("%s is not a warehouse of the topology (known: %s)", warehouse, ', '.join(known_warehouses))
+    sales_metrics = build_sales_metrics(dataframes)
+    written = []
+
+    # Purchase orders
+    for warehouse in warehouses:
+        try:
+            po_data = po_engine.run_po_generation(dataframes, warehouse, excluded_suppliers, rules, topology, sales_metrics, velocity_model,
+                                                   supplier_terms, optimize, match_mode)
+        except MissingReportError as e:
+            logger.warning("Skipping %s purchase order: %s", warehouse, e)
+            continue
+        except Exception:
+            logger.exception("%s purchase order failed", warehouse)
+            exit_code = 1
+            continue
+        written.append(write_report(po_data, output_dir, f"purchase_order_{warehouse.lower()}.csv"))
+        if split_by_supplier:
+            for slug, rows in csv_export.split_by_supplier(po_data).items():
+                write_report(rows, output_dir, f"purchase_order_{warehouse.lower()}_{slug}.csv")
+
+    # Assembly orders and transfers
+    try:
+        inventory_index = build_inventory_index(availability_df, topology) if availability_df is not None else None
+        results = assembly_engine.run_assembly_pipeline(
+            dataframes, warehouses, inventory_index, sales_metrics, velocity_model or DEFAULT_VELOCITY_MODEL,
+            transfer_rules=transfer_planner.load_transfer_rules(transfer_rules_file)
+        )
+    except MissingReportError as e:
+        logger.warning("Skipping assembly orders: %s", e)
+        results = {'warehouses': {}}
+    except Exception:
+        logger.exception("Assembly order generation failed")
+        exit_code = 1
+        results = {'warehouses': {}}
+
+    for warehouse, wh_results in results['warehouses'].items():
+        key = warehouse.lower()
+        assembly_analysis = wh_results['assembly_analysis']
+        cannot_assemble_df = assembly_engine.build_cannot_assemble_df(assembly_analysis)
+        written.append(write_report(assembly_engine.build_assembly_orders_df(assembly_analysis), output_dir, f"assembly_orders_ready_for_production_{key}.csv"))
+        written.append(write_report(cannot_assemble_df.drop(columns=['component_shortages'], errors='ignore'), output_dir, f"cannot_assemble_report_{key}.csv"))
+        written.append(write_report(assembly_engine.build_transfer_df(wh_results['transfer_recommendations']), output_dir, f"transfer_recommendations_{key}.csv"))
+
+    # Transfer orders of the transfer rules, one file per location pair
+    transfer_plan = results.get('transfer_plan')
+    if transfer_plan is not None:
+        for slug, rows in transfer_planner.split_transfer_orders(transfer_plan).items():
+            written.append(write_report(rows, output_dir, f"transfer_order_{slug}.csv"))
+
+    if not any(written):
+        logger.error("No reports were generated from %s", reports_dir)
+        return 2
+    return exit_code
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate purchase orders and assembly orders without the Streamlit app.")
+    parser.add_argument('reports_dir', help="Directory with the report exports (Availability, BOM, Inventory List, Replenishment, Sales)")
+    parser.add_argument('--output-dir', default='output', help="Directory for the generated CSVs (default: ./output)")
+    parser.add_argument('--warehouse', nargs='+', type=str.upper, help="Warehouses to process (default: every warehouse of the topology)")
+    parser.add_argument('--excluded-suppliers', default=supplier_exclusions.EXCLUDED_SUPPLIERS_FILE, help="Text file with one excluded supplier per line")
+    parser.add_argument('--supplier-match', choices=list(MATCH_MODES), default=DEFAULT_MATCH_MODE,
+                        help="How excluded supplier names match: whole name, anywhere in the name, or whole words (default)")
+    parser.add_argument('--velocity-rules', default=po_engine.VELOCITY_RULES_FILE, help="CSV with the velocity adjustment rules")
+    parser.add_argument('--velocity-model', choices=list(VELOCITY_MODELS), help="Sales velocity model for both purchase and assembly orders")
+    parser.add_argument('--split-by-supplier', action='store_true', help="Also write each purchase order as one Cin7 import file per supplier")
+    parser.add_argument('--supplier-terms', default=po_optimization.SUPPLIER_TERMS_FILE, help="CSV with per-supplier minimum order values and free-freight thresholds")
+    parser.add_argument('--no-po-optimization', action='store_true', help="Keep raw purchase order quantities (no case packs, reorder quantities or supplier minimums)")
+    parser.add_argument('--transfer-rules', default=transfer_planner.TRANSFER_RULES_FILE, help="CSV with the inter-location transfer rules")
+    parser.add_argument('--topology', default=warehouse_topology.TOPOLOGY_FILE, help="CSV mapping Availability Report locations to warehouses")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Log progress, not only warnings")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format='%(levelname)s %(name)s: %(message)s')
+
+    if not os.path.isdir(args.reports_dir):
+        parser.error(f"{args.reports_dir} is not a directory")
+
+    return run_batch(args.reports_dir, args.output_dir, args.warehouse, args.excluded_suppliers, args.velocity_rules, args.topology, args.velocity_model, args.split_by_supplier,
+                     args.supplier_terms, not args.no_po_optimization, args.supplier_match, args.transfer_rules)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Read-only inputs of the warehouse workers, set once per worker process by _init_worker
+_shared = None
+
+class _RecordCollector(logging.Handler):
+    """Keep the warnings a worker logs, so they can be re-emitted in the calling process"""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.records = []
+
+    def emit(self, record):
+        # Format now: the arguments and traceback may not pickle
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        self.records.append(record)
+
+def _init_worker(shared):
+    global _shared
+    _shared = shared
+
+def _run_in_worker(func, warehouse):
+    collector = _RecordCollector()
+    root = logging.getLogger()
+    root.addHandler(collector)
+    try:
+        return func(_shared, warehouse), collector.records
+    finally:
+        root.removeHandler(collector)
+
+def _run_sequential(func, warehouses, shared):
+    return {warehouse: func(shared, warehouse) for warehouse in warehouses}
+
+def map_warehouses(func, warehouses, shared, max_workers=None):
+    """Run func(shared, warehouse) for every warehouse in worker processes.
+
+    The per-warehouse computations are pandas/numpy code that mostly holds the GIL, so
+    each warehouse goes to its own spawned worker process (up to the CPU count), as in
+    report_parsing.parse_files_parallel. shared holds the read-only inputs (parsed
+    reports, inventory index, sales velocity, ABC analysis); it is pickled once per worker
+    through the pool initializer rather than once per warehouse. func must be a
+    module-level function so the workers can import it. Warnings logged in a worker are
+    re-emitted by the same logger here, so the app still shows them.
+
+    Returns {warehouse: result} in the order of warehouses; the first exception is
+    re-raised. With one warehouse or one CPU, or without a usable process pool, the
+    warehouses run in this process.
+    """
+    warehouses = list(warehouses)
+    max_workers = min(len(warehouses), max_workers or os.cpu_count() or 1)
+    if max_workers <= 1:
+        return _run_sequential(func, warehouses, shared)
+
+    # Spawned workers do not inherit the server's threads and locks
+    context = multiprocessing.get_context('spawn')
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(shared,)) as executor:
+            futures = {warehouse: executor.submit(_run_in_worker, func, warehouse) for warehouse in warehouses}
+            results = {}
+            for warehouse, future in futures.items():
+                result, records = future.result()
+                for record in records:
+                    logging.getLogger(record.name).handle(record)
+                results[warehouse] = result
+            return results
+    except (BrokenProcessPool, OSError):
+        # No usable process pool (e.g. restricted sandbox): run in this process
+        return _run_sequential(func, warehouses, shared)
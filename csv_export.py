@@ -0,0 +1,104 @@
+import hashlib
+import io
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+
+import pandas as pd
+
+# Rows formatted per to_csv call; bounds the memory of one chunk for large exports
+CSV_CHUNK_ROWS = 5000
+
+# Exported files kept in memory, keyed by (result fingerprint, export kind)
+EXPORT_CACHE_SIZE = 64
+_export_cache = OrderedDict()
+_export_cache_lock = threading.Lock()
+
+def frame_fingerprint(df):
+    """Return a content hash of a DataFrame (columns, dtypes and values, not the index)"""
+    digest = hashlib.sha256()
+    digest.update(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode())
+    try:
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    except TypeError:
+        # Unhashable cells (e.g. lists); fall back to the CSV text
+        digest.update(df.to_csv(index=False).encode())
+    return digest.hexdigest()
+
+def iter_csv_chunks(df, chunk_rows=CSV_CHUNK_ROWS):
+    """Yield the CSV of df (header first, no index) as UTF-8 bytes, chunk_rows rows at a time"""
+    yield df.iloc[0:0].to_csv(index=False).encode()
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].to_csv(index=False, header=False).encode()
+
+def write_csv(df, target, chunk_rows=CSV_CHUNK_ROWS):
+    """Stream df as CSV into a binary file object or a path"""
+    if isinstance(target, (str, bytes)) or hasattr(target, '__fspath__'):
+        with open(target, 'wb') as f:
+            write_csv(df, f, chunk_rows)
+        return
+    for chunk in iter_csv_chunks(df, chunk_rows):
+        target.write(chunk)
+
+def export_csv_bytes(df, chunk_rows=CSV_CHUNK_ROWS):
+    """Return the CSV of df as bytes, written chunk by chunk into one buffer"""
+    buffer = io.BytesIO()
+    write_csv(df, buffer, chunk_rows)
+    return buffer.getvalue()
+
+def file_slug(name, default='unnamed'):
+    """File-name-safe form of a name (supplier, location)"""
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', str(name)).strip('_').lower()
+    return slug or default
+
+def supplier_file_slug(supplier):
+    """File-name-safe form of a supplier name"""
+    return file_slug(supplier, 'unknown_supplier')
+
+def split_by_supplier(po_data, supplier_col='SupplierName*'):
+    """Split a PO into {file slug: rows of one supplier}, in order of first appearance.
+
+    Cin7 rejects very large import batches, so big orders are imported one supplier at a time.
+    """
+    files = {}
+    for supplier, rows in po_data.groupby(supplier_col, sort=False, observed=True, dropna=False):
+        slug = supplier_file_slug(supplier)
+        # Names that only differ in punctuation get a numbered slug
+        unique_slug, suffix = slug, 2
+        while unique_slug in files:
+            unique_slug, suffix = f'{slug}_{suffix}', suffix + 1
+        files[unique_slug] = rows
+    return files
+
+def export_zip(files, prefix, chunk_rows=CSV_CHUNK_ROWS):
+    """Return a ZIP with one '{prefix}_{slug}.csv' per {slug: DataFrame} entry, streamed entry by entry"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for slug, rows in files.items():
+            with archive.open(f'{prefix}_{slug}.csv', 'w') as entry:
+                write_csv(rows, entry, chunk_rows)
+    return buffer.getvalue()
+
+def export_supplier_zip(po_data, prefix, supplier_col='SupplierName*', chunk_rows=CSV_CHUNK_ROWS):
+    """Return a ZIP with one '{prefix}_{supplier}.csv' per supplier"""
+    return export_zip(split_by_supplier(po_data, supplier_col), prefix, chunk_rows)
+
+def cached_export(fingerprint, kind, build):
+    """Return the exported bytes for (fingerprint, kind), calling build() only on a miss.
+
+    Entries are keyed by content, so unchanged results are served from memory across
+    reruns and sessions; the least recently used entries are dropped beyond EXPORT_CACHE_SIZE.
+    """
+    key = (fingerprint, kind)
+    with _export_cache_lock:
+        if key in _export_cache:
+            _export_cache.move_to_end(key)
+            return _export_cache[key]
+
+    data = build()
+    with _export_cache_lock:
+        _export_cache[key] = data
+        while len(_export_cache) > EXPORT_CACHE_SIZE:
+            _export_cache.popitem(last=False)
+    return data
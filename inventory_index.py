@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+
+from warehouse_topology import discover_topology, get_warehouse_locations, load_topology, warehouse_codes
+
+# Quantity columns from the Availability Report kept in the index
+POSITION_COLUMNS = ['OnHand', 'OnOrder', 'InTransit', 'Available']
+
+EMPTY_POSITION = {'on_hand': 0, 'on_order': 0, 'in_transit': 0, 'total_available': 0}
+
+def build_inventory_index(availability_df, topology=None):
+    """Aggregate the Availability Report once into SKU x Location and SKU x Warehouse positions.
+
+    topology defaults to the saved warehouse topology plus the report's new locations (see
+    warehouse_topology.discover_topology). Returns a dict with:
+    - 'by_location': DataFrame indexed by (SKU, Location) with the summed POSITION_COLUMNS
+    - 'by_warehouse': DataFrame indexed by (SKU, Warehouse) with the same columns
+    - 'location_lookup' / 'warehouse_lookup': dicts keyed by the same tuples for O(1) lookups
+    - 'topology' and 'warehouse_locations' ({warehouse: stock locations}) used for the rollup
+    """
+    empty_frame = pd.DataFrame(
+        columns=POSITION_COLUMNS,
+        index=pd.MultiIndex.from_tuples([], names=['SKU', 'Location'])
+    )
+    index = {
+        'by_location': empty_frame,
+        'by_warehouse': empty_frame.rename_axis(['SKU', 'Warehouse']),
+        'location_lookup': {},
+        'warehouse_lookup': {},
+        'topology': topology if topology is not None else load_topology(),
+        'warehouse_locations': {},
+    }
+
+    if availability_df is None or len(availability_df) == 0:
+        return index
+    if 'SKU' not in availability_df.columns or 'Location' not in availability_df.columns:
+        return index
+    
+    if topology is None:
+        topology = discover_topology(availability_df['Location'], index['topology'])
+
+    # Missing quantity columns count as zero, like the per-SKU scan did
+    positions = pd.DataFrame({
+        col: availability_df[col] if col in availability_df.columns else 0
+        for col in POSITION_COLUMNS
+    })
+    positions['SKU'] = availability_df['SKU']
+    positions['Location'] = availability_df['Location']
+
+    by_location = positions.groupby(['SKU', 'Location'], sort=False, observed=True)[POSITION_COLUMNS].sum()
+
+    # Roll locations up to their warehouse with one grouped sum over integer warehouse codes
+    warehouse_rows = by_location.reset_index()
+    codes, warehouses = warehouse_codes(warehouse_rows['Location'], topology)
+    in_warehouse = codes >= 0
+    warehouse_rows = warehouse_rows[in_warehouse].assign(
+        Warehouse=pd.Categorical.from_codes(codes[in_warehouse], categories=warehouses)
+    )
+    by_warehouse = warehouse_rows.groupby(['SKU', 'Warehouse'], sort=False, observed=True)[POSITION_COLUMNS].sum()
+
+    index['by_location'] = by_location
+    index['by_warehouse'] = by_warehouse
+    index['location_lookup'] = dict(zip(by_location.index, by_location.itertuples(index=False, name=None)))
+    index['warehouse_lookup'] = dict(zip(by_warehouse.index, by_warehouse.itertuples(index=False, name=None)))
+    index['topology'] = topology
+    index['warehouse_locations'] = {
+        warehouse: get_warehouse_locations(topology, warehouse)
+        for warehouse in warehouses
+    }
+
+    return index
+
+def _to_position(on_hand, on_order, in_transit):
+    return {
+        'on_hand': on_hand,
+        'on_order': on_order,
+        'in_transit': in_transit,
+        'total_available': on_hand + on_order + in_transit
+    }
+
+def lookup_inventory_position(inventory_index, sku, locations):
+    """Return the inventory position for a SKU across locations using a prebuilt index"""
+    sku = str(sku)
+
+    # Whole-warehouse queries hit the precomputed rollup directly
+    for warehouse, warehouse_locations in inventory_index['warehouse_locations'].items():
+        if list(locations) == warehouse_locations:
+            values = inventory_index['warehouse_lookup'].get((sku, warehouse))
+            if values is None:
+                return dict(EMPTY_POSITION)
+            return _to_position(values[0], values[1], values[2])
+
+    location_lookup = inventory_index['location_lookup']
+    found = [location_lookup[(sku, location)] for location in locations if (sku, location) in location_lookup]
+    if not found:
+        return dict(EMPTY_POSITION)
+
+    return _to_position(
+        sum(values[0] for values in found),
+        sum(values[1] for values in found),
+        sum(values[2] for values in found)
+    )
+
+def get_warehouse_positions(inventory_index, warehouse):
+    """Return the SKU-indexed OnHand/OnOrder/InTransit/Available rollup for one warehouse"""
+    by_warehouse = inventory_index['by_warehouse']
+    if warehouse not in by_warehouse.index.get_level_values('Warehouse'):
+        return pd.DataFrame(columns=POSITION_COLUMNS, index=pd.Index([], name='SKU'), dtype=float)
+    return by_warehouse.xs(warehouse, level='Warehouse')
+
+def get_location_matrix(inventory_index, locations, column='OnHand'):
+    """Return (SKUs, SKU x locations array) of one position column for the given locations.
+
+    Built from the index's SKU x Location sums with a single scatter-add; SKUs without
+    stock in any of the locations are left out.
+    """
+    values = inventory_index['by_location'][column]
+    if len(values) == 0:
+        return pd.Index([], dtype=object, name='SKU'), np.zeros((0, len(locations)))
+
+    # Matched once per distinct location, then spread to the rows through the index codes
+    location_level = values.index.names.index('Location')
+    level_pos = pd.Index(locations).get_indexer(values.index.levels[location_level].astype(str))
+    location_codes = values.index.codes[location_level]
+    location_pos = np.where(location_codes >= 0, level_pos[location_codes], -1)
+    values = values[location_pos >= 0]
+
+    sku_codes, skus = pd.factorize(values.index.get_level_values('SKU').astype(str))
+    matrix = np.zeros((len(skus), len(locations)))
+    np.add.at(matrix, (sku_codes, location_pos[location_pos >= 0]), pd.to_numeric(values, errors='coerce').fillna(0).to_numpy())
+    return pd.Index(skus, name='SKU'), matrix
@@ -0,0 +1,390 @@
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from concurrency import map_warehouses
+from po_optimization import apply_reorder_levels, load_supplier_terms, optimize_po
+from report_schema import MissingReportError
+from sales_metrics import build_sales_metrics, get_metric_totals
+from sales_velocity import calculate_velocity_models
+from supplier_matching import DEFAULT_MATCH_MODE, compile_supplier_matcher, match_suppliers
+from warehouse_topology import discover_topology, warehouse_codes
+
+logger = logging.getLogger(__name__)
+
+# Editable velocity adjustment table; the built-in rules below are used when it is missing
+VELOCITY_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'velocity_adjustments.csv')
+VELOCITY_RULE_COLUMNS = ['tier', 'price_min', 'price_max', 'margin_min', 'margin_max', 'closed', 'adjustment']
+
+# Price tiers cover [price_min, price_max); margin bands are intervals closed on the
+# 'closed' side(s). The first matching rule wins and unmatched rows get 0 (e.g. the
+# 0.25-0.26 margin gap in the under-$100 tier, or products without sales data).
+DEFAULT_VELOCITY_RULES = [
+    # Tier 1: Under $100
+    ('Under $100', -np.inf, 100, -np.inf, 0.1, 'neither', -0.8),
+    ('Under $100', -np.inf, 100, 0.1, 0.2, 'left', -0.5),
+    ('Under $100', -np.inf, 100, 0.2, 0.25, 'left', -0.2),
+    ('Under $100', -np.inf, 100, 0.26, 0.33, 'both', 0),
+    ('Under $100', -np.inf, 100, 0.33, np.inf, 'neither', 0.1),
+    # Tier 2: $100–$250
+    ('$100-$250', 100, 250, -np.inf, 0.1, 'neither', -0.8),
+    ('$100-$250', 100, 250, 0.1, 0.2, 'left', -0.5),
+    ('$100-$250', 100, 250, 0.2, 0.3, 'both', 0),
+    ('$100-$250', 100, 250, 0.3, np.inf, 'neither', 0.05),
+    # Tier 3: $250–$750
+    ('$250-$750', 250, 750, -np.inf, 0.05, 'neither', -0.8),
+    ('$250-$750', 250, 750, 0.05, 0.15, 'left', -0.5),
+    ('$250-$750', 250, 750, 0.15, 0.28, 'both', 0),
+    ('$250-$750', 250, 750, 0.28, np.inf, 'neither', 0.03),
+    # Tier 4: $750+
+    ('$750+', 750, np.inf, -np.inf, 0.05, 'neither', -0.9),
+    ('$750+', 750, np.inf, 0.05, 0.12, 'left', -0.6),
+    ('$750+', 750, np.inf, 0.12, 0.25, 'both', 0),
+    ('$750+', 750, np.inf, 0.25, np.inf, 'neither', 0.02),
+]
+
+# Columns a PO run reads from the replenishment report and the Inventory List; the rest
+# of each report is left out of the joins
+REPLENISHMENT_PO_COLUMNS = ['SKU', 'Name', 'Lead time', 'Adjusted sales velocity/day', 'Cost price']
+INVENTORY_PO_COLUMNS = [
+    'ProductCode', 'Name', 'LastSuppliedBy', 'SupplierProductCode', 'CartonInnerQuantity', 'CartonQuantity',
+    'MinimumBeforeReorder', 'ReorderQuantity'
+]
+
+def load_velocity_rules(path=VELOCITY_RULES_FILE):
+    """Loads the velocity adjustment table from CSV, falling back to the built-in rules."""
+    default_rules = pd.DataFrame(DEFAULT_VELOCITY_RULES, columns=VELOCITY_RULE_COLUMNS)
+    if not path or not os.path.exists(path):
+        return default_rules
+    
+    try:
+        rules = pd.read_csv(path)
+        missing = [col for col in VELOCITY_RULE_COLUMNS if col not in rules.columns]
+        if missing:
+            raise ValueError(f"missing columns {missing}")
+        rules = rules[VELOCITY_RULE_COLUMNS]
+        numeric_cols = ['price_min', 'price_max', 'margin_min', 'margin_max', 'adjustment']
+        rules[numeric_cols] = rules[numeric_cols].apply(pd.to_numeric, errors='raise')
+        rules['closed'] = rules['closed'].str.strip().str.lower()
+        invalid = set(rules['closed']) - {'left', 'right', 'both', 'neither'}
+        if invalid:
+            raise ValueError(f"unknown 'closed' values {sorted(invalid)}")
+        return rules
+    except Exception as e:
+        logger.warning("Could not read velocity adjustment rules from %s (%s); using the built-in rules.", os.path.basename(path), e)
+        return default_rules
+
+def calculate_profit_margin(df):
+    """Calculates the profit margin for each product."""
+    # Profit Margin = Total Profit / Total Sales
+    # Avoid division by zero
+    total_sales = df['TotalSales'].to_numpy(dtype=float)
+    total_profit = df['TotalProfit'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df['ProfitMargin'] = np.where(total_sales != 0, total_profit / total_sales, 0)
+    return df
+
+def get_velocity_adjustments(price, margin, rules):
+    """Looks up the adjustment for each (price, margin) pair in the rules table."""
+    price = np.asarray(price, dtype=float)
+    margin = np.asarray(margin, dtype=float)
+    
+    conditions = []
+    for rule in rules.itertuples(index=False):
+        in_tier = (price >= rule.price_min) & (price < rule.price_max)
+        above_min = margin >= rule.margin_min if rule.closed in ('left', 'both') else margin > rule.margin_min
+        below_max = margin <= rule.margin_max if rule.closed in ('right', 'both') else margin < rule.margin_max
+        conditions.append(in_tier & above_min & below_max)
+    
+    # First matching rule wins; NaN margins match nothing
+    return np.select(conditions, rules['adjustment'].to_numpy(dtype=float), default=0.0)
+
+def adjust_sales_velocity(df, rules=None):
+    """Adjusts sales velocity based on profit margin and price tier."""
+    
+    # Clean 'Cost price' column
+    df['Cost price'] = pd.to_numeric(df['Cost price'], errors='coerce').fillna(0)
+    
+    if rules is None:
+        rules = load_velocity_rules()
+    
+    df['VelocityAdjustment'] = get_velocity_adjustments(df['Cost price'], df['ProfitMargin'], rules)
+    df['AdjustedSalesVelocity'] = df['Adjusted sales velocity/day'] * (1 + df['VelocityAdjustment'])
+    
+    return df
+
+def calculate_po_quantity(df):
+    """Calculates the final purchase order quantity."""
+    # Days of Stock = Lead Time + 3 days
+    df['Lead time'] = pd.to_numeric(df['Lead time'], errors='coerce').fillna(0)
+    df['DaysOfStock'] = df['Lead time'] + 3
+    
+    # Target stock level
+    df['TargetStock'] = df['AdjustedSalesVelocity'] * df['DaysOfStock']
+    
+    # Ensure TotalStock and TotalOnOrder are numbers and fill missing with 0
+    df['TotalStock'] = pd.to_numeric(df['TotalStock'], errors='coerce').fillna(0)
+    df['TotalOnOrder'] = pd.to_numeric(df['TotalOnOrder'], errors='coerce').fillna(0)
+    
+    # PO Quantity = Target Stock - Current Stock - On Order Stock
+    po_quantity = (df['TargetStock'] - df['TotalStock'] - df['TotalOnOrder']).to_numpy(dtype=float)
+    
+    # Don't order if we have enough stock (or no velocity to order from)
+    po_quantity = np.nan_to_num(np.maximum(po_quantity, 0), nan=0.0)
+
+    # Round up to the nearest whole number
+    df['PO_Quantity'] = np.ceil(po_quantity).astype(np.int64)
+
+    return df
+
+def generate_po_csv(df, location, excluded_suppliers=None, match_mode=DEFAULT_MATCH_MODE):
+    """Generates the final CSV for Cin7 Core import.
+
+    Rows from excluded_suppliers (see supplier_matching.MATCH_MODES for match_mode) are
+    dropped; their count is kept in po_data.attrs['excluded_count'].
+    """
+    
+    # Calculate Adjusted Monthly Sales before any aggregation
+    df['Adjusted Monthly Sales'] = df['Adjusted sales velocity/day'] * 30
+    
+    # Select and prepare columns for the PO
+    available_columns = ['LastSuppliedBy', 'SKU', 'PO_Quantity', 'Cost price', 'Lead time', 'Adjusted Monthly Sales']
+    
+    # Check if SupplierProductCode is available and add it after supplier
+    if 'SupplierProductCode' in df.columns:
+        available_columns.insert(1, 'SupplierProductCode')  # Insert after LastSuppliedBy
+    
+    # Check if ProductName is available and add it after SKU
+    if 'ProductName' in df.columns:
+        sku_index = available_columns.index('SKU')
+        available_columns.insert(sku_index + 1, 'ProductName')  # Insert after SKU
+    
+    # Select only columns that exist in the dataframe
+    existing_columns = [col for col in available_columns if col in df.columns]
+    po_data = df[existing_columns].copy()
+    
+    # Rename core columns for Cin7 import
+    rename_mapping = {
+        'LastSuppliedBy': 'SupplierName*',
+        'SKU': 'Product*', 
+        'PO_Quantity': 'Quantity*',
+        'Cost price': 'Price/Amount*'
+    }
+    po_data.rename(columns=rename_mapping, inplace=True)
+    
+    # Filter out rows with no supplier or zero quantity
+    po_data = po_data[po_data['SupplierName*'].notna()]
+    po_data = po_data[po_data['Quantity*'] > 0]
+    
+    # Filter out excluded suppliers; each distinct supplier name is matched once
+    excluded_count = 0
+    if excluded_suppliers:
+        original_count = len(po_data)
+        matcher = compile_supplier_matcher(excluded_suppliers, match_mode)
+        po_data = po_data[~match_suppliers(po_data['SupplierName*'], matcher)]
+        excluded_count = original_count - len(po_data)
+        logger.info("Filtered out %d items from excluded suppliers.", excluded_count)
+
+    # For aggregation, we need to group by columns that should be the same for each product+supplier
+    group_cols = ['SupplierName*', 'Product*', 'Price/Amount*']
+    agg_dict = {'Quantity*': 'sum'}
+    
+    # Add non-aggregated columns to the group (they should be the same for each product)
+    preserve_cols = []
+    for col in po_data.columns:
+        if col not in group_cols and col != 'Quantity*':
+            preserve_cols.append(col)
+            agg_dict[col] = 'first'  # Take the first value since they should be the same
+    
+    # Aggregate quantities for the same product and supplier
+    po_data = po_data.groupby(group_cols, observed=True).agg(agg_dict).reset_index()
+
+    # Add other required columns with default values
+    po_data['RecordType*'] = 'Order'
+    
+    # Define the final column order
+    final_columns = ['RecordType*', 'SupplierName*']
+    
+    # Add SupplierProductCode if it exists
+    if 'SupplierProductCode' in po_data.columns:
+        final_columns.append('SupplierProductCode')
+    
+    # Add the core required columns
+    final_columns.append('Product*')
+    
+    # Add product name right after SKU if it exists  
+    if 'ProductName' in po_data.columns:
+        final_columns.append('ProductName')
+    
+    # Continue with remaining core columns
+    final_columns.extend(['Quantity*', 'Price/Amount*'])
+    
+    # Add the additional informational columns at the end
+    if 'Lead time' in po_data.columns:
+        final_columns.append('Lead time')
+    if 'Adjusted Monthly Sales' in po_data.columns:
+        final_columns.append('Adjusted Monthly Sales')
+    
+    # Select only columns that exist in our data
+    final_columns = [col for col in final_columns if col in po_data.columns]
+    po_data = po_data[final_columns]
+    po_data.attrs['excluded_count'] = excluded_count
+
+    return po_data
+
+def _project(df, columns):
+    """The listed columns of df that it has, as a new frame"""
+    return df[[col for col in columns if col in df.columns]]
+
+def build_po_input(replenishment_df, sales_totals, inventory_df, agg_stock):
+    """Joins the per-SKU inputs of a PO run onto the replenishment report's lines.
+
+    Each report is projected to the columns PO generation reads (REPLENISHMENT_PO_COLUMNS,
+    INVENTORY_PO_COLUMNS) before joining, and sales_totals and agg_stock are SKU-indexed,
+    so every join is a single index lookup and no column names collide. The Inventory
+    List's Name becomes ProductName (the replenishment report's when it has none). The
+    inputs are never modified; returns a new frame in replenishment order.
+    """
+    df = _project(replenishment_df, REPLENISHMENT_PO_COLUMNS)
+    df = df.join(sales_totals, on='SKU')
+
+    inventory = _project(inventory_df, INVENTORY_PO_COLUMNS).set_index('ProductCode')
+    if 'Name' in inventory.columns:
+        inventory = inventory.rename(columns={'Name': 'ProductName'})
+        df = df.drop(columns=['Name'], errors='ignore')
+    elif 'Name' in df.columns:
+        df = df.rename(columns={'Name': 'ProductName'})
+    df = df.join(inventory, on='SKU')
+
+    df = df.join(agg_stock, on='SKU')
+    return df.reset_index(drop=True)
+
+def run_po_generation(dataframes, location, excluded_suppliers=None, rules=None, topology=None, sales_metrics=None,
+                      velocity_model=None, supplier_terms=None, optimize=True, match_mode=DEFAULT_MATCH_MODE):
+    """Runs the PO generation process for a specific location.
+
+    dataframes maps dataset name -> DataFrame as produced by report_parsing. Stock is
+    summed over every location the warehouse topology assigns to the warehouse (defaults
+    to the saved topology plus the report's new locations). Sales totals are read from
+    sales_metrics (see sales_metrics.build_sales_metrics), built here when not given.
+    velocity_model (see sales_velocity.VELOCITY_MODELS) replaces the replenishment
+    export's 'Adjusted sales velocity/day' with a velocity computed from the sales
+    workbook; None keeps the export's. With optimize, lines are raised to the Inventory
+    List's reorder levels, rounded to case packs and topped up to the supplier_terms
+    minimums (see po_optimization; defaults to the saved terms). match_mode sets how
+    excluded_suppliers match supplier names. Raises MissingReportError when a required
+    report is missing.
+    """
+    
+    # Get sales data from the combined Sales by Product Details Report
+    if not all(f'By Products - {metric}' in dataframes for metric in ['Sale', 'COGS', 'Profit', 'Quantity']):
+        raise MissingReportError("Sales by Product Details Report data not found. Please upload the required sales data.")
+    
+    logger.info("Using combined Sales by Product Details Report data...")
+    
+    # Per-SKU totals of every metric come from the sales metrics cache
+    if sales_metrics is None:
+        sales_metrics = build_sales_metrics(dataframes)
+    sales_totals = pd.DataFrame({
+        column: get_metric_totals(sales_metrics, metric)
+        for metric, column in [('Sale', 'TotalSales'), ('COGS', 'TotalCOGS'), ('Profit', 'TotalProfit'), ('Quantity', 'TotalQuantity')]
+    })
+    
+    # Get replenishment data
+    replenishment_df = None
+    for df_name in dataframes.keys():
+        if f'Replenishment Report - {location.upper()}' in df_name:
+            replenishment_df = dataframes[df_name]
+            break
+    
+    if replenishment_df is None:
+        raise MissingReportError(f"Replenishment Report for {location.upper()} not found. Please upload the required replenishment data.")
+    
+    # Get inventory and availability data
+    inventory_df = dataframes.get('Inventory List')
+    availability_df = dataframes.get('Availability Report')
+    
+    if inventory_df is None:
+        raise MissingReportError("Inventory List not found. Please upload the required inventory data.")
+        
+    if availability_df is None:
+        raise MissingReportError("Availability Report not found. Please upload the required availability data.")
+    
+    # Process availability data for the specific location: all of its locations, including returns
+    if topology is None:
+        topology = discover_topology(availability_df['Location'])
+    codes, warehouses = warehouse_codes(availability_df['Location'], topology, roles=None)
+    in_location = codes == warehouses.index(location.upper()) if location.upper() in warehouses else np.zeros(len(availability_df), dtype=bool)
+    location_availability = availability_df.loc[in_location, ['SKU', 'Available', 'OnOrder']]
+    agg_stock = location_availability.groupby('SKU').agg(
+        TotalStock=('Available', 'sum'),
+        TotalOnOrder=('OnOrder', 'sum')
+    )
+    
+    # One row per replenishment line with the sales, inventory and stock columns it needs
+    df = build_po_input(replenishment_df, sales_totals, inventory_df, agg_stock)
+    
+    # Optionally use our own velocity model instead of the export's; SKUs without sales sell 0/day
+    if velocity_model is not None:
+        velocity = calculate_velocity_models(sales_metrics, [velocity_model])[velocity_model]
+        df['Adjusted sales velocity/day'] = df['SKU'].map(velocity).fillna(0).to_numpy()
+    
+    # Calculate profit margin
+    df = calculate_profit_margin(df)
+    
+    # Adjust sales velocity
+    df = adjust_sales_velocity(df, rules)
+
+    # Calculate PO quantity
+    df = calculate_po_quantity(df)
+    if optimize:
+        df = apply_reorder_levels(df)
+    
+    # Generate PO CSV data
+    po_data = generate_po_csv(df, location, excluded_suppliers, match_mode)
+    
+    # Case packs, reorder quantities and supplier minimums on the aggregated lines
+    if optimize:
+        if supplier_terms is None:
+            supplier_terms = load_supplier_terms()
+        po_data = optimize_po(po_data, df, supplier_terms)
+    
+    return po_data
+
+def _run_location(shared, location):
+    """PO generation of one location (a map_warehouses worker); errors are returned, not raised"""
+    try:
+        return run_po_generation(location=location, **shared)
+    except Exception as e:
+        return e
+
+def run_po_generation_all(dataframes, locations, excluded_suppliers=None, rules=None, max_workers=None, topology=None,
+                          sales_metrics=None, velocity_model=None, supplier_terms=None, optimize=True,
+                          match_mode=DEFAULT_MATCH_MODE):
+    """Runs PO generation for several locations in parallel worker processes on the shared reports.
+
+    Returns {location: po_data or the exception raised for that location}.
+    """
+    if rules is None:
+        rules = load_velocity_rules()
+    if topology is None and 'Availability Report' in dataframes:
+        topology = discover_topology(dataframes['Availability Report']['Location'])
+    if sales_metrics is None:
+        sales_metrics = build_sales_metrics(dataframes)
+    if optimize and supplier_terms is None:
+        supplier_terms = load_supplier_terms()
+    
+    shared = {
+        'dataframes': dataframes,
+        'excluded_suppliers': excluded_suppliers,
+        'rules': rules,
+        'topology': topology,
+        'sales_metrics': sales_metrics,
+        'velocity_model': velocity_model,
+        'supplier_terms': supplier_terms,
+        'optimize': optimize,
+        'match_mode': match_mode,
+    }
+    return map_warehouses(_run_location, locations, shared, max_workers)
@@ -0,0 +1,193 @@
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Editable per-supplier ordering terms; the '*' row applies to suppliers not listed
+SUPPLIER_TERMS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'supplier_terms.csv')
+SUPPLIER_TERMS_COLUMNS = ['supplier', 'minimum_order_value', 'free_freight_threshold', 'max_freight_topup']
+DEFAULT_SUPPLIER = '*'
+
+# Without a terms file no supplier has a minimum or a free-freight threshold; orders are
+# only topped up to free freight when the extra value is at most this share of the order
+DEFAULT_SUPPLIER_TERMS = [(DEFAULT_SUPPLIER, 0.0, 0.0, 0.2)]
+
+# Key of a PO line, as grouped by po_engine.generate_po_csv
+PO_LINE_KEY = ['SupplierName*', 'Product*', 'Price/Amount*']
+
+def load_supplier_terms(path=SUPPLIER_TERMS_FILE):
+    """Loads the supplier terms from CSV, falling back to no minimums and no free-freight thresholds."""
+    default_terms = pd.DataFrame(DEFAULT_SUPPLIER_TERMS, columns=SUPPLIER_TERMS_COLUMNS)
+    if not path or not os.path.exists(path):
+        return default_terms
+
+    try:
+        terms = pd.read_csv(path, dtype={'supplier': str}, keep_default_na=False)
+        missing = [col for col in SUPPLIER_TERMS_COLUMNS if col not in terms.columns]
+        if missing:
+            raise ValueError(f"missing columns {missing}")
+        terms = terms[SUPPLIER_TERMS_COLUMNS].copy()
+        terms['supplier'] = terms['supplier'].str.strip()
+        numeric_cols = SUPPLIER_TERMS_COLUMNS[1:]
+        terms[numeric_cols] = terms[numeric_cols].replace('', np.nan).apply(pd.to_numeric, errors='raise')
+        if (terms[numeric_cols] < 0).any().any():
+            raise ValueError("negative values")
+        if DEFAULT_SUPPLIER not in set(terms['supplier']):
+            terms = pd.concat([terms, default_terms], ignore_index=True)
+        return terms.drop_duplicates('supplier')
+    except Exception as e:
+        logger.warning("Could not read supplier terms from %s (%s); using no minimums.", os.path.basename(path), e)
+        return default_terms
+
+def get_supplier_terms(suppliers, terms):
+    """Terms of each supplier (matched case-insensitively), indexed like suppliers; unlisted ones get the '*' row"""
+    keyed = terms.assign(key=terms['supplier'].str.lower()).set_index('key')[SUPPLIER_TERMS_COLUMNS[1:]]
+    default = keyed.loc[DEFAULT_SUPPLIER].fillna(0) if DEFAULT_SUPPLIER in keyed.index else pd.Series(0.0, index=keyed.columns)
+    supplier_terms = keyed.reindex(pd.Index(suppliers).astype(str).str.lower())
+    supplier_terms = supplier_terms.fillna(default)
+    supplier_terms.index = pd.Index(suppliers)
+    return supplier_terms
+
+def _numeric_column(df, col):
+    """A numeric column of df with missing or unreadable values as 0 (all 0 when the column is absent)"""
+    if col not in df.columns:
+        return pd.Series(0.0, index=df.index)
+    return pd.to_numeric(df[col], errors='coerce').fillna(0)
+
+def get_pack_sizes(df):
+    """Units a product is ordered in: the inner carton when set, else the carton, else single units"""
+    inner = _numeric_column(df, 'CartonInnerQuantity')
+    carton = _numeric_column(df, 'CartonQuantity')
+    pack = np.where(inner > 1, inner, np.where(carton > 1, carton, 1))
+    return pd.Series(np.ceil(pack).astype(np.int64), index=df.index)
+
+def apply_reorder_levels(df):
+    """Raise PO_Quantity so stock plus orders reach the Inventory List's MinimumBeforeReorder.
+
+    Adds the ReorderLevelQuantity column with the units this added.
+    """
+    shortfall = _numeric_column(df, 'MinimumBeforeReorder') - df['TotalStock'] - df['TotalOnOrder']
+    floor = np.ceil(np.maximum(shortfall.to_numpy(dtype=float), 0)).astype(np.int64)
+    df['ReorderLevelQuantity'] = np.maximum(floor - df['PO_Quantity'].to_numpy(), 0)
+    df['PO_Quantity'] = df['PO_Quantity'] + df['ReorderLevelQuantity']
+    return df
+
+def _product_attributes(df):
+    """One row per (supplier, product, price) line of df with its pack size, reorder quantity and velocity"""
+    products = pd.DataFrame({
+        'SupplierName*': df['LastSuppliedBy'],
+        'Product*': df['SKU'],
+        'Price/Amount*': df['Cost price'],
+        'PackSize': get_pack_sizes(df),
+        'ReorderQuantity': np.ceil(_numeric_column(df, 'ReorderQuantity')).astype(np.int64),
+        'Velocity': _numeric_column(df, 'AdjustedSalesVelocity'),
+    })
+    products = products[products['SupplierName*'].notna()]
+    return products.drop_duplicates(PO_LINE_KEY)
+
+def round_po_lines(po_data, products):
+    """Round every line up to the product's reorder quantity, then up to whole packs"""
+    lines = po_data[PO_LINE_KEY].merge(products, on=PO_LINE_KEY, how='left')
+    pack = lines['PackSize'].fillna(1).to_numpy(dtype=np.int64)
+    minimum = lines['ReorderQuantity'].fillna(0).to_numpy(dtype=np.int64)
+    quantity = np.maximum(po_data['Quantity*'].to_numpy(dtype=np.int64), minimum)
+    return -(-quantity // pack) * pack
+
+def plan_topups(po_data, products, terms):
+    """Packs to add per line so every supplier's order reaches its target value.
+
+    The target is the supplier's minimum order value, raised to its free-freight threshold
+    when the gap is at most max_freight_topup of the order. Each short supplier gets one
+    pack of its products in descending velocity until the gap is covered; what is still
+    missing then is made up with packs of its fastest seller. All suppliers are handled
+    together with grouped cumulative sums. Returns (top-up lines with the packs to add as
+    'Quantity*', per-supplier summary).
+    """
+    order_value = (po_data['Quantity*'] * po_data['Price/Amount*']).groupby(po_data['SupplierName*']).sum()
+    supplier_terms = get_supplier_terms(order_value.index, terms)
+
+    freight_gap = supplier_terms['free_freight_threshold'] - order_value
+    use_freight = (freight_gap > 0) & (freight_gap <= supplier_terms['max_freight_topup'] * order_value)
+    target = supplier_terms['minimum_order_value'].where(
+        ~use_freight, np.maximum(supplier_terms['minimum_order_value'], supplier_terms['free_freight_threshold'])
+    )
+    summary = pd.DataFrame({'OrderValue': order_value, 'TargetValue': target, 'Shortfall': np.maximum(target - order_value, 0)})
+
+    short = summary.index[summary['Shortfall'] > 0]
+    candidates = products[
+        products['SupplierName*'].isin(short) & (products['Velocity'] > 0) & (products['Price/Amount*'] > 0)
+    ].copy()
+    candidates['PackValue'] = candidates['PackSize'] * candidates['Price/Amount*']
+    candidates = candidates.sort_values(['SupplierName*', 'Velocity'], ascending=[True, False], kind='stable')
+
+    # First pass: one pack of each product, fastest first, while the supplier is still short
+    gap = candidates['SupplierName*'].map(summary['Shortfall']).to_numpy(dtype=float)
+    cumulative = candidates.groupby('SupplierName*', observed=True)['PackValue'].cumsum().to_numpy(dtype=float)
+    packs = ((cumulative - candidates['PackValue'].to_numpy(dtype=float)) < gap).astype(np.int64)
+
+    # Second pass: whatever the first pass left uncovered goes to each supplier's fastest seller
+    covered = pd.Series(packs * candidates['PackValue'].to_numpy(dtype=float), index=candidates.index).groupby(
+        candidates['SupplierName*'], observed=True).sum()
+    remaining = candidates['SupplierName*'].map(summary['Shortfall'] - covered.reindex(summary.index, fill_value=0)).to_numpy(dtype=float)
+    fastest = ~candidates['SupplierName*'].duplicated().to_numpy()
+    extra = np.where(fastest & (remaining > 0), np.ceil(remaining / candidates['PackValue'].to_numpy(dtype=float)), 0)
+    packs = packs + extra.astype(np.int64)
+
+    candidates['Quantity*'] = packs * candidates['PackSize'].to_numpy(dtype=np.int64)
+    topups = candidates.loc[candidates['Quantity*'] > 0, PO_LINE_KEY + ['Quantity*']]
+
+    summary['TopUpValue'] = (topups['Quantity*'] * topups['Price/Amount*']).groupby(topups['SupplierName*'], observed=True).sum()
+    summary['TopUpValue'] = summary['TopUpValue'].fillna(0)
+    return topups, summary
+
+def optimize_po(po_data, df, terms):
+    """Apply case packs, reorder quantities and supplier order minimums to a PO.
+
+    po_data is the output of po_engine.generate_po_csv and df the per-SKU frame it was built
+    from. New top-up lines take their names and informational columns from df. The result
+    keeps po_data's columns and order, with po_data.attrs plus attrs['optimization'] holding
+    the rounded line count, the units added and the suppliers topped up or still short.
+    """
+    products = _product_attributes(df)
+    attrs = dict(po_data.attrs)
+
+    # Plain supplier names: categorical indexes built from different category sets (e.g. the
+    # PO's and the Inventory List's) do not align once there are more than 127 suppliers
+    po_data = po_data.assign(**{'SupplierName*': po_data['SupplierName*'].astype(object)})
+    products = products.assign(**{'SupplierName*': products['SupplierName*'].astype(object)})
+
+    rounded = round_po_lines(po_data, products)
+    rounded_lines = int((rounded != po_data['Quantity*'].to_numpy()).sum())
+    added_units = int((rounded - po_data['Quantity*'].to_numpy()).sum())
+    po_data = po_data.assign(**{'Quantity*': rounded})
+
+    topups, summary = plan_topups(po_data, products, terms)
+    added_units += int(topups['Quantity*'].sum())
+
+    if len(topups) > 0:
+        columns = list(po_data.columns)
+        po_data = pd.concat([po_data, topups], ignore_index=True)
+
+        # New lines borrow names, lead times and monthly sales from the SKU's row in df
+        info = df.drop_duplicates('SKU').set_index('SKU')
+        for col in columns:
+            if col not in PO_LINE_KEY and col != 'Quantity*' and col in info.columns:
+                po_data[col] = po_data[col].fillna(po_data['Product*'].map(info[col]))
+        po_data['RecordType*'] = 'Order'
+        po_data = po_data.groupby(PO_LINE_KEY, observed=True, sort=True).agg(
+            {col: 'sum' if col == 'Quantity*' else 'first' for col in columns if col not in PO_LINE_KEY}
+        ).reset_index()[columns]
+
+    po_data.attrs.update(attrs)
+    po_data.attrs['optimization'] = {
+        'rounded_lines': rounded_lines,
+        'added_units': added_units,
+        'topped_up': summary.loc[summary['TopUpValue'] > 0, 'TopUpValue'].round(2).to_dict(),
+        'below_minimum': list(summary.index[(summary['Shortfall'] > summary['TopUpValue'])]),
+    }
+    logger.info("PO optimization: rounded %d lines, added %d units, topped up %d suppliers.",
+                rounded_lines, added_units, len(po_data.attrs['optimization']['topped_up']))
+    return po_data
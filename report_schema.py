@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+# Per-report schema applied at load time (see columns.md for the full exports):
+# - 'columns': the columns PO and assembly generation use; None keeps every column
+# - 'sku': SKU columns, normalized to str once so the engines can join on them directly
+# - 'categories': low-cardinality text columns stored as categoricals
+# - 'downcast': shrink numeric columns to int32/float32 where no value changes
+REPORT_SCHEMAS = {
+    'Availability Report': {
+        'columns': [
+            'Category', 'SKU', 'ProductName', 'Location', 'Bin', 'StockValue', 'OnHand',
+            'Available', 'OnOrder', 'InTransit', 'Allocated', 'Brand'
+        ],
+        'sku': ['SKU'],
+        'categories': ['Category', 'Location', 'Bin', 'Brand'],
+        'downcast': True,
+    },
+    'Inventory List': {
+        'columns': [
+            'ProductCode', 'Name', 'Category', 'Brand', 'CartonInnerQuantity', 'CartonQuantity',
+            'MinimumBeforeReorder', 'ReorderQuantity', 'DefaultLocation', 'LastSuppliedBy',
+            'SupplierProductCode', 'SupplierProductName', 'SupplierFixedPrice', 'AssemblyBOM',
+            'AutoAssemble', 'AutoDisassemble', 'DropShip', 'AverageCost', 'Status'
+        ],
+        'sku': ['ProductCode'],
+        'categories': [
+            'Category', 'Brand', 'DefaultLocation', 'LastSuppliedBy', 'AssemblyBOM',
+            'AutoAssemble', 'AutoDisassemble', 'DropShip', 'Status'
+        ],
+        'downcast': True,
+    },
+    'BOM Report': {
+        'columns': ['Product', 'Product SKU', 'Component SKU', 'Location', 'Component', 'Quantity', 'Available', 'OnHand'],
+        'sku': ['Product SKU', 'Component SKU'],
+        'categories': ['Product', 'Location', 'Component'],
+        'downcast': True,
+    },
+    'Replenishment Report': {
+        'columns': [
+            'Name', 'SKU', 'Replenishment', 'Lead time', 'Days of stock', 'Vendors',
+            'Adjusted sales velocity/day', 'Sales', 'Cost price', 'Category', 'Stock'
+        ],
+        'sku': ['SKU'],
+        'categories': ['Vendors', 'Category'],
+        'downcast': True,
+    },
+    # Monthly metrics feed velocity and margin divisions, so they stay float64
+    'By Products': {
+        'columns': None,
+        'sku': ['SKU'],
+        'categories': [],
+        'downcast': False,
+    },
+}
+
+class MissingReportError(ValueError):
+    """A report required by PO or assembly generation has not been loaded"""
+
+def get_report_schema(name):
+    """Return the schema for a dataset name (e.g. 'Replenishment Report - NC'), or None"""
+    if name in REPORT_SCHEMAS:
+        return REPORT_SCHEMAS[name]
+    for report, schema in REPORT_SCHEMAS.items():
+        if name.startswith(f'{report} - '):
+            return schema
+    return None
+
+def downcast_numeric(series):
+    """Shrink an int64/float64 column to int32/float32 when every value survives the cast"""
+    if pd.api.types.is_integer_dtype(series) and series.dtype.itemsize > 4:
+        info = np.iinfo(np.int32)
+        if len(series) == 0 or (series.min() >= info.min and series.max() <= info.max):
+            return series.astype(np.int32)
+    elif pd.api.types.is_float_dtype(series) and series.dtype.itemsize > 4:
+        values = series.to_numpy()
+        with np.errstate(over='ignore'):
+            compact = values.astype(np.float32)
+        if np.array_equal(compact.astype(np.float64), values, equal_nan=True):
+            return pd.Series(compact, index=series.index, name=series.name)
+    return series
+
+def apply_report_schema(name, df):
+    """Project, normalize and compact a parsed report according to its schema.
+
+    Datasets without a schema are returned unchanged.
+    """
+    schema = get_report_schema(name)
+    if schema is None:
+        return df
+
+    # Keep only the columns the engines use, in the report's own order
+    if schema['columns'] is not None:
+        df = df[[col for col in df.columns if col in schema['columns']]]
+    df = df.copy()
+
+    for col in schema['sku']:
+        if col in df.columns:
+            df[col] = df[col].astype(str)
+
+    for col in schema['categories']:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    if schema['downcast']:
+        for col in df.columns:
+            if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col]):
+                df[col] = downcast_numeric(df[col])
+
+    return df
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from report_parsing import SALES_METRICS
+
+def get_month_columns(metric_df):
+    """Month columns of a 'By Products - {metric}' frame: all but the SKU and the computed Total/Average columns"""
+    return [
+        col for col in metric_df.columns[1:]
+        if not str(col).startswith('Total') and not str(col).startswith('Average')
+    ]
+
+def build_sales_metrics(dataframes):
+    """Aggregate the 'By Products - {metric}' datasets once into a single SKU-indexed table.
+
+    Returns a dict with:
+    - 'table': DataFrame indexed by SKU with (metric, field) columns, where field is each
+      month label followed by 'Total' and 'Average'
+    - 'metrics': the metrics present (subset of SALES_METRICS)
+    - 'months': the month labels, in report order
+    - 'period': the report's ('YYYY-MM-DD', 'YYYY-MM-DD') From/To dates, or None
+    Build it once per Sales workbook upload and pass it to the engines.
+    """
+    tables = {}
+    months = []
+    period = None
+    for metric in SALES_METRICS:
+        metric_df = dataframes.get(f'By Products - {metric}')
+        if metric_df is None or len(metric_df.columns) == 0:
+            continue
+
+        period = period or metric_df.attrs.get('report_period')
+        metric_months = get_month_columns(metric_df)
+        months.extend(month for month in metric_months if month not in months)
+
+        table = pd.DataFrame(
+            metric_df[metric_months].to_numpy(dtype=np.float64),
+            index=pd.Index(metric_df.iloc[:, 0].astype(str), name='SKU'),
+            columns=metric_months
+        )
+        if table.index.has_duplicates:
+            table = table.groupby(level=0, sort=False).sum(min_count=1)
+
+        # Reuse the totals computed at load time when they still line up with the rows
+        total_col = f'Total {metric}'
+        if total_col in metric_df.columns and len(table) == len(metric_df):
+            table['Total'] = metric_df[total_col].to_numpy(dtype=np.float64)
+        else:
+            table['Total'] = table[metric_months].sum(axis=1, skipna=True)
+        table['Average'] = table[metric_months].mean(axis=1, skipna=True)
+
+        tables[metric] = table
+
+    if tables:
+        table = pd.concat(tables, axis=1)
+        table.columns.names = ['metric', 'field']
+    else:
+        table = pd.DataFrame(
+            index=pd.Index([], name='SKU'),
+            columns=pd.MultiIndex.from_tuples([], names=['metric', 'field'])
+        )
+
+    return {'table': table, 'metrics': list(tables), 'months': months, 'period': tuple(period) if period else None}
+
+def get_metric_totals(sales_metrics, metric):
+    """Return the SKU-indexed 'Total' Series of one metric"""
+    return sales_metrics['table'][(metric, 'Total')]
+
+def get_monthly_values(sales_metrics, metric):
+    """Return (month labels, SKU x month float array) of one metric; months a metric lacks are NaN"""
+    metric_table = sales_metrics['table'][metric]
+    months = [month for month in sales_metrics['months'] if month in metric_table.columns]
+    return months, metric_table[months].to_numpy()
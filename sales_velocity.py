@@ -0,0 +1,136 @@
+import calendar
+import re
+
+import numpy as np
+import pandas as pd
+
+from sales_metrics import get_metric_totals, get_monthly_values
+
+# Velocity models selectable in the PO and assembly paths. 'legacy' is the original
+# total / 6 months / 30 days; the others use the report's real months and day counts.
+VELOCITY_MODELS = {
+    'legacy': "All months ÷ 6 ÷ 30 days",
+    'period': "Report period (actual days)",
+    '3m': "Last 3 months (actual days)",
+    '6m': "Last 6 months (actual days)",
+    '12m': "Last 12 months (actual days)",
+    'ewma': "Exponentially weighted months",
+}
+DEFAULT_VELOCITY_MODEL = 'legacy'
+
+# Half-life of the exponentially weighted model: a month this old counts half as much as the last one
+EWMA_HALFLIFE_MONTHS = 3
+
+# Days in an average month, to turn daily velocities back into monthly ones
+AVERAGE_MONTH_DAYS = 365.25 / 12
+
+MONTH_NUMBERS = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+MONTH_NUMBERS.update({name.lower(): number for number, name in enumerate(calendar.month_abbr) if name})
+
+def resolve_month_labels(labels, period=None):
+    """Map the month column labels to calendar months (pd.Period, freq 'M'; NaT if unreadable).
+
+    Labels that carry a year ('Mar 2025', '2025-03') are parsed as they are. Bare month
+    names take the latest year that does not pass the report period's end month; without
+    a period, the last bare label is taken as the end month of the current year or the one before.
+    """
+    bare_months = [MONTH_NUMBERS.get(str(label).strip().lower()) for label in labels]
+
+    if period is not None:
+        end = pd.Period(period[1], freq='M')
+    else:
+        last_month = next((month for month in reversed(bare_months) if month is not None), None)
+        today = pd.Timestamp.today()
+        if last_month is None:
+            end = pd.Period(today, freq='M')
+        else:
+            end = pd.Period(year=today.year if last_month <= today.month else today.year - 1, month=last_month, freq='M')
+
+    resolved = []
+    for label, month in zip(labels, bare_months):
+        if month is not None:
+            resolved.append(pd.Period(year=end.year if month <= end.month else end.year - 1, month=month, freq='M'))
+            continue
+        try:
+            if not re.search(r'\d{4}', str(label)):
+                raise ValueError(label)
+            resolved.append(pd.Period(pd.Timestamp(str(label)), freq='M'))
+        except (ValueError, TypeError):
+            resolved.append(pd.NaT)
+    return resolved, end
+
+def velocity_weights(months, end, model, period=None, halflife=EWMA_HALFLIFE_MONTHS):
+    """Per-month weights so that monthly quantities @ weights is the daily velocity of a model.
+
+    Windows are clipped to the report period, so months the export does not cover (and
+    that only hold stray credits) neither add sales nor dilute the velocity.
+    """
+    resolved = np.array([month is not pd.NaT for month in months])
+    age = np.array([(end - month).n if month is not pd.NaT else -1 for month in months])
+    days = np.array([month.days_in_month if month is not pd.NaT else 0 for month in months], dtype=float)
+
+    in_period = resolved & (age >= 0)
+    if period is not None:
+        start = pd.Period(period[0], freq='M')
+        in_period &= np.array([month is not pd.NaT and month >= start for month in months])
+
+    if model == 'period':
+        window = in_period
+    elif model in ('3m', '6m', '12m'):
+        window = in_period & (age < int(model[:-1]))
+    elif model == 'ewma':
+        # Weighted mean of the monthly daily rates (quantity / days in month)
+        decay = np.where(in_period, 0.5 ** (np.maximum(age, 0) / halflife), 0.0)
+        if decay.sum() == 0:
+            return np.zeros(len(months))
+        return np.divide(decay, days, out=np.zeros(len(months)), where=days > 0) / decay.sum()
+    else:
+        raise ValueError(f"Unknown velocity model '{model}'. Choose one of {list(VELOCITY_MODELS)}.")
+
+    window_days = days[window].sum()
+    if window_days == 0:
+        return np.zeros(len(months))
+    return np.where(window, 1.0 / window_days, 0.0)
+
+def calculate_velocity_models(sales_metrics, models=None, metric='Quantity', halflife=EWMA_HALFLIFE_MONTHS):
+    """Daily sales velocity of every SKU under several models.
+
+    All calendar models come from a single (SKUs x months) @ (months x models) product
+    over the cached monthly quantities. Returns a SKU-indexed DataFrame with one column
+    per model.
+    """
+    models = list(models or VELOCITY_MODELS)
+    index = sales_metrics['table'].index
+    if metric not in sales_metrics['metrics']:
+        return pd.DataFrame(0.0, index=index, columns=models)
+
+    labels, values = get_monthly_values(sales_metrics, metric)
+    months, end = resolve_month_labels(labels, sales_metrics.get('period'))
+
+    calendar_models = [model for model in models if model != 'legacy']
+    velocities = pd.DataFrame(index=index, columns=models, dtype=float)
+    if calendar_models:
+        weights = np.column_stack([
+            velocity_weights(months, end, model, sales_metrics.get('period'), halflife)
+            for model in calendar_models
+        ])
+        velocities[calendar_models] = np.nan_to_num(values) @ weights
+    if 'legacy' in models:
+        velocities['legacy'] = get_metric_totals(sales_metrics, metric) / 6 / 30
+    return velocities
+
+def velocity_frame(sales_metrics, model=DEFAULT_VELOCITY_MODEL, metric='Quantity'):
+    """Return the [SKU, avg_daily_sales, avg_monthly_sales] frame of one velocity model"""
+    if model == 'legacy':
+        # Monthly first, as the original calculation did (total ÷ 6, then ÷ 30)
+        avg_monthly_sales = get_metric_totals(sales_metrics, metric) / 6
+        avg_daily_sales = get_metric_totals(sales_metrics, metric) / 6 / 30
+    else:
+        avg_daily_sales = calculate_velocity_models(sales_metrics, [model], metric)[model]
+        avg_monthly_sales = avg_daily_sales * AVERAGE_MONTH_DAYS
+
+    return pd.DataFrame({
+        'SKU': avg_daily_sales.index.to_numpy(),
+        'avg_daily_sales': avg_daily_sales.to_numpy(),
+        'avg_monthly_sales': avg_monthly_sales.to_numpy()
+    })
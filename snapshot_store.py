@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # listed in requirements.txt; without it snapshots are disabled
+    feather = None
+
+# Snapshots live next to the app unless DBI_SNAPSHOT_DIR points elsewhere
+SNAPSHOT_DIR = os.environ.get(
+    'DBI_SNAPSHOT_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.snapshots')
+)
+MANIFEST_FILE = 'manifest.json'
+LAST_UPLOAD_FILE = 'last_upload.json'
+# Bump when the parsed dataframes change shape (e.g. a new report schema); older snapshots are re-parsed
+SNAPSHOT_VERSION = 4
+
+def content_digest(file_content):
+    """Return the SHA-256 hex digest of an uploaded file's bytes"""
+    return hashlib.sha256(file_content).hexdigest()
+
+def is_available():
+    """True when the columnar backend (pyarrow) is installed"""
+    return feather is not None
+
+def _snapshot_path(digest, report_type, snapshot_dir=None):
+    # The report type comes from the filename, so identical bytes uploaded under another
+    # report's name (e.g. an NC export renamed to CA) get their own snapshot
+    key = f"{digest}-{re.sub(r'[^A-Za-z0-9]+', '_', report_type)}"
+    return os.path.join(snapshot_dir or SNAPSHOT_DIR, key)
+
+def _read_manifest(digest, report_type, snapshot_dir=None):
+    try:
+        with open(os.path.join(_snapshot_path(digest, report_type, snapshot_dir), MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != SNAPSHOT_VERSION or manifest.get('report_type') != report_type:
+        return None
+    return manifest
+
+def has_snapshot(digest, report_type, snapshot_dir=None):
+    """Check whether a complete snapshot exists for a file digest parsed as report_type"""
+    return is_available() and _read_manifest(digest, report_type, snapshot_dir) is not None
+
+def save_snapshot(digest, report_type, dataframes, status, snapshot_dir=None):
+    """Write the dataframes parsed from one file as Feather files keyed by digest and report type.
+
+    dataframes maps dataset name -> DataFrame and status is the parse status shown for
+    the file (e.g. '✅'). The snapshot directory is written to a temporary location and
+    renamed into place, so readers never see partial snapshots.
+    Returns False when the frames cannot be stored (e.g. mixed-type object columns).
+    """
+    if not is_available() or not dataframes:
+        return False
+
+    snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+    os.makedirs(snapshot_dir, exist_ok=True)
+    target = _snapshot_path(digest, report_type, snapshot_dir)
+    if has_snapshot(digest, report_type, snapshot_dir):
+        return True
+    # Replace a snapshot written by an older version
+    shutil.rmtree(target, ignore_errors=True)
+
+    staging = tempfile.mkdtemp(prefix=f'.{digest[:12]}-', dir=snapshot_dir)
+    try:
+        frames = {}
+        attrs = {}
+        for i, (name, df) in enumerate(dataframes.items()):
+            frame_file = f'{i}.feather'
+            feather.write_feather(df.reset_index(drop=True), os.path.join(staging, frame_file))
+            frames[name] = frame_file
+            # Feather drops DataFrame.attrs (e.g. the Sales report period), so keep them here
+            if df.attrs:
+                attrs[name] = df.attrs
+
+        manifest = {'version': SNAPSHOT_VERSION, 'report_type': report_type, 'frames': frames, 'attrs': attrs, 'status': status}
+        with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f)
+
+        os.replace(staging, target)
+        return True
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        return False
+
+def load_snapshot(digest, report_type, snapshot_dir=None):
+    """Memory-map the Feather files of a snapshot.
+
+    Returns (dataframes, status) or None when no snapshot exists for the digest and report type.
+    """
+    if not is_available():
+        return None
+    manifest = _read_manifest(digest, report_type, snapshot_dir)
+    if manifest is None:
+        return None
+
+    path = _snapshot_path(digest, report_type, snapshot_dir)
+    try:
+        dataframes = {
+            name: feather.read_table(os.path.join(path, frame_file), memory_map=True).to_pandas()
+            for name, frame_file in manifest['frames'].items()
+        }
+        for name, attrs in manifest.get('attrs', {}).items():
+            dataframes[name].attrs.update(attrs)
+        return dataframes, manifest['status']
+    except Exception:
+        return None
+
+def save_last_upload(files, snapshot_dir=None):
+    """Remember the (filename, digest) pairs of the latest upload for 'load last snapshot'"""
+    if not is_available():
+        return
+
+    snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+    os.makedirs(snapshot_dir, exist_ok=True)
+    fd, staging = tempfile.mkstemp(prefix='.last-', dir=snapshot_dir)
+    with os.fdopen(fd, 'w') as f:
+        json.dump([{'filename': filename, 'digest': digest} for filename, digest in files], f)
+    os.replace(staging, os.path.join(snapshot_dir, LAST_UPLOAD_FILE))
+
+def load_last_upload(snapshot_dir=None):
+    """Return the (filename, digest) pairs of the latest upload, or an empty list"""
+    path = os.path.join(snapshot_dir or SNAPSHOT_DIR, LAST_UPLOAD_FILE)
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path) as f:
+            return [(entry['filename'], entry['digest']) for entry in json.load(f)]
+    except (OSError, ValueError, KeyError):
+        return []
@@ -0,0 +1,24 @@
+import logging
+
+import streamlit as st
+
+class StreamlitLogHandler(logging.Handler):
+    """Show engine log records as Streamlit warnings/errors in the current script run"""
+
+    def emit(self, record):
+        try:
+            message = self.format(record)
+            if record.levelno >= logging.ERROR:
+                st.error(message)
+            else:
+                st.warning(message)
+        except Exception:
+            self.handleError(record)
+
+def show_engine_logs(logger_name, level=logging.WARNING):
+    """Route an engine module's warnings to the app (once per logger)"""
+    logger = logging.getLogger(logger_name)
+    if not any(isinstance(handler, StreamlitLogHandler) for handler in logger.handlers):
+        handler = StreamlitLogHandler(level)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
@@ -0,0 +1,103 @@
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Suppliers excluded from purchase orders, one name per line, shared by every app session and the CLI
+EXCLUDED_SUPPLIERS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'excluded_suppliers.txt')
+
+# Written by "Reset to Defaults" in the Supplier Management tab
+DEFAULT_EXCLUDED_SUPPLIERS = [
+    'devil dog concepts', 'apoc armory', 'tiger rock inc.', 'crow shooting supply', 'Havoc Tactical Solutions Llc',
+    'sellway armory', 'true shot gun club', 'andrew bergquist', 'in-store purchase', 'point 2 point global solutions',
+    'unknown', 'apparel.com', 'dbi, llc', 'dbi bakersfield customers', 'dbi bakersfield', 'midway usa', 'J&G Sales',
+    'Mellingers Brass Bees', 'FIN FEATHER FUR OUTFITTERS', 'sionics weapon systems', 'primary weapon systems',
+    'n.a.g. industries', 'modern armory', 'jlo metal products', 'War Dog Industries', 'r & j legacy inc.',
+    'Miwall Corp'
+]
+
+# The first line of a saved list records its version; '#' lines are not supplier names
+VERSION_PREFIX = '# version: '
+
+# path -> (file stat signature, version, suppliers); a list is re-read only after the file changes
+_cache = {}
+_lock = threading.Lock()
+
+class StaleExclusionListError(RuntimeError):
+    """The exclusion list was saved elsewhere since it was loaded."""
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+def _parse(text):
+    """(version, supplier names) of a saved list; lists without a version line are version 0"""
+    version = 0
+    suppliers = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith(VERSION_PREFIX):
+            try:
+                version = int(line[len(VERSION_PREFIX):])
+            except ValueError:
+                logger.warning("Ignoring an unreadable version line in the excluded suppliers list: %s", line)
+        elif line and not line.startswith('#'):
+            suppliers.append(line)
+    return version, suppliers
+
+def load_excluded_suppliers(path=EXCLUDED_SUPPLIERS_FILE):
+    """Returns (version, suppliers) of the saved exclusion list; a missing file excludes nobody.
+
+    The list is kept in memory and only re-read when the file's stat signature changes,
+    so every session sees saves made by the others at the cost of one stat call.
+    """
+    if not path:
+        return 0, ()
+    signature = _file_signature(path)
+    with _lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1], cached[2]
+        if signature is None:
+            version, suppliers = 0, ()
+        else:
+            with open(path, encoding='utf-8') as f:
+                version, suppliers = _parse(f.read())
+            suppliers = tuple(suppliers)
+        _cache[path] = (signature, version, suppliers)
+        return version, suppliers
+
+def read_excluded_suppliers(path=EXCLUDED_SUPPLIERS_FILE):
+    """Reads supplier names (one per line) from a text file; a missing file excludes nobody."""
+    return list(load_excluded_suppliers(path)[1])
+
+def save_excluded_suppliers(suppliers, expected_version=None, path=EXCLUDED_SUPPLIERS_FILE):
+    """Atomically writes a new version of the exclusion list and returns its version number.
+
+    Names are stripped and de-duplicated in order. With expected_version, raises
+    StaleExclusionListError instead of overwriting a version saved in the meantime.
+    """
+    suppliers = tuple(dict.fromkeys(str(supplier).strip() for supplier in suppliers if str(supplier).strip()))
+    with _lock:
+        current_version = 0
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                current_version = _parse(f.read())[0]
+        if expected_version is not None and expected_version != current_version:
+            raise StaleExclusionListError(
+                f"The excluded suppliers list was changed elsewhere (version {current_version}, expected {expected_version})."
+            )
+
+        version = current_version + 1
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(f"{VERSION_PREFIX}{version}\n")
+            f.writelines(f"{supplier}\n" for supplier in suppliers)
+        os.replace(tmp_path, path)
+        _cache[path] = (_file_signature(path), version, suppliers)
+    logger.info("Saved version %d of the excluded suppliers list (%d suppliers).", version, len(suppliers))
+    return version
@@ -1,18 +1,26 @@
 import streamlit as st
+from supplier_exclusions import (
+    DEFAULT_EXCLUDED_SUPPLIERS, StaleExclusionListError, load_excluded_suppliers as load_saved_exclusions,
+    save_excluded_suppliers as save_saved_exclusions
+)
+from supplier_matching import DEFAULT_MATCH_MODE, MATCH_MODES
 
 def load_excluded_suppliers():
-    """Loads the list of excluded suppliers from session state or creates default list."""
-    if 'excluded_suppliers' not in st.session_state:
-        # Default excluded suppliers list
-        st.session_state.excluded_suppliers = [
-            'devil dog concepts', 'apoc armory', 'tiger rock inc.', 'crow shooting supply', 'Havoc Tactical Solutions Llc', 
-            'sellway armory', 'true shot gun club', 'andrew bergquist', 'in-store purchase', 'point 2 point global solutions', 
-            'unknown', 'apparel.com', 'dbi, llc', 'dbi bakersfield customers', 'dbi bakersfield', 'midway usa', 'J&G Sales', 
-            'Mellingers Brass Bees', 'FIN FEATHER FUR OUTFITTERS', 'sionics weapon systems', 'primary weapon systems', 
-            'n.a.g. industries', 'modern armory', 'jlo metal products', 'War Dog Industries', 'r & j legacy inc.', 
-            'Miwall Corp'
-        ]
-    return st.session_state.excluded_suppliers
+    """Returns (version, suppliers) of the saved exclusion list shared by all sessions."""
+    version, suppliers = load_saved_exclusions()
+    return version, list(suppliers)
+
+def save_excluded_suppliers(suppliers, version):
+    """Saves the list over the version this page was built from; returns False if another session saved first."""
+    try:
+        save_saved_exclusions(suppliers, expected_version=version)
+    except StaleExclusionListError:
+        st.error("⚠️ The excluded suppliers list was changed in another session. The page now shows the latest list; please redo your change.")
+        return False
+    except OSError as e:
+        st.error(f"Could not save the excluded suppliers list: {str(e)}")
+        return False
+    return True
 
 def run_supplier_management():
     """Main function for Supplier Management tab"""
@@ -27,28 +35,20 @@ def run_supplier_management():
     - Testing/development accounts
     """)
     
-    # Load current excluded suppliers
-    load_excluded_suppliers()  # Initialize if not exists
+    # Load the saved list; it is shared by all sessions and the CLI
+    version, excluded_suppliers = load_excluded_suppliers()
     
     # Statistics
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Total Excluded Suppliers", len(st.session_state.excluded_suppliers))
+        st.metric("Total Excluded Suppliers", len(excluded_suppliers))
     with col2:
         # Count how many are from default list
-        default_suppliers = [
-            'auto transfer', 'direct transfer', 'internal transfer', 'transfer in',
-            'transfer out', 'stock adjustment', 'inventory adjustment', 'write off',
-            'damaged goods', 'lost inventory', 'returned goods', 'customer return',
-            'warranty replacement', 'sample product', 'promotional item', 'gift',
-            'complimentary', 'testing', 'quality control', 'research', 'development',
-            'prototype', 'discontinued', 'obsolete', 'end of life', 'clearance',
-            'liquidation', 'bulk sale'
-        ]
-        default_count = len([s for s in st.session_state.excluded_suppliers if s.lower() in default_suppliers])
+        default_suppliers = {supplier.lower() for supplier in DEFAULT_EXCLUDED_SUPPLIERS}
+        default_count = len([s for s in excluded_suppliers if s.lower() in default_suppliers])
         st.metric("Default Exclusions", default_count)
     with col3:
-        custom_count = len(st.session_state.excluded_suppliers) - default_count
+        custom_count = len(excluded_suppliers) - default_count
         st.metric("Custom Exclusions", custom_count)
     
     st.divider()
@@ -59,50 +59,54 @@ def run_supplier_management():
     # Text area for editing suppliers
     suppliers_text = st.text_area(
         "Excluded Suppliers (one per line):",
-        value='\n'.join(st.session_state.excluded_suppliers),
+        value='\n'.join(excluded_suppliers),
         height=400,
-        help="Enter supplier names to exclude from purchase orders. Matching is case-insensitive."
+        help="Enter supplier names to exclude from purchase orders. Matching is case-insensitive; see the match setting below.",
+        key=f"excluded_suppliers_text_{version}"
+    )
+    
+    # How the names above are compared with the supplier of each PO line
+    mode_labels = list(MATCH_MODES.values())
+    current_mode = st.session_state.get('supplier_match_mode', DEFAULT_MATCH_MODE)
+    match_label = st.selectbox(
+        "Match Excluded Names Against:",
+        mode_labels,
+        index=list(MATCH_MODES).index(current_mode),
+        help="Whole name: the supplier must equal an entry. Whole words: an entry matches suppliers containing "
+             "its words (\"transfer\" matches \"Auto Transfer\", \"gift\" does not match \"Gifted Arms\"). "
+             "Anywhere in the name: an entry matches any supplier containing it.",
+        key="supplier_match_label"
     )
+    st.session_state.supplier_match_mode = {label: mode for mode, label in MATCH_MODES.items()}[match_label]
     
     # Action buttons
     col1, col2, col3 = st.columns(3)
     
     with col1:
         if st.button("💾 Save Changes", type="primary", use_container_width=True):
-            # Update session state
             new_suppliers = [line.strip() for line in suppliers_text.split('\n') if line.strip()]
-            old_count = len(st.session_state.excluded_suppliers)
-            st.session_state.excluded_suppliers = new_suppliers
-            new_count = len(new_suppliers)
-            
-            if new_count != old_count:
-                st.success(f"✅ Updated excluded suppliers list: {old_count} → {new_count} suppliers")
-            else:
-                st.success("✅ Excluded suppliers list saved successfully")
-            st.rerun()
+            old_count = len(excluded_suppliers)
+            if save_excluded_suppliers(new_suppliers, version):
+                new_count = len(load_excluded_suppliers()[1])
+                if new_count != old_count:
+                    st.success(f"✅ Updated excluded suppliers list: {old_count} → {new_count} suppliers")
+                else:
+                    st.success("✅ Excluded suppliers list saved successfully")
+                st.rerun()
     
     with col2:
         if st.button("🔄 Reset to Defaults", use_container_width=True):
-            # Reset to default list
-            st.session_state.excluded_suppliers = [
-                'auto transfer', 'direct transfer', 'internal transfer', 'transfer in',
-                'transfer out', 'stock adjustment', 'inventory adjustment', 'write off',
-                'damaged goods', 'lost inventory', 'returned goods', 'customer return',
-                'warranty replacement', 'sample product', 'promotional item', 'gift',
-                'complimentary', 'testing', 'quality control', 'research', 'development',
-                'prototype', 'discontinued', 'obsolete', 'end of life', 'clearance',
-                'liquidation', 'bulk sale'
-            ]
-            st.success("✅ Reset to default excluded suppliers list")
-            st.rerun()
+            if save_excluded_suppliers(DEFAULT_EXCLUDED_SUPPLIERS, version):
+                st.success("✅ Reset to default excluded suppliers list")
+                st.rerun()
     
     with col3:
         if st.button("🗑️ Clear All", use_container_width=True):
             if st.session_state.get('confirm_clear', False):
-                st.session_state.excluded_suppliers = []
                 st.session_state.confirm_clear = False
-                st.success("✅ Cleared all excluded suppliers")
-                st.rerun()
+                if save_excluded_suppliers([], version):
+                    st.success("✅ Cleared all excluded suppliers")
+                    st.rerun()
             else:
                 st.session_state.confirm_clear = True
                 st.warning("⚠️ Click again to confirm clearing all suppliers")
@@ -112,15 +116,15 @@ def run_supplier_management():
     st.divider()
     st.subheader("👀 Current Excluded Suppliers")
     
-    if st.session_state.excluded_suppliers:
+    if excluded_suppliers:
         # Create a searchable/filterable view
         search_term = st.text_input("🔍 Search suppliers:", placeholder="Type to filter...")
         
         if search_term:
-            filtered_suppliers = [s for s in st.session_state.excluded_suppliers 
+            filtered_suppliers = [s for s in excluded_suppliers 
                                 if search_term.lower() in s.lower()]
         else:
-            filtered_suppliers = st.session_state.excluded_suppliers
+            filtered_suppliers = excluded_suppliers
         
         if filtered_suppliers:
             # Display in columns for better readability
@@ -140,8 +144,9 @@ def run_supplier_management():
     with st.expander("How Excluded Suppliers Work", expanded=False):
         st.markdown("""
         **Exclusion Process:**
-        - Supplier names are matched case-insensitively
-        - Partial matches are supported (e.g., "transfer" matches "Auto Transfer")
+        - Supplier names are matched case-insensitively, ignoring punctuation ("R&J Legacy, Inc." matches "r & j legacy inc.")
+        - By default an entry matches suppliers containing its whole words (e.g., "transfer" matches "Auto Transfer");
+          choose "Whole name" or "Anywhere in the name" above for stricter or looser matching
         - Excluded suppliers are filtered out during PO generation
         - Changes apply to all future purchase orders
         
@@ -160,8 +165,8 @@ def run_supplier_management():
     
     with st.expander("Import/Export Suppliers", expanded=False):
         st.markdown("**Export Current List:**")
-        if st.session_state.excluded_suppliers:
-            export_text = '\n'.join(st.session_state.excluded_suppliers)
+        if excluded_suppliers:
+            export_text = '\n'.join(excluded_suppliers)
             st.download_button(
                 label="📥 Download Excluded Suppliers List",
                 data=export_text,
@@ -193,19 +198,19 @@ def run_supplier_management():
                     col1, col2 = st.columns(2)
                     with col1:
                         if st.button("📥 Import (Replace All)", key="import_replace"):
-                            st.session_state.excluded_suppliers = imported_suppliers
-                            st.success(f"✅ Imported {len(imported_suppliers)} suppliers (replaced existing list)")
-                            st.rerun()
+                            if save_excluded_suppliers(imported_suppliers, version):
+                                st.success(f"✅ Imported {len(imported_suppliers)} suppliers (replaced existing list)")
+                                st.rerun()
                     
                     with col2:
                         if st.button("📥 Import (Add to Existing)", key="import_add"):
                             # Combine and deduplicate
-                            combined = list(set(st.session_state.excluded_suppliers + imported_suppliers))
-                            old_count = len(st.session_state.excluded_suppliers)
-                            st.session_state.excluded_suppliers = sorted(combined)
-                            new_count = len(combined)
-                            st.success(f"✅ Added {new_count - old_count} new suppliers (total: {new_count})")
-                            st.rerun()
+                            combined = sorted(set(excluded_suppliers + imported_suppliers))
+                            old_count = len(excluded_suppliers)
+                            if save_excluded_suppliers(combined, version):
+                                new_count = len(combined)
+                                st.success(f"✅ Added {new_count - old_count} new suppliers (total: {new_count})")
+                                st.rerun()
                 else:
                     st.warning("No valid suppliers found in the uploaded file.")
             except Exception as e:
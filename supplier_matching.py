@@ -0,0 +1,98 @@
+import re
+from collections import deque
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# exact: the whole name; substring: anywhere in the name; token: whole words of the name,
+# so 'transfer' matches 'Auto Transfer' but 'gift' does not match 'Gifted Arms'
+MATCH_MODES = {
+    'exact': "Whole name",
+    'substring': "Anywhere in the name",
+    'token': "Whole words of the name",
+}
+DEFAULT_MATCH_MODE = 'token'
+
+def normalize_supplier(name):
+    """Case-folded name with punctuation runs turned into single spaces ('R & J Legacy, Inc.' -> 'r j legacy inc')"""
+    return ' '.join(re.sub(r'[\W_]+', ' ', str(name).casefold()).split())
+
+def _build_automaton(patterns):
+    """Aho-Corasick automaton over characters: (goto tables, failure links, accepting states)"""
+    goto = [{}]
+    accepting = [False]
+    for pattern in patterns:
+        state = 0
+        for char in pattern:
+            if char not in goto[state]:
+                goto.append({})
+                accepting.append(False)
+                goto[state][char] = len(goto) - 1
+            state = goto[state][char]
+        accepting[state] = True
+
+    # Breadth-first failure links; a state accepts when any suffix of its path is a pattern
+    fail = [0] * len(goto)
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        for char, child in goto[state].items():
+            queue.append(child)
+            fallback = fail[state]
+            while fallback and char not in goto[fallback]:
+                fallback = fail[fallback]
+            fail[child] = goto[fallback].get(char, 0)
+            accepting[child] = accepting[child] or accepting[fail[child]]
+    return goto, fail, accepting
+
+@lru_cache(maxsize=16)
+def _compile(patterns, mode):
+    if mode == 'exact':
+        return {'mode': mode, 'names': frozenset(patterns)}
+    if mode == 'token':
+        # Padding with spaces turns whole-word matches into substring matches
+        patterns = tuple(f' {pattern} ' for pattern in patterns)
+    return {'mode': mode, 'automaton': _build_automaton(patterns)}
+
+def compile_supplier_matcher(patterns, mode=DEFAULT_MATCH_MODE):
+    """Compile supplier name patterns for one match mode (see MATCH_MODES).
+
+    Patterns are normalized with normalize_supplier; empty ones are ignored. Compiled
+    matchers are cached by their pattern list, so an unchanged exclusion list is only
+    compiled once.
+    """
+    if mode not in MATCH_MODES:
+        raise ValueError(f"Unknown match mode '{mode}'. Choose one of {list(MATCH_MODES)}.")
+    normalized = tuple(sorted({normalize_supplier(pattern) for pattern in patterns or []} - {''}))
+    return _compile(normalized, mode)
+
+def supplier_matches(name, matcher):
+    """Whether one supplier name matches any pattern of a compiled matcher"""
+    name = normalize_supplier(name)
+    if matcher['mode'] == 'exact':
+        return name in matcher['names']
+    if matcher['mode'] == 'token':
+        name = f' {name} '
+
+    goto, fail, accepting = matcher['automaton']
+    state = 0
+    for char in name:
+        while state and char not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(char, 0)
+        if accepting[state]:
+            return True
+    return False
+
+def match_suppliers(suppliers, matcher):
+    """Boolean array: which entries of a supplier column match the matcher.
+
+    Each distinct name is matched once and the result broadcast back to the rows, so the
+    cost grows with the number of distinct suppliers, not rows x patterns. Missing names
+    never match.
+    """
+    codes, uniques = pd.factorize(pd.Series(suppliers), use_na_sentinel=True)
+    flags = np.array([supplier_matches(name, matcher) for name in uniques] + [False], dtype=bool)
+    # Missing names have code -1, which picks the trailing False
+    return flags[codes]
@@ -0,0 +1,545 @@
+"""Synthetic report exports for scale testing.
+
+    python synthetic_catalog.py <output_dir> [--skus 100000] [--warehouses 5] [--bom-depth 3] [--seed 0]
+
+Writes an Availability Report, BOM Component Availability workbook, Sales by Product
+Details workbook, NC/CA replenishment reports and an Inventory List in the layouts
+report_parsing recognizes, for a random catalog of any size. The output directory can be
+loaded in the app or passed to cli.py and benchmark.py. Does not import streamlit.
+
+On one core the CSV exports are written at about a million rows per second (with pyarrow)
+and the workbooks at a few million cells per second, where compressing the worksheet XML is
+a large share; 1M SKUs (about 6M rows in all) take under 30s.
+"""
+import argparse
+import codecs
+import csv
+import logging
+import os
+import sys
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+from report_schema import REPORT_SCHEMAS
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # listed in requirements.txt; without it the slower pandas writers are used
+    pa = None
+
+logger = logging.getLogger('synthetic_catalog')
+
+# Warehouse codes in order of size; each gets a Main, Armory, FFL and Returns location
+WAREHOUSE_CODES = ['NC', 'CA', 'TX', 'FL', 'AZ', 'GA', 'NV', 'OH', 'PA', 'WA', 'CO', 'TN']
+LOCATION_ROLES = ['Main', 'Armory', 'FFL', 'Returns']
+
+# Locations without a warehouse, as in the real exports
+UNASSIGNED_LOCATIONS = ['Main Warehouse', 'DBI Bakersfield Mobile']
+
+# Share of a warehouse's rows per location role
+ROLE_WEIGHTS = [0.85, 0.08, 0.05, 0.02]
+
+CATEGORIES = [
+    'Magazines', 'Upper Receivers', 'Lower Receivers', 'Barrels', 'Bolt Carrier Groups', 'Optics', 'Primers',
+    'Triggers', 'Stocks', 'Handguards', 'Muzzle Devices', 'Apparel', 'Cleaning', 'Lights', 'Holsters'
+]
+
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December']
+SALES_METRICS = ['Sale', 'Quantity', 'COGS', 'Profit']
+
+AVAILABILITY_COLUMNS = [
+    'Category', 'SKU', 'ProductName', 'Location', 'Bin', 'BatchSerialNumber', 'ExpiryDate', 'Discount', 'StockValue',
+    'OnHand', 'VolumeOnHand', 'Available', 'OnOrder', 'InTransit', 'Allocated'
+]
+REPLENISHMENT_COLUMNS = [
+    'Name', 'Barcode', 'SKU', 'Replenishment', 'Lead time', 'Days of stock', 'Vendors', 'Adjusted sales velocity/day',
+    'Sells out in', 'Last received at', 'Sales', 'Stockouts', 'Cost price', 'Category', 'Stock'
+]
+BOM_COLUMNS = REPORT_SCHEMAS['BOM Report']['columns']
+# The Inventory List columns the engines read (see columns.md for the full export)
+INVENTORY_COLUMNS = REPORT_SCHEMAS['Inventory List']['columns']
+
+# Cells per chunk when writing worksheet XML (rows per chunk depend on the sheet's width)
+XLSX_CHUNK_CELLS = 2_000_000
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '<Relationship Id="rId3" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" Target="sharedStrings.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+        '<borders count="1"><border/></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    ),
+}
+SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+SHEET_TAIL = '</sheetData></worksheet>'
+
+def _column_letter(number):
+    # 28 -> 'AB'
+    letters = ''
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+def _cell_xml(reference, value, shared_strings):
+    """One header cell: numbers as values, text as shared strings (a dict of text -> index,
+    in table order); None/'' cells are left out"""
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value == '':
+        return ''
+    if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool):
+        return f'<c r="{reference}"><v>{value}</v></c>'
+    return f'<c r="{reference}" t="s"><v>{shared_strings.setdefault(str(value), len(shared_strings))}</v></c>'
+
+def _number_strings(values):
+    # Decimal text of numbers; pyarrow's formatting is several times faster than str()
+    if pa is not None:
+        return pa.array(np.asarray(values)).cast(pa.string()).to_numpy(zero_copy_only=False)
+    return np.asarray(values).astype(str).astype(object)
+
+def _column_values(values):
+    """(codes, distinct values as text, whether they are shared strings) of a body column;
+    codes index the distinct values per row and are -1 for missing and empty values"""
+    codes, uniques = pd.factorize(values)
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return codes, _number_strings(uniques), False
+    text = pd.Index(uniques).astype(str)
+    codes = np.where(np.append(text == '', False)[codes], -1, codes)
+    return codes, text, True
+
+def _shared_strings_chunks(texts, chunk_size=XLSX_CHUNK_CELLS):
+    # sharedStrings.xml of the texts in table order, in chunks of chunk_size strings
+    yield (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" count="{len(texts)}" uniqueCount="{len(texts)}">'
+    )
+    for start in range(0, len(texts), chunk_size):
+        chunk = texts[start:start + chunk_size]
+        # Escape per text only when the chunk holds a markup character at all
+        raw = '\n'.join(chunk)
+        if '&' in raw or '<' in raw or '>' in raw:
+            chunk = chunk.map(escape)
+        yield '<si><t xml:space="preserve">' + '</t></si><si><t xml:space="preserve">'.join(chunk) + '</t></si>'
+    yield '</sst>'
+
+def write_xlsx(path, header_rows, body, chunk_cells=XLSX_CHUNK_CELLS):
+    """Write a one-sheet workbook: header_rows (lists of cell values) followed by body's rows.
+
+    Text goes to a shared strings table, as in Cin7's exports. Each distinct value of a
+    column is formatted once, and the table is built with one factorize over the distinct
+    texts of all columns. Body cells carry no reference (cells without one follow each
+    other, so missing values are written as empty cells), which lets a chunk of rows be
+    laid out as an array of the per-value cell strings and joined once, without building
+    a string per cell. The worksheet XML is streamed into the archive in chunks.
+    report_parsing's streaming reader and openpyxl both read it.
+    """
+    shared_strings = {}
+    header_xml = ''.join(
+        f'<row r="{row_number}">'
+        + ''.join(_cell_xml(f'{_column_letter(column)}{row_number}', value, shared_strings) for column, value in enumerate(row, start=1))
+        + '</row>'
+        for row_number, row in enumerate(header_rows, start=1)
+    )
+
+    # The header texts open the table (factorize keeps first-seen order); the body's follow
+    columns = [_column_values(body.iloc[:, position]) for position in range(len(body.columns))]
+    string_ids, table = pd.factorize(
+        pd.Index(list(shared_strings), dtype=object).append([values for _, values, is_text in columns if is_text])
+    )
+    offset = len(shared_strings)
+    column_cells = []
+    for codes, values, is_text in columns:
+        if is_text:
+            ids = string_ids[offset:offset + len(values)].astype(str).astype(object)
+            offset += len(values)
+            cells = '<c t="s"><v>' + ids + '</v></c>'
+        else:
+            cells = '<c><v>' + np.asarray(values, dtype=object) + '</v></c>'
+        # Code -1 (missing) picks the trailing empty cell
+        column_cells.append((codes, np.append(cells, '<c/>')))
+
+    chunk_rows = max(1, chunk_cells // max(len(columns), 1))
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((SHEET_HEAD + header_xml).encode())
+            for start in range(0, len(body), chunk_rows):
+                first_row = len(header_rows) + start + 1
+                row_numbers = np.arange(first_row, first_row + min(chunk_rows, len(body) - start)).astype(str).astype(object)
+                pieces = np.empty((len(row_numbers), len(columns) + 2), dtype=object)
+                pieces[:, 0] = '<row r="' + row_numbers + '">'
+                for position, (codes, cells) in enumerate(column_cells, start=1):
+                    pieces[:, position] = cells[codes[start:start + chunk_rows]]
+                pieces[:, -1] = '</row>'
+                sheet.write(''.join(pieces.ravel().tolist()).encode())
+            sheet.write(SHEET_TAIL.encode())
+        with archive.open('xl/sharedStrings.xml', 'w', force_zip64=True) as strings:
+            for chunk in _shared_strings_chunks(table, chunk_cells):
+                strings.write(chunk.encode())
+
+def write_csv(path, df, encoding='utf-8'):
+    """Write df without its index, text quoted and missing values empty.
+
+    Uses pyarrow's multithreaded CSV writer when installed (several times faster than
+    DataFrame.to_csv); encoding='utf-8-sig' starts the file with a byte order mark.
+    """
+    if pa is None:
+        df.to_csv(path, index=False, quoting=csv.QUOTE_NONNUMERIC, encoding=encoding)
+        return
+    with open(path, 'wb') as f:
+        if encoding == 'utf-8-sig':
+            f.write(codecs.BOM_UTF8)
+        pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), f)
+
+def get_locations(warehouses):
+    """(location, warehouse index or -1) of the catalog's locations, warehouses first"""
+    locations = [(f'{code} - {role}', i) for i, code in enumerate(WAREHOUSE_CODES[:warehouses]) for role in LOCATION_ROLES]
+    return locations + [(location, -1) for location in UNASSIGNED_LOCATIONS]
+
+def _warehouse_weights(warehouses):
+    # NC is the largest warehouse; each next one is smaller
+    weights = 1 / np.arange(1, warehouses + 1)
+    return weights / weights.sum()
+
+def generate_products(rng, skus, assembly_share, bom_depth, suppliers, velocity_median, velocity_sigma, selling_share):
+    """One row per SKU with its name, category, BOM level, suppliers, cost, price and daily velocity.
+
+    Assemblies get BOM levels 1..bom_depth; level 0 SKUs are bought, not assembled.
+    """
+    # Mostly numeric SKUs with some lettered ones, as in Cin7
+    sku = (np.arange(skus) + 100_000).astype(str).astype(object)
+    sku = np.where(rng.random(skus) < 0.1, 'D' + sku, sku)
+    category = rng.integers(0, len(CATEGORIES), skus)
+    is_assembly = rng.random(skus) < assembly_share
+    level = np.where(is_assembly, rng.integers(1, bom_depth + 1, skus), 0) if bom_depth > 0 else np.zeros(skus, dtype=np.int64)
+
+    cost = np.round(rng.lognormal(3.5, 1.0, skus), 2)
+    margin = rng.uniform(0.05, 0.6, skus)
+    velocity = np.where(rng.random(skus) < selling_share, rng.lognormal(np.log(velocity_median), velocity_sigma, skus), 0.0)
+
+    # One to three vendors; the Inventory List knows the first for most products
+    supplier_names = np.array([f'Supplier {i:04d}' for i in range(suppliers)], dtype=object)
+    vendor_ids = rng.integers(0, suppliers, (skus, 3))
+    vendor_count = rng.integers(1, 4, skus)
+    vendors = supplier_names[vendor_ids[:, 0]]
+    for k in (1, 2):
+        vendors = np.where(vendor_count > k, vendors + ', ' + supplier_names[vendor_ids[:, k]], vendors)
+    last_supplied_by = np.where(rng.random(skus) < 0.9, supplier_names[vendor_ids[:, 0]], None)
+
+    category_names = np.array(CATEGORIES, dtype=object)[category]
+    return pd.DataFrame({
+        'SKU': sku,
+        'Name': category_names + ' ' + sku,
+        'Category': category_names,
+        'Level': level,
+        'Vendors': vendors,
+        'LastSuppliedBy': last_supplied_by,
+        'Cost': cost,
+        'Price': np.round(cost * (1 + margin), 2),
+        'Velocity': velocity,
+        'LeadTime': rng.integers(7, 61, skus),
+    })
+
+def generate_bom(rng, products, bom_fanout):
+    """(assembly SKU, component SKU, quantity) rows; each assembly uses 1 + Poisson(bom_fanout - 1)
+    components of lower BOM levels, at least one of them from the level right below"""
+    levels = products['Level'].to_numpy()
+    pairs = []
+    for level in range(1, levels.max() + 1):
+        assemblies = np.flatnonzero(levels == level)
+        lower = np.flatnonzero(levels < level)
+        below = np.flatnonzero(levels == level - 1)
+        if len(assemblies) == 0 or len(lower) == 0 or len(below) == 0:
+            continue
+        fanout = 1 + rng.poisson(max(bom_fanout - 1, 0), len(assemblies))
+        parents = np.repeat(assemblies, fanout)
+        components = lower[rng.integers(0, len(lower), len(parents))]
+        # The first component of each assembly comes from the level below, so BOMs reach bom_depth
+        first = np.r_[0, np.cumsum(fanout)[:-1]]
+        components[first] = below[rng.integers(0, len(below), len(assemblies))]
+        pairs.append(pd.DataFrame({'Assembly': parents, 'Component': components}))
+
+    if not pairs:
+        return pd.DataFrame({'Assembly': [], 'Component': [], 'Quantity': []}, dtype=np.int64)
+    bom = pd.concat(pairs, ignore_index=True).drop_duplicates(['Assembly', 'Component'])
+    bom['Quantity'] = 1 + rng.poisson(0.3, len(bom))
+    return bom.reset_index(drop=True)
+
+def generate_stock(rng, products, warehouses, location_spread):
+    """Availability rows: every SKU in a Main location of a warehouse (larger warehouses more
+    often) plus Poisson(location_spread) more locations of any warehouse or role"""
+    skus = len(products)
+    locations = get_locations(warehouses)
+    weights = _warehouse_weights(warehouses)
+    location_weights = np.array([
+        weights[warehouse] * ROLE_WEIGHTS[i % len(LOCATION_ROLES)] if warehouse >= 0 else 0.005
+        for i, (_, warehouse) in enumerate(locations)
+    ])
+    location_weights /= location_weights.sum()
+
+    primary = rng.choice(warehouses, skus, p=weights) * len(LOCATION_ROLES)
+    extra = rng.poisson(location_spread, skus)
+    rows = np.r_[np.arange(skus), np.repeat(np.arange(skus), extra)]
+    location = np.r_[primary, rng.choice(len(locations), extra.sum(), p=location_weights)]
+
+    velocity = products['Velocity'].to_numpy()[rows]
+    on_hand = rng.poisson(velocity * rng.uniform(0, 60, len(rows))) * (rng.random(len(rows)) < 0.7)
+    allocated = np.minimum(rng.poisson(0.2, len(rows)), on_hand)
+    on_order = rng.poisson(velocity * 10) * (rng.random(len(rows)) < 0.2)
+    in_transit = rng.poisson(velocity * 5) * (rng.random(len(rows)) < 0.02)
+
+    return pd.DataFrame({
+        'Category': products['Category'].to_numpy()[rows],
+        'SKU': products['SKU'].to_numpy()[rows],
+        'ProductName': products['Name'].to_numpy()[rows],
+        'Location': np.array([name for name, _ in locations], dtype=object)[location],
+        'Bin': None, 'BatchSerialNumber': None, 'ExpiryDate': None, 'Discount': None,
+        'StockValue': np.round(on_hand * products['Cost'].to_numpy()[rows], 2),
+        'OnHand': on_hand,
+        'VolumeOnHand': 0,
+        'Available': on_hand - allocated,
+        'OnOrder': on_order,
+        'InTransit': in_transit,
+        'Allocated': allocated,
+    }, columns=AVAILABILITY_COLUMNS)
+
+def generate_sales(rng, products, period_start, period_end):
+    """Per-SKU monthly Sale/Quantity/COGS/Profit over the report period (selling SKUs only),
+    as a frame with (month, metric) columns"""
+    months = pd.period_range(period_start, period_end, freq='M')
+    selling = products[products['Velocity'] > 0]
+    quantity = rng.poisson(np.outer(selling['Velocity'].to_numpy(), months.days_in_month.to_numpy()))
+    price = selling['Price'].to_numpy()[:, None]
+    cost = selling['Cost'].to_numpy()[:, None]
+
+    sales = {}
+    for i, month in enumerate(months):
+        sold = quantity[:, i] > 0
+        name = MONTHS[month.month - 1]
+        sale = np.round(quantity[:, i] * price[:, 0], 2)
+        cogs = np.round(quantity[:, i] * cost[:, 0], 4)
+        for metric, values in zip(SALES_METRICS, [sale, quantity[:, i], cogs, np.round(sale - cogs, 4)]):
+            sales[(name, metric)] = np.where(sold, values, np.nan)
+    return pd.DataFrame(sales, index=selling['SKU'].to_numpy())
+
+def write_sales_report(path, sales, period_start, period_end):
+    """Sales by Product Details layout: four preamble rows, a month row, a metric row, a
+    grand total row and one row per SKU; columns B-E and unsold months stay empty"""
+    header_rows = [
+        ['Report period: Custom'],
+        [f"From: {period_start:%d-%b-%Y}"],
+        [f"To: {period_end:%d-%b-%Y}"],
+        ['Show COGS: All COGS'],
+        [None] * 5 + [month for month in MONTHS for _ in SALES_METRICS],
+        ['SKU'] + SALES_METRICS * (len(MONTHS) + 1),
+    ]
+    body = pd.DataFrame({'SKU': sales.index.to_numpy()})
+    for metric in SALES_METRICS:
+        body[('', metric)] = np.nan
+    for month in MONTHS:
+        for metric in SALES_METRICS:
+            body[(month, metric)] = sales[(month, metric)].to_numpy() if (month, metric) in sales.columns else np.nan
+
+    total = body.iloc[:, 1:].sum(min_count=1).to_frame().T
+    total.insert(0, 'SKU', None)
+    body = pd.concat([total, body], ignore_index=True)
+    write_xlsx(path, header_rows, body)
+
+def write_bom_report(path, products, bom, availability):
+    """BOM Component Availability layout: one row per assembly, component and component location"""
+    product_positions = pd.Index(products['SKU']).get_indexer(availability['SKU'])
+    stock = availability.groupby([product_positions, availability['Location']], sort=False, observed=True)[['Available', 'OnHand']].sum()
+    stock.index.names = ['Component', 'Location']
+    rows = bom.merge(stock.reset_index(), on='Component', how='left')
+    rows = rows.sort_values(['Assembly', 'Component', 'Location'], kind='stable')
+    body = pd.DataFrame({
+        'Product': products['Name'].to_numpy()[rows['Assembly']],
+        'Product SKU': products['SKU'].to_numpy()[rows['Assembly']],
+        'Component SKU': products['SKU'].to_numpy()[rows['Component']],
+        'Location': rows['Location'].to_numpy(),
+        'Component': products['Name'].to_numpy()[rows['Component']],
+        'Quantity': rows['Quantity'].to_numpy(),
+        'Available': rows['Available'].to_numpy(),
+        'OnHand': rows['OnHand'].to_numpy(),
+    }, columns=BOM_COLUMNS)
+    header_rows = [['Show: All Products'], [None] * 5 + ['Grand Total'] * 3, BOM_COLUMNS]
+    write_xlsx(path, header_rows, body)
+
+def write_replenishment_report(path, products, availability, warehouse, warehouse_share):
+    """Replenishment export of one warehouse: SKUs and barcodes as ="..." text, UTF-8 with BOM"""
+    in_warehouse = availability['Location'].isin([f'{warehouse} - {role}' for role in LOCATION_ROLES]).to_numpy()
+    product_positions = pd.Index(products['SKU']).get_indexer(availability['SKU'])
+    stock = np.bincount(product_positions[in_warehouse], weights=availability['Available'].to_numpy()[in_warehouse], minlength=len(products))
+    velocity = np.round(products['Velocity'].to_numpy() * warehouse_share, 2)
+    report = pd.DataFrame({
+        'Name': products['Name'],
+        'Barcode': '="' + (np.arange(len(products)) + 10**11).astype(str).astype(object) + '"',
+        'SKU': '="' + products['SKU'] + '"',
+        'Replenishment': np.ceil(velocity * (products['LeadTime'] + 30)).astype(np.int64),
+        'Lead time': products['LeadTime'],
+        'Days of stock': 30,
+        'Vendors': products['Vendors'],
+        'Adjusted sales velocity/day': velocity,
+        'Sells out in': 0,
+        'Last received at': None,
+        'Sales': np.round(velocity * 365).astype(np.int64),
+        'Stockouts': 0,
+        'Cost price': products['Cost'],
+        'Category': products['Category'],
+        'Stock': stock.astype(np.int64),
+    }, columns=REPLENISHMENT_COLUMNS)
+    write_csv(path, report, encoding='utf-8-sig')
+
+def write_inventory_list(path, rng, products, bom):
+    """Inventory List with the columns the engines read"""
+    is_assembly = np.zeros(len(products), dtype=bool)
+    is_assembly[bom['Assembly'].unique()] = True
+    inventory = pd.DataFrame({
+        'ProductCode': products['SKU'],
+        'Name': products['Name'],
+        'Category': products['Category'],
+        'Brand': None,
+        'CartonInnerQuantity': rng.choice([0, 0, 0, 2, 4], len(products)),
+        'CartonQuantity': rng.choice([0, 1, 6, 12, 24], len(products)),
+        'MinimumBeforeReorder': 0,
+        'ReorderQuantity': 0,
+        'DefaultLocation': None,
+        'LastSuppliedBy': products['LastSuppliedBy'],
+        'SupplierProductCode': products['SKU'].radd('V-'),
+        'SupplierProductName': products['Name'],
+        'SupplierFixedPrice': products['Cost'],
+        'AssemblyBOM': np.where(is_assembly, 'Yes', 'No'),
+        'AutoAssemble': np.where(is_assembly & (rng.random(len(products)) < 0.2), 'Yes', 'No'),
+        'AutoDisassemble': 'No',
+        'DropShip': 'No Drop Ship',
+        'AverageCost': products['Cost'],
+        'Status': 'Active',
+    }, columns=INVENTORY_COLUMNS)
+    write_csv(path, inventory)
+
+def generate_catalog(output_dir, skus=10_000, warehouses=2, location_spread=0.3, assembly_share=0.1, bom_fanout=4.0,
+                     bom_depth=2, suppliers=200, velocity_median=0.2, velocity_sigma=1.5, selling_share=0.5,
+                     period_end='2025-08-31', months=6, seed=0):
+    """Write a synthetic set of report exports to output_dir and return their paths.
+
+    skus: catalog size. warehouses: number of warehouses (NC, CA, TX ...), each with Main,
+    Armory, FFL and Returns locations. location_spread: mean extra stock locations per SKU.
+    assembly_share / bom_fanout / bom_depth: share of SKUs that are assemblies, mean
+    components per assembly and BOM levels. velocity_median / velocity_sigma: lognormal
+    daily sales of the selling_share of SKUs that sell. The sales report covers the months
+    months up to period_end (at most 12). The same seed gives the same files.
+    """
+    if not 1 <= warehouses <= len(WAREHOUSE_CODES):
+        raise ValueError(f"warehouses must be between 1 and {len(WAREHOUSE_CODES)}")
+    if not 1 <= months <= 12:
+        raise ValueError("months must be between 1 and 12")
+
+    os.makedirs(output_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    period_end = pd.Timestamp(period_end)
+    period_start = (period_end.to_period('M') - (months - 1)).to_timestamp()
+    paths = []
+
+    def timed(message, write, *args):
+        start = time.perf_counter()
+        write(*args)
+        paths.append(args[0])
+        logger.info("%s: %s (%.1fs)", message, os.path.basename(args[0]), time.perf_counter() - start)
+
+    products = generate_products(rng, skus, assembly_share, bom_depth, suppliers, velocity_median, velocity_sigma, selling_share)
+    bom = generate_bom(rng, products, bom_fanout)
+    availability = generate_stock(rng, products, warehouses, location_spread)
+    sales = generate_sales(rng, products, period_start, period_end)
+    logger.info("%d SKUs, %d BOM lines, %d stock rows, %d selling SKUs", skus, len(bom), len(availability), len(sales))
+
+    timed("Availability Report", write_csv, os.path.join(output_dir, f"AvailabilityReport_{period_end:%Y-%m-%d}.csv"), availability)
+    timed("BOM Report", write_bom_report, os.path.join(output_dir, "BOM Component Availability.xlsx"), products, bom, availability)
+    timed("Sales report", write_sales_report, os.path.join(output_dir, "Sales by Product Details Report.xlsx"), sales, period_start, period_end)
+    timed("Inventory List", write_inventory_list, os.path.join(output_dir, f"InventoryList_{period_end:%Y-%m-%d}.csv"), rng, products, bom)
+
+    # The app reads replenishment exports for NC and CA
+    weights = _warehouse_weights(warehouses)
+    for i, warehouse in enumerate(WAREHOUSE_CODES[:min(warehouses, 2)]):
+        filename = f"replenishment-Combined_{warehouse}_Warehouses-variants-{period_start:%Y.%m.%d}-{period_end:%Y.%m.%d}.csv"
+        timed(f"Replenishment Report - {warehouse}", write_replenishment_report, os.path.join(output_dir, filename),
+              products, availability, warehouse, weights[i])
+    return paths
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write synthetic report exports for scale testing.")
+    parser.add_argument('output_dir', help="Directory for the generated exports")
+    parser.add_argument('--skus', type=int, default=10_000, help="Number of SKUs (default: 10000)")
+    parser.add_argument('--warehouses', type=int, default=2, help=f"Number of warehouses, 4 locations each (default: 2, at most {len(WAREHOUSE_CODES)})")
+    parser.add_argument('--location-spread', type=float, default=0.3, help="Mean number of extra stock locations per SKU (default: 0.3)")
+    parser.add_argument('--assembly-share', type=float, default=0.1, help="Share of SKUs that are assemblies (default: 0.1)")
+    parser.add_argument('--bom-fanout', type=float, default=4.0, help="Mean components per assembly (default: 4)")
+    parser.add_argument('--bom-depth', type=int, default=2, help="BOM levels; sub-assemblies appear from 2 (default: 2)")
+    parser.add_argument('--suppliers', type=int, default=200, help="Number of suppliers (default: 200)")
+    parser.add_argument('--velocity-median', type=float, default=0.2, help="Median daily sales of a selling SKU (default: 0.2)")
+    parser.add_argument('--velocity-sigma', type=float, default=1.5, help="Lognormal spread of daily sales (default: 1.5)")
+    parser.add_argument('--selling-share', type=float, default=0.5, help="Share of SKUs with sales (default: 0.5)")
+    parser.add_argument('--period-end', default='2025-08-31', help="Last day of the sales report period (default: 2025-08-31)")
+    parser.add_argument('--months', type=int, default=6, help="Months in the sales report period, at most 12 (default: 6)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Log progress, not only warnings")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format='%(levelname)s %(name)s: %(message)s')
+
+    try:
+        paths = generate_catalog(
+            args.output_dir, args.skus, args.warehouses, args.location_spread, args.assembly_share, args.bom_fanout, args.bom_depth,
+            args.suppliers, args.velocity_median, args.velocity_sigma, args.selling_share, args.period_end, args.months, args.seed
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    for path in paths:
+        print(path)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+import pandas as pd
+
+from assembly_engine import allocate_shared_components
+
+def make_requirements(rows):
+    """Requirements frame as built by analyze_assembly_status, one row per BOM line"""
+    requirements = pd.DataFrame(rows, columns=[
+        'row_id', 'assembly_sku', 'component_sku', 'qty_per_assembly', 'available', 'qty_for_assembly', 'avg_daily_sales'
+    ])
+    requirements['total_needed'] = requirements['qty_per_assembly'] * requirements['qty_for_assembly']
+    return requirements
+
+def test_uncontended_assemblies_are_limited_by_their_own_stock():
+    requirements = make_requirements([
+        (0, 'A1', 'C1', 2, 10, 3, 1.0),
+        (1, 'A2', 'C2', 1, 1, 5, 1.0),
+    ])
+
+    result, achievable = allocate_shared_components(requirements)
+
+    assert achievable.to_dict() == {0: 3, 1: 1}
+    assert list(result['status']) == ['Ready', 'Shortage']
+    assert list(result['allocated']) == [6, 1]
+    assert list(result['shortage']) == [0, 4]
+
+def test_contended_stock_is_netted_between_assemblies():
+    # Checked on their own, both assemblies would be Ready with the 5 units on hand
+    requirements = make_requirements([
+        (0, 'A1', 'C', 1, 5, 4, 1.0),
+        (1, 'A2', 'C', 1, 5, 4, 2.0),
+    ])
+
+    result, achievable = allocate_shared_components(requirements)
+    result = result.set_index('assembly_sku')
+
+    # The faster seller is served first and the other one sees what is left
+    assert achievable.to_dict() == {1: 4, 0: 1}
+    assert list(achievable.index) == [1, 0]
+    assert result.loc['A2', 'status'] == 'Ready'
+    assert result.loc['A1', 'status'] == 'Shortage'
+    assert result.loc['A1', 'available'] == 1
+    assert result.loc['A1', 'shortage'] == 3
+    assert result['allocated'].sum() == 5
+
+def test_abc_category_comes_before_sales_velocity():
+    requirements = make_requirements([
+        (0, 'A1', 'C', 1, 5, 4, 1.0),
+        (1, 'A2', 'C', 1, 5, 4, 2.0),
+    ])
+    abc_df = pd.DataFrame({'SKU': ['A1', 'A2'], 'abc_category': ['A', 'C']})
+
+    result, achievable = allocate_shared_components(requirements, abc_df)
+
+    assert achievable.to_dict() == {0: 4, 1: 1}
+    assert list(result.set_index('assembly_sku')['status']) == ['Ready', 'Shortage']
+
+def test_short_sub_assembly_is_built_from_its_components():
+    requirements = make_requirements([
+        (0, 'A1', 'SUB', 1, 1, 3, 1.0),
+        (0, 'A1', 'C', 1, 9, 3, 1.0),
+    ])
+    stock = pd.Series({'SUB': 1, 'C': 9, 'RAW': 4})
+    bom_expansion = {'children': {'SUB': [('RAW', 2)]}, 'cycles': set()}
+
+    result, achievable = allocate_shared_components(requirements, stock=stock, bom_expansion=bom_expansion)
+    result = result.set_index('component_sku')
+
+    assert achievable.to_dict() == {0: 3}
+    assert result.loc['SUB', 'status'] == 'Build'
+    assert result.loc['SUB', 'built'] == 2
+    assert result.loc['C', 'status'] == 'Ready'
@@ -0,0 +1,67 @@
+import pandas as pd
+
+from po_optimization import PO_LINE_KEY, SUPPLIER_TERMS_COLUMNS, get_pack_sizes, plan_topups, round_po_lines
+
+def make_products(rows):
+    return pd.DataFrame(rows, columns=PO_LINE_KEY + ['PackSize', 'ReorderQuantity', 'Velocity'])
+
+def make_po(rows):
+    return pd.DataFrame(rows, columns=PO_LINE_KEY + ['Quantity*'])
+
+def make_terms(rows):
+    return pd.DataFrame(rows + [('*', 0, 0, 0.2)], columns=SUPPLIER_TERMS_COLUMNS)
+
+def test_pack_size_prefers_inner_carton_then_carton():
+    df = pd.DataFrame({'CartonInnerQuantity': [6, 0, None, 1], 'CartonQuantity': [24, 12, 0, 1]})
+
+    assert get_pack_sizes(df).tolist() == [6, 12, 1, 1]
+
+def test_lines_are_rounded_to_reorder_quantity_then_whole_packs():
+    po_data = make_po([
+        ('S1', 'P1', 5.0, 5),
+        ('S1', 'P2', 5.0, 7),
+        ('S1', 'P3', 5.0, 2),
+        ('S1', 'P4', 5.0, 3),
+    ])
+    products = make_products([
+        ('S1', 'P1', 5.0, 6, 0, 1.0),
+        ('S1', 'P2', 5.0, 6, 0, 1.0),
+        ('S1', 'P3', 5.0, 4, 10, 1.0),
+    ])
+
+    # P4 has no Inventory List row and is ordered as is
+    assert round_po_lines(po_data, products).tolist() == [6, 12, 12, 3]
+
+def test_short_supplier_is_topped_up_with_its_fastest_sellers():
+    po_data = make_po([('S1', 'P1', 5.0, 10), ('S2', 'Q1', 10.0, 20)])
+    products = make_products([
+        ('S1', 'P1', 5.0, 2, 0, 1.0),
+        ('S1', 'P2', 3.0, 5, 0, 3.0),
+        ('S1', 'P3', 1.0, 1, 0, 0.0),
+        ('S2', 'Q1', 10.0, 1, 0, 1.0),
+    ])
+    terms = make_terms([('S1', 100, 0, 0.2), ('S2', 100, 0, 0.2)])
+
+    topups, summary = plan_topups(po_data, products, terms)
+
+    # One pack of each selling product fastest first, then the rest of the 50 gap from P2;
+    # P3 does not sell and is never added
+    assert topups.set_index('Product*')['Quantity*'].to_dict() == {'P2': 15, 'P1': 2}
+    assert summary.loc['S1', 'Shortfall'] == 50
+    assert summary.loc['S1', 'TopUpValue'] == 55
+    assert summary.loc['S2', 'TopUpValue'] == 0
+
+def test_order_close_to_free_freight_is_topped_up_to_the_threshold():
+    po_data = make_po([('S3', 'R1', 9.0, 10), ('S4', 'T1', 5.0, 10)])
+    products = make_products([
+        ('S3', 'R1', 9.0, 1, 0, 1.0),
+        ('S4', 'T1', 5.0, 1, 0, 1.0),
+    ])
+    # Terms match supplier names case-insensitively
+    terms = make_terms([('s3', 0, 100, 0.2), ('S4', 0, 100, 0.2)])
+
+    topups, summary = plan_topups(po_data, products, terms)
+
+    # S3 is 10 short of 100 (within 20% of its order); S4 is 50 short and stays as it is
+    assert topups[PO_LINE_KEY + ['Quantity*']].values.tolist() == [['S3', 'R1', 9.0, 2]]
+    assert summary['TargetValue'].to_dict() == {'S3': 100, 'S4': 0}
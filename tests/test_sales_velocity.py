@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sales_velocity import resolve_month_labels, velocity_weights
+
+MONTHS = [pd.Period(f'2025-{month:02d}', freq='M') for month in range(1, 7)]
+END = MONTHS[-1]
+DAYS = np.array([month.days_in_month for month in MONTHS], dtype=float)
+
+def test_window_is_clipped_to_the_report_period():
+    period = ('2025-03-01', '2025-06-30')
+
+    weights = velocity_weights(MONTHS, END, '12m', period)
+
+    # January and February are outside the export, so they neither add sales nor days
+    assert list(weights[:2]) == [0, 0]
+    assert weights[2:] == pytest.approx(1 / DAYS[2:].sum())
+
+def test_trailing_window_uses_actual_days():
+    weights = velocity_weights(MONTHS, END, '3m')
+
+    assert list(weights[:3]) == [0, 0, 0]
+    assert weights[3:] == pytest.approx(1 / (30 + 31 + 30))
+
+def test_months_after_the_end_and_unreadable_labels_are_ignored():
+    months = MONTHS[:-1] + [pd.NaT]
+
+    weights = velocity_weights(months + [pd.Period('2025-07', freq='M')], MONTHS[-2], 'period')
+
+    assert weights[-2:].tolist() == [0, 0]
+    assert (weights[:-2] * DAYS[:-1]).sum() == pytest.approx(1)
+
+def test_ewma_weights_sum_to_one_over_the_period():
+    weights = velocity_weights(MONTHS, END, 'ewma', halflife=3)
+
+    # A constant daily rate comes back unchanged
+    quantities = 4.0 * DAYS
+    assert quantities @ weights == pytest.approx(4.0)
+    assert (weights * DAYS).sum() == pytest.approx(1)
+    # A month three months older counts half as much
+    assert (weights[-1] * DAYS[-1]) / (weights[-4] * DAYS[-4]) == pytest.approx(2)
+
+def test_ewma_is_clipped_to_the_report_period():
+    weights = velocity_weights(MONTHS, END, 'ewma', ('2025-04-01', '2025-06-30'))
+
+    assert list(weights[:3]) == [0, 0, 0]
+    assert (weights * DAYS).sum() == pytest.approx(1)
+
+def test_unknown_model_is_rejected():
+    with pytest.raises(ValueError):
+        velocity_weights(MONTHS, END, '2w')
+
+def test_bare_month_names_take_the_year_of_the_report_period():
+    months, end = resolve_month_labels(['Nov', 'December', 'Jan', 'Feb 2024'], ('2024-11-01', '2025-01-31'))
+
+    assert end == pd.Period('2025-01', freq='M')
+    assert months == [pd.Period(label, freq='M') for label in ['2024-11', '2024-12', '2025-01', '2024-02']]
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from supplier_matching import compile_supplier_matcher, match_suppliers, normalize_supplier
+
+SUPPLIERS = ['Auto Transfer', 'Gifted Arms', 'Gift Shop', 'R & J Legacy, Inc.', 'transfer', None, 'Auto Transfer']
+
+def test_names_are_normalized():
+    assert normalize_supplier('R & J Legacy, Inc.') == 'r j legacy inc'
+    assert normalize_supplier('  AUTO   Transfer ') == 'auto transfer'
+
+def test_exact_mode_matches_whole_names():
+    matcher = compile_supplier_matcher(['Transfer', 'r&j legacy inc'], 'exact')
+
+    assert match_suppliers(SUPPLIERS, matcher).tolist() == [False, False, False, True, True, False, False]
+
+def test_substring_mode_matches_anywhere_in_the_name():
+    matcher = compile_supplier_matcher(['transfer', 'gift'], 'substring')
+
+    assert match_suppliers(SUPPLIERS, matcher).tolist() == [True, True, True, False, True, False, True]
+
+def test_token_mode_matches_whole_words():
+    matcher = compile_supplier_matcher(['transfer', 'gift', 'legacy inc'], 'token')
+
+    # 'gift' is a word of 'Gift Shop' but only part of 'Gifted'
+    assert match_suppliers(SUPPLIERS, matcher).tolist() == [True, False, True, True, True, False, True]
+
+def test_empty_patterns_match_nothing():
+    matcher = compile_supplier_matcher(['', '  ', '&'], 'substring')
+
+    assert not match_suppliers(SUPPLIERS, matcher).any()
+    assert match_suppliers([], matcher).dtype == np.bool_
+
+def test_unchanged_pattern_lists_reuse_the_compiled_matcher():
+    assert compile_supplier_matcher(['B', 'a'], 'token') is compile_supplier_matcher(['a', 'b '], 'token')
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        compile_supplier_matcher(['transfer'], 'regex')
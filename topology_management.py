@@ -0,0 +1,59 @@
+import streamlit as st
+from inventory_index import build_inventory_index
+from warehouse_topology import ROLES, discover_topology, get_warehouses, load_topology, save_topology
+
+def get_session_topology():
+    """Returns the warehouse topology of this session: the saved table plus the loaded report's new locations."""
+    if 'warehouse_topology' not in st.session_state:
+        topology = load_topology()
+        availability_df = st.session_state.get('dataframes', {}).get('Availability Report')
+        if availability_df is not None and 'Location' in availability_df.columns:
+            topology = discover_topology(availability_df['Location'], topology)
+        st.session_state.warehouse_topology = topology
+    return st.session_state.warehouse_topology
+
+def get_session_warehouses():
+    """Returns the warehouse codes of this session's topology (e.g. ['NC', 'CA'])"""
+    return get_warehouses(get_session_topology())
+
+def refresh_session_topology(availability_df):
+    """Adds the locations of a new Availability Report and re-indexes its inventory positions."""
+    topology = get_session_topology()
+    if 'Location' in availability_df.columns:
+        topology = discover_topology(availability_df['Location'], topology)
+    st.session_state.warehouse_topology = topology
+    st.session_state.inventory_index = build_inventory_index(availability_df, topology)
+
+def run_topology_editor():
+    """Editable table of the Availability Report locations that make up each warehouse"""
+
+    with st.expander("🏭 Warehouse Locations", expanded=False):
+        st.write(
+            "Each Availability Report location belongs to a warehouse. Main, Armory and FFL locations make up "
+            "the stock used for assembly orders; 'other' locations (returns, missing stock) only count towards "
+            "purchase orders. Leave the warehouse empty to ignore a location. New locations named like "
+            "'TX - Main' are added automatically when the Availability Report is uploaded."
+        )
+
+        edited_topology = st.data_editor(
+            get_session_topology(),
+            column_config={
+                'Role': st.column_config.SelectboxColumn('Role', options=list(ROLES), required=True),
+            },
+            num_rows="dynamic",
+            hide_index=True,
+            use_container_width=True,
+            key="topology_editor"
+        )
+
+        if st.button("💾 Save Warehouse Locations"):
+            try:
+                topology = save_topology(edited_topology)
+            except (ValueError, OSError) as e:
+                st.error(f"Could not save the warehouse locations: {str(e)}")
+                return
+
+            st.session_state.warehouse_topology = topology
+            if 'Availability Report' in st.session_state.dataframes:
+                st.session_state.inventory_index = build_inventory_index(st.session_state.dataframes['Availability Report'], topology)
+            st.success(f"✅ Saved {len(topology)} locations in {len(get_warehouses(topology))} warehouses: {', '.join(get_warehouses(topology))}")
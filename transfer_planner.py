@@ -0,0 +1,190 @@
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from csv_export import file_slug
+from inventory_index import get_location_matrix
+from warehouse_topology import ROLES, get_warehouse_locations, get_warehouses
+
+logger = logging.getLogger(__name__)
+
+# Editable transfer rules; the built-in Armory -> Main rule is used when the file is missing
+TRANSFER_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'transfer_rules.csv')
+TRANSFER_RULE_COLUMNS = [
+    'rule', 'enabled', 'priority', 'source_warehouse', 'source_role', 'destination_warehouse', 'destination_role',
+    'source_keep', 'source_keep_days', 'destination_target', 'days_of_cover', 'exclude'
+]
+
+# Sets of SKUs a rule can exclude (';'-separated in the 'exclude' column)
+EXCLUSION_SETS = ('bom_components', 'assemblies')
+
+# '*' as source warehouse applies a rule to every warehouse; as destination warehouse it
+# means the source's own warehouse. A rule moves stock to its destination until that
+# holds max(destination_target, days_of_cover x daily sales), leaving the source at least
+# max(source_keep, source_keep_days x daily sales).
+DEFAULT_TRANSFER_RULES = [
+    ('Armory to Main', True, 1, '*', 'armory', '*', 'main', 20, 0, 20, 0, 'bom_components'),
+]
+
+PLAN_COLUMNS = [
+    'Rule', 'SKU', 'ProductName', 'FromLocation', 'ToLocation', 'Quantity',
+    'SourceOnHand', 'DestinationOnHand', 'TargetStock'
+]
+
+def load_transfer_rules(path=TRANSFER_RULES_FILE):
+    """Loads the transfer rules from CSV, falling back to the built-in Armory -> Main rule."""
+    default_rules = pd.DataFrame(DEFAULT_TRANSFER_RULES, columns=TRANSFER_RULE_COLUMNS)
+    if not path or not os.path.exists(path):
+        return default_rules
+
+    try:
+        rules = pd.read_csv(path, dtype=str, keep_default_na=False)
+        missing = [col for col in TRANSFER_RULE_COLUMNS if col not in rules.columns]
+        if missing:
+            raise ValueError(f"missing columns {missing}")
+        rules = rules[TRANSFER_RULE_COLUMNS].copy()
+        rules['enabled'] = rules['enabled'].str.strip().str.lower().isin(['1', 'true', 'yes', 'y'])
+        numeric_cols = ['priority', 'source_keep', 'source_keep_days', 'destination_target', 'days_of_cover']
+        rules[numeric_cols] = rules[numeric_cols].replace('', '0').apply(pd.to_numeric, errors='raise')
+        for col in ['source_warehouse', 'destination_warehouse']:
+            rules[col] = rules[col].str.strip().str.upper()
+        for col in ['source_role', 'destination_role']:
+            rules[col] = rules[col].str.strip().str.lower()
+        invalid = set(rules['source_role']) | set(rules['destination_role'])
+        invalid -= set(ROLES)
+        if invalid:
+            raise ValueError(f"unknown roles {sorted(invalid)}")
+        unknown_sets = {name for names in rules['exclude'] for name in _exclusion_names(names)} - set(EXCLUSION_SETS)
+        if unknown_sets:
+            raise ValueError(f"unknown exclusion sets {sorted(unknown_sets)}")
+        return rules
+    except Exception as e:
+        logger.warning("Could not read transfer rules from %s (%s); using the built-in rule.", os.path.basename(path), e)
+        return default_rules
+
+def _exclusion_names(exclude):
+    return [name.strip().lower() for name in str(exclude).split(';') if name.strip()]
+
+def expand_transfer_rules(rules, topology):
+    """Resolve the enabled rules into (rule, source locations, destination locations) in priority order.
+
+    Wildcard rules become one rule per warehouse; rules whose source or destination has no
+    locations in the topology, or whose source and destination are the same, are skipped.
+    """
+    warehouses = get_warehouses(topology)
+    expanded = []
+    enabled = rules[rules['enabled'].astype(bool)]
+    for rule in enabled.sort_values('priority', kind='stable').itertuples(index=False):
+        sources = warehouses if rule.source_warehouse == '*' else [rule.source_warehouse]
+        for source_warehouse in sources:
+            destination_warehouse = source_warehouse if rule.destination_warehouse == '*' else rule.destination_warehouse
+            source_locations = get_warehouse_locations(topology, source_warehouse, roles=[rule.source_role])
+            destination_locations = get_warehouse_locations(topology, destination_warehouse, roles=[rule.destination_role])
+            if not source_locations or not destination_locations or set(source_locations) & set(destination_locations):
+                continue
+            expanded.append((rule, source_locations, destination_locations))
+    return expanded
+
+def _stock_floor(velocity, units, days):
+    """max(units, days x daily sales), rounded up, per SKU"""
+    return np.maximum(units, np.ceil(velocity * days)) if days > 0 else np.full(len(velocity), float(units))
+
+def plan_transfers(inventory_index, rules=None, sales_velocity_df=None, bom_df=None, availability_df=None):
+    """Evaluate all transfer rules over one SKU x location OnHand matrix.
+
+    Rules run in priority order against running totals: units a rule moves leave its source
+    and count as arriving at its destination, so later rules never propose the same unit
+    again and see the stock positions earlier rules produce. A rule's quantity is drawn
+    from its source locations largest stock first and sent to the first destination
+    location. Returns a DataFrame with PLAN_COLUMNS, sorted by source, destination and
+    quantity.
+    """
+    if rules is None:
+        rules = load_transfer_rules()
+    topology = inventory_index['topology']
+    expanded = expand_transfer_rules(rules, topology)
+    if not expanded:
+        return pd.DataFrame(columns=PLAN_COLUMNS)
+
+    locations = list(dict.fromkeys(location for _, sources, destinations in expanded for location in sources + destinations))
+    skus, on_hand = get_location_matrix(inventory_index, locations)
+    if len(skus) == 0:
+        return pd.DataFrame(columns=PLAN_COLUMNS)
+    location_pos = {location: i for i, location in enumerate(locations)}
+
+    # Units still at each location (not yet planned out) and units planned to arrive there
+    remaining = np.maximum(on_hand, 0)
+    incoming = np.zeros_like(on_hand)
+
+    velocity = np.zeros(len(skus))
+    if sales_velocity_df is not None and len(sales_velocity_df) > 0:
+        daily_sales = pd.Series(sales_velocity_df['avg_daily_sales'].to_numpy(dtype=float), index=sales_velocity_df['SKU'].astype(str))
+        velocity = daily_sales[~daily_sales.index.duplicated()].reindex(skus).fillna(0).to_numpy()
+
+    exclusion_sets = {name: np.zeros(len(skus), dtype=bool) for name in EXCLUSION_SETS}
+    if bom_df is not None:
+        if 'Component SKU' in bom_df.columns:
+            exclusion_sets['bom_components'] = skus.isin(pd.Series(bom_df['Component SKU'].unique()).dropna().astype(str))
+        if 'Product SKU' in bom_df.columns:
+            exclusion_sets['assemblies'] = skus.isin(pd.Series(bom_df['Product SKU'].unique()).dropna().astype(str))
+
+    moves = []
+    for rule, source_locations, destination_locations in expanded:
+        source_cols = [location_pos[location] for location in source_locations]
+        destination_cols = [location_pos[location] for location in destination_locations]
+
+        source_position = (remaining[:, source_cols] + incoming[:, source_cols]).sum(axis=1)
+        destination_position = (remaining[:, destination_cols] + incoming[:, destination_cols]).sum(axis=1)
+        target = _stock_floor(velocity, rule.destination_target, rule.days_of_cover)
+        keep = _stock_floor(velocity, rule.source_keep, rule.source_keep_days)
+
+        # Only units physically at the source can move, and the source keeps its floor
+        available = np.minimum(remaining[:, source_cols].sum(axis=1), source_position - keep)
+        quantity = np.floor(np.maximum(np.minimum(target - destination_position, available), 0))
+        for name in _exclusion_names(rule.exclude):
+            quantity[exclusion_sets[name]] = 0
+
+        # Draw from the source locations largest stock first
+        order = np.argsort(-remaining[:, source_cols], axis=1, kind='stable')
+        left = quantity.copy()
+        for k in range(len(source_cols)):
+            cols = np.array(source_cols)[order[:, k]]
+            rows = np.arange(len(skus))
+            take = np.minimum(left, remaining[rows, cols])
+            remaining[rows, cols] -= take
+            left -= take
+            moved = take > 0
+            if moved.any():
+                moves.append(pd.DataFrame({
+                    'Rule': rule.rule,
+                    'SKU': skus[moved],
+                    'FromLocation': np.array(locations, dtype=object)[cols[moved]],
+                    'ToLocation': destination_locations[0],
+                    'Quantity': take[moved],
+                    'SourceOnHand': on_hand[:, source_cols].sum(axis=1)[moved],
+                    'DestinationOnHand': on_hand[:, destination_cols].sum(axis=1)[moved],
+                    'TargetStock': target[moved],
+                }))
+        incoming[:, destination_cols[0]] += quantity
+
+    if not moves:
+        return pd.DataFrame(columns=PLAN_COLUMNS)
+    plan = pd.concat(moves, ignore_index=True)
+
+    plan['ProductName'] = ''
+    if availability_df is not None and 'ProductName' in availability_df.columns:
+        first_rows = availability_df.loc[availability_df['SKU'].astype(str).isin(plan['SKU']), ['SKU', 'ProductName']].drop_duplicates('SKU')
+        plan['ProductName'] = plan['SKU'].map(pd.Series(first_rows['ProductName'].to_numpy(), index=first_rows['SKU'].astype(str))).fillna('')
+
+    plan = plan.sort_values(['FromLocation', 'ToLocation', 'Quantity', 'SKU'], ascending=[True, True, False, True], kind='stable')
+    logger.info("Transfer plan: %d moves, %d units over %d rules.", len(plan), int(plan['Quantity'].sum()), len(expanded))
+    return plan[PLAN_COLUMNS].reset_index(drop=True)
+
+def split_transfer_orders(plan):
+    """Split a transfer plan into {'{from}_to_{to}' file slug: rows}, one transfer order per location pair"""
+    orders = {}
+    for (from_location, to_location), rows in plan.groupby(['FromLocation', 'ToLocation'], sort=True):
+        orders[f"{file_slug(from_location)}_to_{file_slug(to_location)}"] = rows.reset_index(drop=True)
+    return orders
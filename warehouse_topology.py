@@ -0,0 +1,124 @@
+import logging
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Editable Location -> Warehouse table; locations found in the Availability Report are added to it
+TOPOLOGY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'warehouse_topology.csv')
+TOPOLOGY_COLUMNS = ['Location', 'Warehouse', 'Role']
+
+# main/armory/ffl locations make up a warehouse's stock position for assembly planning;
+# 'other' locations (returns, missing stock) only count towards purchase orders
+STOCK_ROLES = ('main', 'armory', 'ffl')
+ROLES = STOCK_ROLES + ('other',)
+
+DEFAULT_TOPOLOGY = [
+    ('NC - Main', 'NC', 'main'),
+    ('NC - Armory', 'NC', 'armory'),
+    ('NC - FFL', 'NC', 'ffl'),
+    ('CA - Main', 'CA', 'main'),
+    ('CA - Armory', 'CA', 'armory'),
+    ('CA - FFL', 'CA', 'ffl'),
+]
+
+# New locations named like 'TX - Main' or 'CA-Armory' join (or create) the warehouse 'TX' / 'CA'
+LOCATION_PATTERN = re.compile(r'^([A-Z]{2,3})\s*-\s*(\S.*)$')
+
+def _clean_topology(topology):
+    """Validate a topology table; blank warehouses mean the location is not part of any warehouse"""
+    missing = [col for col in TOPOLOGY_COLUMNS if col not in topology.columns]
+    if missing:
+        raise ValueError(f"missing columns {missing}")
+    topology = topology[TOPOLOGY_COLUMNS].copy()
+    topology['Location'] = topology['Location'].astype(str).str.strip()
+    topology['Warehouse'] = topology['Warehouse'].fillna('').astype(str).str.strip().str.upper()
+    topology['Role'] = topology['Role'].fillna('other').astype(str).str.strip().str.lower()
+    invalid = set(topology['Role']) - set(ROLES)
+    if invalid:
+        raise ValueError(f"unknown roles {sorted(invalid)}")
+    return topology.drop_duplicates('Location').reset_index(drop=True)
+
+def load_topology(path=TOPOLOGY_FILE):
+    """Loads the warehouse topology from CSV, falling back to the built-in NC/CA locations."""
+    default_topology = pd.DataFrame(DEFAULT_TOPOLOGY, columns=TOPOLOGY_COLUMNS)
+    if not path or not os.path.exists(path):
+        return default_topology
+
+    try:
+        return _clean_topology(pd.read_csv(path, dtype=str, keep_default_na=False))
+    except Exception as e:
+        logger.warning("Could not read the warehouse topology from %s (%s); using the built-in locations.", os.path.basename(path), e)
+        return default_topology
+
+def save_topology(topology, path=TOPOLOGY_FILE):
+    """Writes the warehouse topology (e.g. after editing it in the app)"""
+    topology = _clean_topology(topology)
+    tmp_path = f"{path}.tmp"
+    topology.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return topology
+
+def discover_topology(locations, topology=None):
+    """Add the locations of an Availability Report that the topology does not list yet.
+
+    Locations named '<CODE> - <name>' are assigned to warehouse CODE, with the role taken
+    from the name when it is one of STOCK_ROLES; other locations are added without a
+    warehouse so they can be assigned by hand.
+    """
+    if topology is None:
+        topology = load_topology()
+
+    known = set(topology['Location'])
+    new_rows = []
+    for location in pd.Series(locations).dropna().astype(str).unique():
+        if location in known:
+            continue
+        match = LOCATION_PATTERN.match(location)
+        if match:
+            role = match.group(2).strip().lower()
+            new_rows.append((location, match.group(1), role if role in STOCK_ROLES else 'other'))
+        else:
+            new_rows.append((location, '', 'other'))
+
+    if not new_rows:
+        return topology
+    return pd.concat([topology, pd.DataFrame(new_rows, columns=TOPOLOGY_COLUMNS)], ignore_index=True)
+
+def get_warehouses(topology):
+    """Warehouse codes in the order they first appear in the topology"""
+    warehouses = topology['Warehouse']
+    return list(dict.fromkeys(warehouses[warehouses != '']))
+
+def get_warehouse_locations(topology, warehouse, roles=STOCK_ROLES):
+    """Locations of a warehouse with one of the given roles (roles=None: every location)"""
+    rows = topology[topology['Warehouse'] == warehouse]
+    if roles is not None:
+        rows = rows[rows['Role'].isin(roles)]
+    return list(rows['Location'])
+
+def warehouse_codes(locations, topology, roles=STOCK_ROLES):
+    """Map a Location column to integer warehouse codes (positions in get_warehouses).
+
+    The mapping is computed once per distinct location and applied to the rows with a
+    single take; locations outside the selected roles or without a warehouse get -1.
+    Returns (codes, warehouses).
+    """
+    warehouses = get_warehouses(topology)
+    rows = topology[topology['Warehouse'] != '']
+    if roles is not None:
+        rows = rows[rows['Role'].isin(roles)]
+    warehouse_ids = {warehouse: i for i, warehouse in enumerate(warehouses)}
+    location_to_code = {location: warehouse_ids[warehouse] for location, warehouse in zip(rows['Location'], rows['Warehouse'])}
+
+    location_cat = pd.Series(locations).astype('category')
+    mapping = np.array(
+        [location_to_code.get(str(location), -1) for location in location_cat.cat.categories] + [-1],
+        dtype=np.int32
+    )
+    # Missing locations have category code -1, which picks the trailing -1 of the mapping
+    codes = mapping[location_cat.cat.codes.to_numpy()]
+    return codes, warehouses